@@ -1,12 +1,65 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from db_pool import QuoteDatabasePool
+from response_cache import ResponseCache
+from quote_broadcaster import QuoteBroadcaster
+from query_executor import QueryExecutor, SingleFlight
+from hot_series_cache import HotSeriesCache
+from quote_metrics import METRICS, MetricsMiddleware
 from routes import router as quote_router
 
+DB_PATH = os.environ.get("QUOTES_DB_PATH", "quotes.db")
+DB_READERS = int(os.environ.get("QUOTES_DB_READERS", "4"))
+# Directory of archived (Parquet) sessions; unset keeps every quote in SQLite
+PARQUET_DIR = os.environ.get("QUOTES_PARQUET_DIR")
+# Optional pragma overrides, e.g. QUOTES_DB_SYNCHRONOUS=OFF or QUOTES_DB_MMAP_SIZE=0
+DB_PRAGMAS = {
+    name: os.environ[f"QUOTES_DB_{name.upper()}"]
+    for name in ("journal_mode", "synchronous", "mmap_size", "cache_size")
+    if f"QUOTES_DB_{name.upper()}" in os.environ
+}
+CACHE_MAX_ENTRIES = int(os.environ.get("QUOTES_CACHE_MAX_ENTRIES", "256"))
+CACHE_TTL_SECONDS = float(os.environ.get("QUOTES_CACHE_TTL_SECONDS", "60"))
+STREAM_POLL_SECONDS = float(os.environ.get("QUOTES_STREAM_POLL_SECONDS", "1"))
+# Query threads beyond the number of readers would only wait on the pool
+QUERY_WORKERS = int(os.environ.get("QUOTES_QUERY_WORKERS", str(DB_READERS)))
+QUERY_TIMEOUT_SECONDS = float(os.environ.get("QUOTES_QUERY_TIMEOUT_SECONDS", "30"))
+# Identical concurrent /api/data, /api/multi, compare, analytics and ohlc requests share one query; 0 disables
+SINGLE_FLIGHT = os.environ.get("QUOTES_SINGLE_FLIGHT", "1") not in ("0", "false", "no")
+# Memory-mapped hot series, shared by every worker pointing at the same directory; unset disables
+HOT_CACHE_DIR = os.environ.get("QUOTES_HOT_CACHE_DIR")
+HOT_CACHE_MB = int(os.environ.get("QUOTES_HOT_CACHE_MB", "512"))
+# Request/SQL/serialization timings for GET /api/quotes/metrics; QUOTES_METRICS=0 removes the hooks entirely
+METRICS_ENABLED = os.environ.get("QUOTES_METRICS", "1") not in ("0", "false", "no")
+# Calls slower than this log their SQL with EXPLAIN QUERY PLAN (logger quote_metrics.slow_queries); 0 turns it off
+SLOW_QUERY_MS = float(os.environ.get("QUOTES_SLOW_QUERY_MS", "500"))
+METRICS.configure(METRICS_ENABLED, SLOW_QUERY_MS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.db_pool = QuoteDatabasePool(DB_PATH, readers=DB_READERS, pragmas=DB_PRAGMAS,
+                                          parquet_dir=PARQUET_DIR)
+    app.state.response_cache = ResponseCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+    app.state.query_executor = QueryExecutor(QUERY_WORKERS, QUERY_TIMEOUT_SECONDS)
+    app.state.single_flight = SingleFlight() if SINGLE_FLIGHT else None
+    app.state.hot_cache = HotSeriesCache(HOT_CACHE_DIR, HOT_CACHE_MB * 1024 * 1024) if HOT_CACHE_DIR else None
+    app.state.broadcaster = QuoteBroadcaster(app.state.db_pool, poll_interval=STREAM_POLL_SECONDS)
+    broadcaster_task = asyncio.create_task(app.state.broadcaster.run())
+    yield
+    broadcaster_task.cancel()
+    app.state.query_executor.shutdown()
+    app.state.db_pool.close()
+
 
 app = FastAPI(
     title="Quote Management API",
     description="API for managing and fetching financial quotes.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -21,8 +74,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all HTTP methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["ETag", "X-Next-Cursor"],  # ETag for If-None-Match polling, X-Next-Cursor for /quotes pages
 )
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # @app.get("/")
 # def read_root():
 #     return {"message": "Quote Management API is running."}
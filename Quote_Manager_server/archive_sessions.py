@@ -0,0 +1,28 @@
+import argparse
+import logging
+from datetime import datetime
+from quote_db import QuoteDatabase
+
+logging.basicConfig(level=logging.INFO)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Move closed sessions from SQLite into the Parquet store")
+    parser.add_argument("--db", default="quotes.db", help="SQLite database path")
+    parser.add_argument("--parquet-dir", default="quotes_parquet/", help="Root of the Parquet store")
+    parser.add_argument("--older-than-hours", type=float, default=24,
+                        help="Archive sessions whose last quote is older than this")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to return the freed space to disk")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    db = QuoteDatabase(args.db, parquet_dir=args.parquet_dir)
+    closed_before = int(datetime.now().timestamp() * 1000 - args.older_than_hours * 3600 * 1000)
+    rows = db.archive_closed_sessions(closed_before)
+    logging.info(f"Archived {rows} quotes to {args.parquet_dir}")
+    if args.vacuum and rows:
+        db.conn.execute("VACUUM")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,40 @@
+import argparse
 import logging
 from pathlib import Path
 from quote_service import QuoteService
 from quote_db import QuoteDatabase
+from hot_series_cache import HotSeriesCache
+from ingest import DEFAULT_BATCH_SIZE, DEFAULT_PARSER, PARSERS
 
 logging.basicConfig(level=logging.INFO)
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ingest every ZIP archive in a folder")
+    parser.add_argument("--folder", default="archives/", help="Folder containing ZIP archives")
+    parser.add_argument("--workers", type=int, default=1, help="Parser processes (1 = sequential)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Quotes per write batch")
+    parser.add_argument("--parser", choices=PARSERS, default=DEFAULT_PARSER,
+                        help="CSV parser: vectorized pandas reader or the row-by-row csv fallback")
+    parser.add_argument("--force", action="store_true", help="Reload members the manifest marks as unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be loaded without writing")
+    parser.add_argument("--parquet-dir", default=None,
+                        help="Parquet store of archived sessions (needed to re-ingest an archived session)")
+    parser.add_argument("--hot-cache-dir", default=None,
+                        help="Hot series cache shared with the API (QUOTES_HOT_CACHE_DIR) to append new ticks to")
+    return parser.parse_args()
+
 def main():
-    folder_path = Path("archives/")  # or whatever your folder is, ensure it exists
+    args = parse_args()
+    folder_path = Path(args.folder)  # or whatever your folder is, ensure it exists
     if not folder_path.exists() or not folder_path.is_dir():
         logging.error(f"Folder {folder_path} does not exist or is not a directory: {folder_path}.")
         return
-    db = QuoteDatabase("quotes.db")
-    service = QuoteService(db)
+    db = QuoteDatabase("quotes.db", parquet_dir=args.parquet_dir)
+    hot_cache = HotSeriesCache(args.hot_cache_dir) if args.hot_cache_dir else None
+    service = QuoteService(db, hot_cache=hot_cache)
 
-    service.ingest_archives_from_folder(folder_path)
+    service.ingest_archives_from_folder(folder_path, workers=args.workers, batch_size=args.batch_size,
+                                        parser=args.parser, force=args.force, dry_run=args.dry_run)
 
 if __name__ == "__main__":
     main()
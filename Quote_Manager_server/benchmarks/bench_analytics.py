@@ -0,0 +1,71 @@
+"""Time QuoteService.get_analytics over a day of ticks and check it recovers a known lead/lag.
+
+Broker B quotes the same random walk as broker A, delayed by LAG_MS, at its own random tick times.
+
+Usage (from Quote_Manager_server/): python benchmarks/bench_analytics.py [ticks_per_second]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import logging
+logging.disable(logging.INFO)
+import numpy as np
+from quote_db import QuoteDatabase
+from quote_service import QuoteService
+from hot_series_cache import HotSeriesCache
+
+START = 1_700_000_000_000
+DAY_MS = 86_400_000
+LAG_MS = 300
+
+
+def build_database(path, ticks_per_second):
+    rng = np.random.default_rng(7)
+    # Reference mid on a 10 ms clock; each broker samples it at Poisson tick times
+    walk = 1.1 + np.cumsum(rng.normal(0, 2e-6, DAY_MS // 10))
+    db = QuoteDatabase(path)
+    for broker, delay in (("BrokerA", 0), ("BrokerB", LAG_MS)):
+        n = int(DAY_MS / 1000 * ticks_per_second)
+        offsets = np.unique(np.sort(rng.integers(delay + 1, DAY_MS, n)))
+        mid = walk[(offsets - delay) // 10]
+        spread = rng.choice([0.0001, 0.00012, 0.0002], len(offsets))
+        quotes = list(zip((START + offsets).tolist(), (mid - spread / 2).tolist(), (mid + spread / 2).tolist()))
+        db.insert_quotes_stream(f"{broker}-day0", [quotes], session_info=(broker, "EURUSD", "bench.zip"))
+    db.bump_data_version()
+    db.close()
+
+
+def timed(label, fn, repeat=3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    print(f"{label:<36} {best * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    ticks_per_second = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, "analytics.db")
+    build_database(path, ticks_per_second)
+    db = QuoteDatabase(path, read_only=True)
+    print(f"{db.count_quotes('BrokerA', 'EURUSD')} + {db.count_quotes('BrokerB', 'EURUSD')} ticks, injected lag {LAG_MS} ms")
+
+    args = ("BrokerA", "EURUSD", "BrokerB", "EURUSD")
+    result = timed("get_analytics (database)", lambda: QuoteService(db).get_analytics(*args))
+    hot = QuoteService(db, hot_cache=HotSeriesCache(os.path.join(workdir, "hot")))
+    hot.get_analytics(*args)
+    timed("get_analytics (hot series cache)", lambda: hot.get_analytics(*args))
+    timed("get_analytics (step 1000 ms)", lambda: hot.get_analytics(*args, step_ms=1000))
+    print(f"lead/lag: {result.lead_lag.lag_ms} ms (r={result.lead_lag.correlation:.3f}), "
+          f"spread p50 A {result.a.spread['p50']:.5f}, mid diff std {result.mid_difference['std']:.2e}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
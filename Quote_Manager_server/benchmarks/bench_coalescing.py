@@ -0,0 +1,56 @@
+"""Many dashboards polling the identical /api/data request at once, with and without single-flight.
+
+Each round fires `clients` identical requests together, the way every open tab's chart
+and table do on mount and on their poll tick. The response cache is disabled so every
+round misses it, as after an ingest. Reports wall time per round and query-pool jobs run.
+
+Usage (from Quote_Manager_server/): python benchmarks/bench_coalescing.py DB_PATH BROKER_A:SYMBOL_A BROKER_B:SYMBOL_B
+                                    [clients] [rounds] [limit]
+"""
+import os
+import sys
+import time
+import asyncio
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+async def run(instrument_a, instrument_b, clients, rounds, limit):
+    from api_main import app, lifespan
+    from response_cache import ResponseCache
+    from query_executor import SingleFlight
+    broker_a, symbol_a = instrument_a.split(":")
+    broker_b, symbol_b = instrument_b.split(":")
+    params = {"broker_a": broker_a, "symbol_a": symbol_a, "broker_b": broker_b, "symbol_b": symbol_b,
+              "limit": limit}
+
+    async with lifespan(app):
+        app.state.response_cache = ResponseCache(max_entries=0)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for label, flights in (("without single-flight", None), ("with single-flight", SingleFlight())):
+                app.state.single_flight = flights
+                jobs_before = app.state.query_executor.stats()["completed"]
+                started = time.perf_counter()
+                for _ in range(rounds):
+                    responses = await asyncio.gather(
+                        *[client.get("/api/quotes/api/data", params=params) for _ in range(clients)])
+                    if any(r.status_code != 200 for r in responses):
+                        sys.exit(f"non-200 response: {sorted({r.status_code for r in responses})}")
+                seconds = (time.perf_counter() - started) / rounds
+                jobs = app.state.query_executor.stats()["completed"] - jobs_before
+                print(f"{label:<24} {seconds * 1000:9.1f} ms/round, {jobs / rounds:5.1f} pool jobs/round"
+                      + (f", {flights.stats()}" if flights is not None else ""))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        sys.exit(__doc__)
+    os.environ["QUOTES_DB_PATH"] = sys.argv[1]
+    os.environ.setdefault("QUOTES_SLOW_QUERY_MS", "0")  # every request here is a "slow" one
+    clients = int(sys.argv[4]) if len(sys.argv) > 4 else 16
+    rounds = int(sys.argv[5]) if len(sys.argv) > 5 else 3
+    limit = int(sys.argv[6]) if len(sys.argv) > 6 else 20_000
+    asyncio.run(run(sys.argv[2], sys.argv[3], clients, rounds, limit))
@@ -0,0 +1,75 @@
+"""Latency of light requests while heavy "all data" requests run concurrently, in-process.
+
+Heavy: /api/data with a large limit (a fresh since_ts per request so the response cache
+can't answer it). Light: /api/ohlc, a small rollup read. Reports p50/p99 for each.
+
+Usage (from Quote_Manager_server/): python benchmarks/bench_concurrency.py DB_PATH BROKER_A:SYMBOL_A BROKER_B:SYMBOL_B
+                                    [heavy_clients] [light_clients] [seconds]
+"""
+import os
+import sys
+import time
+import asyncio
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def client_loop(client, make_request, deadline, latencies, errors):
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+        started = time.perf_counter()
+        response = await make_request(client, n)
+        if response.status_code == 200:
+            latencies.append((time.perf_counter() - started) * 1000)
+        else:
+            errors.append(response.status_code)
+
+
+async def run(instrument_a, instrument_b, heavy_clients, light_clients, seconds):
+    from api_main import app, lifespan
+    broker_a, symbol_a = instrument_a.split(":")
+    broker_b, symbol_b = instrument_b.split(":")
+
+    async def heavy(client, n):
+        return await client.get("/api/quotes/api/data", params={
+            "broker_a": broker_a, "symbol_a": symbol_a, "broker_b": broker_b, "symbol_b": symbol_b,
+            "limit": 1_000_000, "since_ts": n})
+
+    async def light(client, n):
+        return await client.get("/api/quotes/api/ohlc", params={"broker": broker_a, "symbol": symbol_a})
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            deadline = time.perf_counter() + seconds
+            heavy_ms, light_ms, errors = [], [], []
+            await asyncio.gather(
+                *[client_loop(client, heavy, deadline, heavy_ms, errors) for _ in range(heavy_clients)],
+                *[client_loop(client, light, deadline, light_ms, errors) for _ in range(light_clients)],
+            )
+
+    print(f"{heavy_clients} heavy + {light_clients} light clients for {seconds}s")
+    for name, values in (("heavy", heavy_ms), ("light", light_ms)):
+        if values:
+            print(f"  {name}: {len(values)} requests, p50 {percentile(values, 50):.1f} ms, "
+                  f"p99 {percentile(values, 99):.1f} ms")
+    if errors:
+        print(f"  non-200 responses: {len(errors)} ({sorted(set(errors))})")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        sys.exit(__doc__)
+    os.environ["QUOTES_DB_PATH"] = sys.argv[1]
+    heavy_clients = int(sys.argv[4]) if len(sys.argv) > 4 else 2
+    light_clients = int(sys.argv[5]) if len(sys.argv) > 5 else 8
+    seconds = float(sys.argv[6]) if len(sys.argv) > 6 else 10
+    asyncio.run(run(sys.argv[2], sys.argv[3], heavy_clients, light_clients, seconds))
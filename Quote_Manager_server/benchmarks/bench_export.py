@@ -0,0 +1,62 @@
+"""Time-to-first-byte and peak memory of the streamed export against building the whole range.
+
+Usage (from Quote_Manager_server/): python benchmarks/bench_export.py [sessions] [ticks_per_session]
+"""
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import logging
+logging.disable(logging.INFO)
+import fast_json
+from quote_db import QuoteDatabase
+from quote_service import QuoteService
+from bench_storage import build_database, START
+
+
+def measure(fn):
+    """(seconds to the first chunk, total seconds, bytes produced, peak traced MB)."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    first, size = None, 0
+    for chunk in fn():
+        if first is None:
+            first = time.perf_counter() - t0
+        size += len(chunk)
+    total = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return first, total, size, peak
+
+
+def buffered_json(db, end_time):
+    # What POST /quotes does: fetch every row, then encode one body
+    rows = db.fetch_quotes("BrokerA", "EURUSD", end_time=end_time)
+    yield fast_json.dumps({"quotes": [dict(zip(("session_id", "timestamp", "bid", "ask"), r)) for r in rows]})
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    path = os.path.join(tempfile.mkdtemp(), "export.db")
+    build_database(path, sessions, ticks)
+    db = QuoteDatabase(path, read_only=True)
+    service = QuoteService(db)
+    print(f"{sessions} sessions x {ticks} ticks")
+    print(f"{'range':<8} {'method':<18} {'ttfb ms':>9} {'total ms':>9} {'MB out':>8} {'peak MB':>8}")
+    for days in (1, sessions // 4, sessions // 2):
+        end_time = START + days * 86_400_000
+        runs = [("buffered json", lambda: buffered_json(db, end_time))]
+        runs += [(f"stream {fmt}", lambda fmt=fmt: service.export_quotes("BrokerA", "EURUSD", fmt, end_time=end_time))
+                 for fmt in ("csv", "ndjson", "arrow")]
+        for label, fn in runs:
+            first, total, size, peak = measure(fn)
+            print(f"{days:>3} day  {label:<18} {first * 1000:9.1f} {total * 1000:9.1f} {size / 1e6:8.1f} {peak:8.1f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Measure live-push fan-out: many subscribers on one QuoteBroadcaster while ticks are ingested.
+
+Reports delivery latency (commit -> subscriber queue) and how many DB reads the
+broadcaster issued, which should track updates, not subscribers.
+
+Usage (from Quote_Manager_server/): python benchmarks/bench_fanout.py [subscribers] [updates] [ticks_per_update]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from db_pool import QuoteDatabasePool
+from quote_broadcaster import QuoteBroadcaster
+
+INSTRUMENTS = [("BrokerA", "EURUSD"), ("BrokerB", "EURUSD")]
+BASE_TS = 1_700_000_000_000
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def subscriber(broadcaster, instrument, latencies, commit_times, expected):
+    subscription = await broadcaster.subscribe([instrument])
+    try:
+        for _ in range(expected):
+            message = await subscription.queue.get()
+            latencies.append(time.perf_counter() - commit_times[message["watermark"]])
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+def write_update(pool, sessions, ts, ticks, rng):
+    """Append ticks for every instrument and bump the data version; returns the new watermark."""
+    with pool.write() as db:
+        for session_id in sessions:
+            quotes = [(ts + i, 1.1 + rng.random() * 1e-3, 1.1002 + rng.random() * 1e-3) for i in range(ticks)]
+            db.insert_quote_chunk(session_id, quotes, append_only=True)
+        db.bump_data_version()
+    return ts + ticks - 1
+
+
+async def run(subscribers, updates, ticks):
+    path = os.path.join(tempfile.mkdtemp(), "fanout.db")
+    pool = QuoteDatabasePool(path, readers=4)
+    sessions = []
+    with pool.write() as db:
+        for broker, symbol in INSTRUMENTS:
+            session_id = f"{broker}_{symbol}_live"
+            db.insert_session((session_id, broker, symbol, "live.zip", BASE_TS, BASE_TS))
+            db.insert_quote_chunk(session_id, [(BASE_TS, 1.1, 1.1002)], append_only=True)
+            sessions.append(session_id)
+        db.bump_data_version()
+
+    broadcaster = QuoteBroadcaster(pool, poll_interval=0.05, max_pending=updates)
+    poller = asyncio.create_task(broadcaster.run())
+    await asyncio.sleep(0.1)
+
+    latencies, commit_times = [], {}
+    readers = [asyncio.create_task(subscriber(broadcaster, INSTRUMENTS[i % len(INSTRUMENTS)],
+                                              latencies, commit_times, updates))
+               for i in range(subscribers)]
+    await asyncio.sleep(0.1)
+    reads_before = broadcaster.db_reads
+
+    rng = random.Random(42)
+    ts = BASE_TS + 1
+    started = time.perf_counter()
+    for _ in range(updates):
+        watermark = await asyncio.to_thread(write_update, pool, sessions, ts, ticks, rng)
+        commit_times[watermark] = time.perf_counter()
+        broadcaster.notify()
+        ts = watermark + 1
+        await asyncio.sleep(0.02)
+    await asyncio.wait_for(asyncio.gather(*readers), timeout=60)
+    elapsed = time.perf_counter() - started
+
+    poller.cancel()
+    pool.close()
+    ms = [latency * 1000 for latency in latencies]
+    print(f"{subscribers} subscribers, {updates} updates x {ticks} ticks x {len(INSTRUMENTS)} instruments")
+    print(f"  delivered {len(ms)} messages in {elapsed:.2f}s")
+    print(f"  latency p50 {percentile(ms, 50):.1f} ms, p99 {percentile(ms, 99):.1f} ms, max {max(ms):.1f} ms")
+    print(f"  broadcaster DB reads: {broadcaster.db_reads - reads_before}")
+
+
+if __name__ == "__main__":
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    ticks = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    asyncio.run(run(subscribers, updates, ticks))
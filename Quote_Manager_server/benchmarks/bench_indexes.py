@@ -0,0 +1,114 @@
+"""Time the per-instrument read paths on the original schema and after migration.
+
+Usage (from Quote_Manager_server/): python benchmarks/bench_indexes.py [sessions] [ticks_per_session]
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from quote_db import QuoteDatabase
+
+BROKERS = ["BrokerA", "BrokerB", "BrokerC"]
+SYMBOLS = ["EURUSD", "GBPUSD", "USDJPY"]
+
+# Queries as they were written against the original (pre-migration) schema
+OLD_GET_DATA = """
+SELECT q.session_id, q.bid, q.ask, q.timestamp, s.broker, s.symbol
+FROM quotes q JOIN sessions s ON q.session_id = s.session_id
+WHERE ((s.broker = ? AND s.symbol = ?) OR (s.broker = ? AND s.symbol = ?))
+ORDER BY q.timestamp DESC LIMIT ?
+"""
+OLD_FETCH_QUOTES = """
+SELECT q.session_id, q.timestamp, q.bid, q.ask
+FROM quotes q JOIN sessions s ON q.session_id = s.session_id
+WHERE s.broker = ? AND s.symbol = ? AND q.timestamp >= ? AND q.timestamp <= ?
+"""
+
+# The same reads as QuoteDatabase issues them after migration
+NEW_GET_DATA = """
+SELECT * FROM (SELECT q.session_id, q.bid, q.ask, q.timestamp, i.broker, i.symbol
+    FROM quotes q JOIN instruments i ON q.instrument_id = i.instrument_id
+    WHERE i.broker = ? AND i.symbol = ? ORDER BY q.timestamp DESC LIMIT ?)
+UNION ALL
+SELECT * FROM (SELECT q.session_id, q.bid, q.ask, q.timestamp, i.broker, i.symbol
+    FROM quotes q JOIN instruments i ON q.instrument_id = i.instrument_id
+    WHERE i.broker = ? AND i.symbol = ? ORDER BY q.timestamp DESC LIMIT ?)
+ORDER BY timestamp DESC LIMIT ?
+"""
+NEW_FETCH_QUOTES = """
+SELECT q.session_id, q.timestamp, q.bid, q.ask
+FROM quotes q
+WHERE q.instrument_id IN (SELECT instrument_id FROM instruments WHERE broker = ? AND symbol = ?)
+AND q.timestamp >= ? AND q.timestamp <= ?
+"""
+
+
+def build_v0_database(path, sessions, ticks):
+    """Create the original schema (no migrations) and fill it with random ticks."""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+    CREATE TABLE sessions (session_id TEXT PRIMARY KEY, broker TEXT NOT NULL, symbol TEXT NOT NULL,
+        archive_name TEXT NOT NULL, start_time INTEGER NOT NULL, end_time INTEGER NOT NULL);
+    CREATE TABLE quotes (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,
+        timestamp INTEGER NOT NULL, bid REAL NOT NULL, ask REAL NOT NULL,
+        FOREIGN KEY(session_id) REFERENCES sessions(session_id), UNIQUE(session_id, timestamp));
+    """)
+    rng = random.Random(42)
+    start = 1_700_000_000_000
+    for n in range(sessions):
+        broker, symbol = BROKERS[n % len(BROKERS)], SYMBOLS[(n // len(BROKERS)) % len(SYMBOLS)]
+        session_id = f"s{n}"
+        ts = start + n * 3_600_000
+        rows = []
+        for _ in range(ticks):
+            ts += rng.randint(10, 500)
+            bid = 1.1 + rng.random() / 100
+            rows.append((session_id, ts, bid, bid + 0.0002))
+        conn.execute("INSERT INTO sessions VALUES (?, ?, ?, 'bench', ?, ?)",
+                     (session_id, broker, symbol, rows[0][1], rows[-1][1]))
+        conn.executemany("INSERT INTO quotes (session_id, timestamp, bid, ask) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def timed(label, fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    print(f"{label:<40} {best * 1000:9.2f} ms")
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    path = os.path.join(tempfile.mkdtemp(), "bench_quotes.db")
+    build_v0_database(path, sessions, ticks)
+    print(f"{sessions} sessions x {ticks} ticks -> {path}")
+
+    window = (1_700_000_000_000, 1_700_000_000_000 + 6 * 3_600_000)
+    conn = sqlite3.connect(path)
+    print("-- before migration")
+    timed("get_data (limit 1000)", lambda: conn.execute(
+        OLD_GET_DATA, ("BrokerA", "EURUSD", "BrokerB", "EURUSD", 1000)).fetchall())
+    timed("fetch_quotes (6h window)", lambda: conn.execute(
+        OLD_FETCH_QUOTES, ("BrokerA", "EURUSD", *window)).fetchall())
+    conn.close()
+
+    t0 = time.perf_counter()
+    db = QuoteDatabase(path)
+    print(f"-- migration took {time.perf_counter() - t0:.2f} s")
+    timed("get_data (limit 1000)", lambda: db.conn.execute(
+        NEW_GET_DATA, ("BrokerA", "EURUSD", 1000, "BrokerB", "EURUSD", 1000, 1000)).fetchall())
+    timed("fetch_quotes (6h window)", lambda: db.conn.execute(
+        NEW_FETCH_QUOTES, ("BrokerA", "EURUSD", *window)).fetchall())
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Compare the chunked pandas CSV parser with the row-by-row csv fallback (iter_csv_member).
+
+Usage (from Quote_Manager_server/): python benchmarks/bench_parsers.py [ticks]
+"""
+import io
+import os
+import sys
+import time
+import random
+import logging
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from ingest import iter_csv_member, PARSERS
+
+logging.disable(logging.ERROR)  # the dirty archive has bad rows injected on purpose
+
+
+def build_archive(ticks, bad_every=None):
+    rng = random.Random(7)
+    buf = io.StringIO()
+    buf.write("Ts,Bid,Ask\n")
+    ts, price = 1_700_000_000_000, 1.1
+    for n in range(ticks):
+        ts += rng.randint(10, 500)
+        price += rng.gauss(0, 1e-4)
+        if bad_every and n % bad_every == 0:
+            buf.write("bad,row,here\n")
+        buf.write(f"{ts},{price:.5f},{price + 0.0002:.5f}\n")
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("Bench_EURUSD_session.csv", buf.getvalue())
+    return data
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"{ticks} ticks")
+    for label, bad_every in (("clean", None), ("dirty", 100_000)):
+        data = build_archive(ticks, bad_every)
+        for parser in PARSERS:
+            with zipfile.ZipFile(data) as zf:
+                t0 = time.perf_counter()
+                rows = sum(len(chunk) for chunk in iter_csv_member(zf, "Bench_EURUSD_session.csv", parser))
+                elapsed = time.perf_counter() - t0
+            print(f"{label:<6} {parser:<8} {elapsed:7.2f} s  {rows / elapsed:12,.0f} rows/s  ({rows} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare disk size and read speed of SQLite-only storage with closed sessions in Parquet.
+
+Usage (from Quote_Manager_server/): python benchmarks/bench_storage.py [sessions] [ticks_per_session]
+Needs pyarrow.
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import logging
+logging.disable(logging.INFO)
+from quote_db import QuoteDatabase
+
+INSTRUMENTS = [("BrokerA", "EURUSD"), ("BrokerB", "EURUSD")]
+START = 1_700_000_000_000
+
+
+def build_database(path, sessions, ticks):
+    """One session per instrument per day, random-walk ticks every 10-500 ms."""
+    db = QuoteDatabase(path)
+    rng = random.Random(42)
+    for n in range(sessions):
+        broker, symbol = INSTRUMENTS[n % len(INSTRUMENTS)]
+        ts = START + (n // len(INSTRUMENTS)) * 86_400_000
+        bid = 1.1
+        quotes = []
+        for _ in range(ticks):
+            ts += rng.randint(10, 500)
+            bid += rng.gauss(0, 1e-5)
+            quotes.append((ts, round(bid, 5), round(bid + 0.0002, 5)))
+        db.insert_quotes_stream(f"{broker}{n}", [quotes], session_info=(broker, symbol, "bench.zip"))
+    db.bump_data_version()
+    db.conn.execute("VACUUM")
+    db.close()
+
+
+def timed(label, fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    print(f"{label:<40} {best * 1000:9.2f} ms")
+
+
+def run_reads(db, window):
+    timed("get_series (full range)", lambda: db.get_series("BrokerA", "EURUSD"))
+    timed("get_series (1h window)", lambda: db.get_series("BrokerA", "EURUSD", *window))
+    timed("fetch_quotes (1h window)", lambda: db.fetch_quotes("BrokerA", "EURUSD", *window))
+    timed("get_data (limit 1000)", lambda: db.get_data("BrokerA", "EURUSD", "BrokerB", "EURUSD", 1000))
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    workdir = tempfile.mkdtemp()
+    sqlite_path = os.path.join(workdir, "sqlite_only.db")
+    build_database(sqlite_path, sessions, ticks)
+    print(f"{sessions} sessions x {ticks} ticks in {workdir}")
+    window = (START + 86_400_000 + 3_600_000, START + 86_400_000 + 2 * 3_600_000)
+
+    print(f"-- SQLite only: {os.path.getsize(sqlite_path) / 1e6:.1f} MB")
+    db = QuoteDatabase(sqlite_path, read_only=True)
+    run_reads(db, window)
+    db.close()
+
+    parquet_db = os.path.join(workdir, "with_parquet.db")
+    parquet_dir = os.path.join(workdir, "parquet")
+    shutil.copy(sqlite_path, parquet_db)
+    db = QuoteDatabase(parquet_db, parquet_dir=parquet_dir)
+    t0 = time.perf_counter()
+    db.archive_closed_sessions(closed_before=2 ** 62)
+    archive_seconds = time.perf_counter() - t0
+    db.conn.execute("VACUUM")
+    db.close()
+    parquet_bytes = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(parquet_dir) for f in fs)
+    print(f"-- Parquet: {parquet_bytes / 1e6:.1f} MB of Parquet + {os.path.getsize(parquet_db) / 1e6:.1f} MB "
+          f"of SQLite metadata/rollups (archiving took {archive_seconds:.1f} s)")
+    db = QuoteDatabase(parquet_db, read_only=True, parquet_dir=parquet_dir)
+    run_reads(db, window)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Compare two run_suite.py result files case by case.
+
+Usage (from Quote_Manager_server/): python benchmarks/compare_results.py OLD.json NEW.json [--threshold 0.1] [--fail]
+
+Timed cases compare median ms, ingest cases compare rows/s. A change beyond the
+threshold is marked; with --fail the exit status is 1 if anything got slower.
+"""
+import sys
+import json
+import argparse
+
+
+def score(stats):
+    """(value, higher_is_better, unit) for one case."""
+    if "median_ms" in stats:
+        return stats["median_ms"], False, "ms"
+    return stats["rows_per_s"], True, "rows/s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change treated as significant")
+    parser.add_argument("--fail", action="store_true", help="Exit 1 when a case regressed past the threshold")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    print(f"old: {old['git']['commit']} ({old['created']})")
+    print(f"new: {new['git']['commit']} ({new['created']})")
+    if old["params"] != new["params"] or old["environment"] != new["environment"]:
+        print("warning: parameters or environment differ, results may not be comparable")
+
+    regressions = 0
+    for name in sorted(old["results"].keys() & new["results"].keys()):
+        before, higher_is_better, unit = score(old["results"][name])
+        after, _, _ = score(new["results"][name])
+        change = (after - before) / before if before else 0.0
+        worse = -change if higher_is_better else change
+        mark = ""
+        if worse > args.threshold:
+            mark, regressions = "SLOWER", regressions + 1
+        elif worse < -args.threshold:
+            mark = "faster"
+        print(f"{name:<36} {before:12.2f} -> {after:12.2f} {unit:<6} {change:+7.1%} {mark}")
+    for name in sorted(old["results"].keys() ^ new["results"].keys()):
+        print(f"{name:<36} only in {'old' if name in old['results'] else 'new'}")
+    return 1 if args.fail and regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
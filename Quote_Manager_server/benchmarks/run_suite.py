@@ -0,0 +1,234 @@
+"""Benchmark suite over a synthetic dataset; writes machine-readable results to compare across commits.
+
+Times ingestion throughput (sequential and parallel), QuoteDatabase.fetch_quotes over
+growing ranges, keyset pages near the start and end of a range, QuoteDatabase/QuoteService.get_data,
+get_newest_series, and the metadata, /api/data and /api/multi routes through FastAPI's
+TestClient (response cache disabled, plus one cached case).
+
+Usage (from Quote_Manager_server/):
+    python benchmarks/run_suite.py [--sessions 5] [--ticks-per-second 2] [--brokers A B] [--symbols EURUSD]
+        [--repeat 5] [--workers 2] [--workdir DIR] [--output results.json]
+    python benchmarks/compare_results.py OLD.json NEW.json
+
+Results default to benchmarks/results/<commit>-<time>.json. Every case records min,
+median, mean and max milliseconds over --repeat runs after one warm-up run.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import logging
+logging.disable(logging.WARNING)
+import numpy as np
+import pandas as pd
+from synthetic_archives import generate_archives, DAY_MS
+from quote_db import QuoteDatabase
+from quote_service import QuoteService
+from ingest import ingest_zip_archive, ingest_archives_parallel
+
+RESULTS_FORMAT = 1
+HOUR_MS = 3_600_000
+
+
+def measure(fn, repeat):
+    """Run fn once to warm up, then repeat times; returns timing stats in ms."""
+    fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {"min_ms": min(times), "median_ms": statistics.median(times), "mean_ms": statistics.fmean(times),
+            "max_ms": max(times), "runs": repeat}
+
+
+def git_info():
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "HEAD"), "branch": git("rev-parse", "--abbrev-ref", "HEAD"),
+            "dirty": bool(status) if status is not None else None}
+
+
+def environment():
+    import fastapi
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "numpy": np.__version__, "pandas": pd.__version__, "fastapi": fastapi.__version__}
+
+
+def fresh_database(path: Path) -> QuoteDatabase:
+    # A database left by an earlier run would make the ingest manifest skip every member
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+    return QuoteDatabase(str(path))
+
+
+def bench_ingest(archives, workdir, workers):
+    """Load every archive into a fresh database, once sequentially and once with a process pool."""
+    results = {}
+    path = workdir / "ingest_sequential.db"
+    db = fresh_database(path)
+    t0 = time.perf_counter()
+    rows = sum(ingest_zip_archive(str(archive), db) for archive in archives)
+    seconds = time.perf_counter() - t0
+    db.close()
+    results["ingest.sequential"] = {"seconds": seconds, "rows": rows, "rows_per_s": rows / seconds}
+
+    if workers > 1:
+        parallel_path = workdir / "ingest_parallel.db"
+        db = fresh_database(parallel_path)
+        t0 = time.perf_counter()
+        ingest_archives_parallel([str(a) for a in archives], db, workers=workers)
+        seconds = time.perf_counter() - t0
+        parallel_rows = db.conn.execute("SELECT COUNT(*) FROM quotes").fetchone()[0]
+        db.close()
+        results[f"ingest.parallel_{workers}"] = {"seconds": seconds, "rows": parallel_rows,
+                                                 "rows_per_s": parallel_rows / seconds}
+    return path, results
+
+
+def bench_queries(db_path, brokers, symbols, repeat):
+    results = {}
+    db = QuoteDatabase(str(db_path), read_only=True)
+    service = QuoteService(db)
+    broker, symbol = brokers[0], symbols[0]
+    first, _ = db.get_instrument_bounds(broker, symbol)
+    for label, span in (("1h", HOUR_MS), ("6h", 6 * HOUR_MS), ("1d", DAY_MS), ("all", None)):
+        end_time = first + span if span is not None else None
+        rows = len(db.fetch_quotes(broker, symbol, start_time=first, end_time=end_time))
+        results[f"db.fetch_quotes.{label}"] = {
+            **measure(lambda: db.fetch_quotes(broker, symbol, start_time=first, end_time=end_time), repeat),
+            "rows": rows}
+
+    # Keyset pages from the start and from near the end of the instrument should cost the same
+    keys = sorted(row[:2] for row in db.fetch_quotes(broker, symbol))
+    for label, after in (("first", None), ("last", keys[max(len(keys) - 10_001, 0)])):
+        results[f"db.fetch_quotes_page.{label}_10000"] = measure(
+            lambda: db.fetch_quotes_page(broker, symbol, after=after, limit=10_000), repeat)
+
+    other = brokers[1] if len(brokers) > 1 else broker
+    for limit in (1000, 100_000):
+        results[f"db.get_data.limit_{limit}"] = measure(
+            lambda: db.get_data(broker, symbol, other, symbol, limit=limit), repeat)
+    results["service.get_data.limit_1000"] = measure(
+        lambda: service.get_data(broker, symbol, other, symbol, limit=1000), repeat)
+    instruments = [(b, s) for b in brokers for s in symbols]
+    results["db.get_newest_series.limit_1000"] = measure(lambda: db.get_newest_series(instruments, 1000), repeat)
+    db.close()
+    return results
+
+
+def bench_http(db_path, brokers, symbols, repeat):
+    """Routes through TestClient against an app whose lifespan opens db_path."""
+    os.environ["QUOTES_DB_PATH"] = str(db_path)
+    os.environ["QUOTES_STREAM_POLL_SECONDS"] = "3600"
+    from fastapi.testclient import TestClient
+    from response_cache import ResponseCache
+    from api_main import app
+
+    results = {}
+    broker, symbol = brokers[0], symbols[0]
+    other = brokers[1] if len(brokers) > 1 else broker
+    with TestClient(app) as client:
+        app.state.response_cache = ResponseCache(max_entries=0)  # time the work, not the cache
+
+        def timed(name, method, url, **kwargs):
+            response = client.request(method, f"/api/quotes{url}", **kwargs)
+            response.raise_for_status()
+            results[name] = {**measure(lambda: client.request(method, f"/api/quotes{url}", **kwargs), repeat),
+                             "bytes": len(response.content)}
+
+        date = client.post("/api/quotes/dates", json={"broker": broker, "symbol": symbol}).json()["dates"][0]
+        timed("http.brokers", "GET", "/brokers")
+        timed("http.brokers_symbols", "GET", "/brokers&symbols")
+        timed("http.symbols", "POST", "/symbols", json={"broker": broker})
+        timed("http.dates", "POST", "/dates", json={"broker": broker, "symbol": symbol})
+        timed("http.sessions", "POST", "/sessions", json={"broker": broker, "symbol": symbol, "date": date})
+
+        pair = {"broker_a": broker, "symbol_a": symbol, "broker_b": other, "symbol_b": symbol}
+        timed("http.api_data.rows_1000", "GET", "/api/data", params={**pair, "limit": 1000})
+        timed("http.api_data.rows_50000", "GET", "/api/data", params={**pair, "limit": 50_000})
+        timed("http.api_data.columns_50000", "GET", "/api/data", params={**pair, "limit": 50_000, "format": "columns"})
+        timed("http.api_data.packed_50000", "GET", "/api/data", params={**pair, "limit": 50_000},
+              headers={"Accept": "application/x-quote-columns"})
+        timed("http.api_data.lttb_2000", "GET", "/api/data", params={**pair, "downsample": "lttb", "points": 2000})
+        multi = [("instrument", f"{b}:{s}") for b in brokers for s in symbols]
+        timed("http.api_multi.limit_1000", "GET", "/api/multi", params=multi + [("limit", 1000)])
+        timed("http.api_multi.aligned_2000", "GET", "/api/multi",
+              params=multi + [("downsample", "lttb"), ("points", 2000), ("align", "true")])
+
+        app.state.response_cache = ResponseCache()
+        timed("http.api_data.rows_1000_cached", "GET", "/api/data", params={**pair, "limit": 1000})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and write JSON results")
+    parser.add_argument("--brokers", nargs="+", default=["BrokerA", "BrokerB"])
+    parser.add_argument("--symbols", nargs="+", default=["EURUSD"])
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--ticks-per-second", type=float, default=2.0)
+    parser.add_argument("--session-hours", type=float, default=8.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2, help="Process pool size for the parallel ingest case; 1 skips it")
+    parser.add_argument("--workdir", help="Keep generated archives and databases here (reused across runs)")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/<commit>-<time>.json)")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="quote-bench-"))
+    archive_dir = workdir / "archives"
+    params = {"brokers": args.brokers, "symbols": args.symbols, "sessions": args.sessions,
+              "ticks_per_second": args.ticks_per_second, "session_hours": args.session_hours, "seed": args.seed}
+    archives = generate_archives(archive_dir, **params)
+    print(f"{len(archives)} archives in {archive_dir}")
+
+    db_path, results = bench_ingest(archives, workdir, args.workers)
+    results.update(bench_queries(db_path, args.brokers, args.symbols, args.repeat))
+    results.update(bench_http(db_path, args.brokers, args.symbols, args.repeat))
+
+    git = git_info()
+    report = {
+        "format": RESULTS_FORMAT,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": git,
+        "environment": environment(),
+        "params": {**params, "repeat": args.repeat, "workers": args.workers},
+        "dataset": {"archives": len(archives), "archive_bytes": sum(a.stat().st_size for a in archives),
+                    "rows": results["ingest.sequential"]["rows"]},
+        "results": results,
+    }
+    if args.output:
+        output = Path(args.output)
+    else:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = Path(__file__).parent / "results" / f"{(git['commit'] or 'nogit')[:10]}-{stamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    for name, stats in results.items():
+        if "median_ms" in stats:
+            print(f"{name:<36} {stats['median_ms']:10.2f} ms")
+        else:
+            print(f"{name:<36} {stats['rows_per_s']:10.0f} rows/s")
+    print(f"Results written to {output}")
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Deterministic synthetic quote archives in the layout ingest expects.
+
+One archive per session day, synthetic_<YYYYMMDD>.zip, holding a
+<Broker>_<Symbol>_<session>.csv member (Ts,Bid,Ask) per broker and symbol. Brokers
+quote the same random walk per symbol, each with its own delay, noise and spread, so
+cross-broker views look realistic. The same arguments always produce byte-identical
+archives (member timestamps are fixed too, so the ingest manifest sees them as unchanged).
+
+Usage (from Quote_Manager_server/):
+    python benchmarks/synthetic_archives.py OUT_DIR [--brokers A B] [--symbols EURUSD USDJPY]
+        [--sessions 5] [--ticks-per-second 2] [--session-hours 8] [--seed 42]
+"""
+import io
+import os
+import sys
+import json
+import zipfile
+import argparse
+from pathlib import Path
+from typing import List, Sequence
+import numpy as np
+import pandas as pd
+
+START = 1_700_000_000_000  # 2023-11-14 22:13:20 UTC; sessions start at midnight UTC of the following days
+DAY_MS = 86_400_000
+BASE_PRICES = {"EURUSD": 1.08, "GBPUSD": 1.26, "USDJPY": 149.5, "XAUUSD": 1980.0}
+MEMBER_DATE_TIME = (2024, 1, 1, 0, 0, 0)
+
+
+def _decimals(price: float) -> int:
+    return 5 if price < 10 else 3 if price < 1000 else 2
+
+
+def session_frame(rng: np.random.Generator, walk: np.ndarray, session_start: int, ticks_per_second: float,
+                  delay_ms: int, spread: float, noise: float) -> pd.DataFrame:
+    """One broker's ticks for one session: Poisson arrivals sampling the shared 10 ms walk."""
+    duration_ms = len(walk) * 10
+    n = rng.poisson(ticks_per_second * duration_ms / 1000)
+    offsets = np.unique(rng.integers(delay_ms, duration_ms, n))
+    mid = walk[(offsets - delay_ms) // 10] + rng.normal(0, noise, len(offsets))
+    half = spread * rng.choice([0.5, 0.6, 0.75, 1.0], len(offsets), p=[0.4, 0.3, 0.2, 0.1])
+    return pd.DataFrame({"Ts": session_start + offsets, "Bid": mid - half, "Ask": mid + half})
+
+
+def generate_archives(out_dir, brokers: Sequence[str] = ("BrokerA", "BrokerB"), symbols: Sequence[str] = ("EURUSD",),
+                      sessions: int = 5, ticks_per_second: float = 2.0, session_hours: float = 8.0,
+                      seed: int = 42) -> List[Path]:
+    """Write one archive per session into out_dir and return their paths.
+
+    Skips the work when out_dir already holds archives generated with the same parameters.
+    """
+    out_dir = Path(out_dir)
+    params = {"brokers": list(brokers), "symbols": list(symbols), "sessions": sessions,
+              "ticks_per_second": ticks_per_second, "session_hours": session_hours, "seed": seed}
+    manifest_path = out_dir / "synthetic.json"
+    if manifest_path.exists() and json.loads(manifest_path.read_text())["params"] == params:
+        return [out_dir / name for name in json.loads(manifest_path.read_text())["archives"]]
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths, rows = [], 0
+    steps = int(session_hours * 3600 * 100)  # 10 ms resolution
+    for s in range(sessions):
+        session_start = (START // DAY_MS + 1 + s) * DAY_MS
+        day = pd.Timestamp(session_start, unit="ms").strftime("%Y%m%d")
+        path = out_dir / f"synthetic_{day}.zip"
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for j, symbol in enumerate(symbols):
+                base = BASE_PRICES.get(symbol, 1.0)
+                walk_rng = np.random.default_rng([seed, s, j])
+                walk = base * np.exp(np.cumsum(walk_rng.normal(0, 2e-6, steps)))
+                for i, broker in enumerate(brokers):
+                    rng = np.random.default_rng([seed, s, j, i + 1])
+                    df = session_frame(rng, walk, session_start, ticks_per_second, delay_ms=i * 150,
+                                       spread=base * 1e-4 * (1 + i * 0.5), noise=base * 2e-6)
+                    buf = io.StringIO()
+                    df.to_csv(buf, index=False, float_format=f"%.{_decimals(base)}f")
+                    # Session ids are global keys, and ingest splits member names on "_"
+                    info = zipfile.ZipInfo(f"{broker}_{symbol}_{broker}-{symbol}-{day}.csv", MEMBER_DATE_TIME)
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    zf.writestr(info, buf.getvalue())
+                    rows += len(df)
+        paths.append(path)
+    manifest_path.write_text(json.dumps({"params": params, "archives": [p.name for p in paths], "rows": rows},
+                                        indent=2))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write deterministic synthetic quote archives")
+    parser.add_argument("out_dir")
+    parser.add_argument("--brokers", nargs="+", default=["BrokerA", "BrokerB"])
+    parser.add_argument("--symbols", nargs="+", default=["EURUSD"])
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--ticks-per-second", type=float, default=2.0)
+    parser.add_argument("--session-hours", type=float, default=8.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    paths = generate_archives(args.out_dir, args.brokers, args.symbols, args.sessions, args.ticks_per_second,
+                              args.session_hours, args.seed)
+    total = sum(os.path.getsize(p) for p in paths)
+    print(f"{len(paths)} archives, {total / 1e6:.1f} MB in {args.out_dir}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from quote_db import QuoteDatabase
+
+logger = logging.getLogger(__name__)
+
+class QuoteDatabasePool:
+    """A fixed set of read-only QuoteDatabase handles plus one writer, opened once per app."""
+
+    def __init__(self, db_path="quotes.db", readers=4, pragmas=None, parquet_dir=None):
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self.parquet_dir = parquet_dir
+        # The writer is opened first so the schema exists before any read-only connection
+        self.writer = QuoteDatabase(db_path, pragmas=pragmas, parquet_dir=parquet_dir)
+        self._write_lock = threading.Lock()
+        self._readers = queue.Queue()
+        for _ in range(readers):
+            self._readers.put(QuoteDatabase(db_path, read_only=True, pragmas=pragmas, parquet_dir=parquet_dir))
+        logger.info(f"Opened database pool for {db_path}: {readers} readers, 1 writer")
+
+    @contextmanager
+    def reader(self):
+        db = self._readers.get()
+        try:
+            yield db
+        finally:
+            job, db.in_flight = db.in_flight, None
+            if job is None:
+                self._readers.put(db)
+            else:
+                # An abandoned, interrupted query still holds the connection; hand it back once it lets go
+                job.add_done_callback(lambda _: self._readers.put(db))
+
+    def open_reader(self) -> QuoteDatabase:
+        """A read-only handle outside the pool, for long reads like exports; the caller closes it."""
+        return QuoteDatabase(self.db_path, read_only=True, pragmas=self.pragmas, parquet_dir=self.parquet_dir)
+
+    @contextmanager
+    def write(self):
+        with self._write_lock:
+            yield self.writer
+
+    def close(self):
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+        self.writer.close()
+        logger.info(f"Closed database pool for {self.db_path}")
@@ -0,0 +1,13 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # optional speed-up, stdlib json is the fallback
+    orjson = None
+
+
+def dumps(payload) -> bytes:
+    """Serialise plain Python data (dicts/lists/floats/None) to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), allow_nan=False).encode("utf-8")
@@ -0,0 +1,327 @@
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; writers are then only serialised within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Per-tick arrays kept for each instrument; session ids are stored as an index into meta["sessions"]
+ARRAYS = {"ts": np.int64, "bid": np.float64, "ask": np.float64, "session": np.int32}
+BYTES_PER_TICK = sum(np.dtype(dtype).itemsize for dtype in ARRAYS.values())
+MIN_CAPACITY = 64 * 1024
+
+class _Series:
+    """One instrument's memory-mapped arrays as of one meta.json snapshot."""
+
+    def __init__(self, directory: Path, meta: dict, meta_stamp: Tuple[int, int]):
+        self.directory = directory
+        self.meta = meta
+        self.meta_stamp = meta_stamp
+        generation = meta["generation"]
+        self.arrays = {name: np.lib.format.open_memmap(directory / f"{generation}.{name}.npy", mode="r+")
+                       for name in ARRAYS}
+
+    @property
+    def count(self) -> int:
+        return self.meta["count"]
+
+    @property
+    def nbytes(self) -> int:
+        # Slots past the count are never written, so they take no pages; only the ticks count
+        return self.meta["count"] * BYTES_PER_TICK
+
+class HotSeriesCache:
+    """Per-instrument tick arrays (int64 ts, float64 bid/ask), memory-mapped from disk.
+
+    Files live in root/<broker>/<symbol>/ as <generation>.<array>.npy plus a meta.json
+    holding the row count, so they survive restarts and every uvicorn worker maps the same
+    pages. Arrays are sorted by timestamp and over-allocated: appends write past the count
+    and then publish the new count, so readers never see a partial tick. Range queries are
+    two searchsorted calls. Instruments are evicted least recently used once the ticks they
+    hold pass budget_bytes.
+
+    The cache follows the database's data_version. When it moves, an instrument is caught up
+    by appending the ticks newer than its last one. It is rebuilt instead when an ingest since
+    its version may have rewritten ticks it already holds (QuoteDatabase.rewritten_since), or
+    when the row count then disagrees with the database (older ticks were inserted or removed).
+    """
+
+    def __init__(self, root, budget_bytes: int = 512 * 1024 * 1024):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.budget_bytes = budget_bytes
+        self._series: "OrderedDict[Tuple[str, str], _Series]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._instrument_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._oversized = set()  # instruments bigger than the whole budget are always read from the database
+        self._stats = {"hits": 0, "refreshes": 0, "rebuilds": 0, "evictions": 0, "bypassed": 0}
+
+    def _directory(self, broker: str, symbol: str) -> Path:
+        return self.root / broker / symbol
+
+    @contextmanager
+    def _write_lock(self, broker: str, symbol: str):
+        """Serialise writers to one instrument across threads and (where fcntl exists) processes."""
+        with self._lock:
+            thread_lock = self._instrument_locks.setdefault((broker, symbol), threading.Lock())
+        directory = self._directory(broker, symbol)
+        with thread_lock:
+            directory.mkdir(parents=True, exist_ok=True)
+            with open(directory / ".lock", "w") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+
+    @staticmethod
+    def _meta_stamp(directory: Path) -> Optional[Tuple[int, int]]:
+        # meta.json is always replaced, never rewritten, so a new inode means a new snapshot
+        try:
+            stat = (directory / "meta.json").stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    @classmethod
+    def _read_meta(cls, directory: Path) -> Tuple[Optional[dict], Optional[Tuple[int, int]]]:
+        try:
+            stamp = cls._meta_stamp(directory)
+            with open(directory / "meta.json") as f:
+                return json.load(f), stamp
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None, None
+
+    @staticmethod
+    def _write_meta(directory: Path, meta: dict):
+        tmp_path = directory / "meta.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, directory / "meta.json")
+
+    def _open(self, broker: str, symbol: str) -> Optional[_Series]:
+        """The mapped series for an instrument, reopened if any process published a new meta.json."""
+        directory = self._directory(broker, symbol)
+        with self._lock:
+            series = self._series.get((broker, symbol))
+        stamp = self._meta_stamp(directory)
+        if series is not None and series.meta_stamp == stamp:
+            return series
+        meta, stamp = self._read_meta(directory) if stamp is not None else (None, None)
+        if meta is None:
+            with self._lock:
+                self._series.pop((broker, symbol), None)
+            return None
+        try:
+            if series is not None and series.meta["generation"] == meta["generation"]:
+                # Same files, larger count: within a generation the count only ever grows
+                series.meta, series.meta_stamp = meta, stamp
+            else:
+                series = _Series(directory, meta, stamp)
+        except (FileNotFoundError, KeyError):
+            return None  # a writer replaced the generation (or evicted it) while we were opening
+        with self._lock:
+            self._series[(broker, symbol)] = series
+        return series
+
+    def _capacity(self, count: int) -> int:
+        """Room for count ticks plus headroom to append into, without growing past the whole budget."""
+        return max(count, min(max(MIN_CAPACITY, 2 * count), self.budget_bytes // BYTES_PER_TICK))
+
+    def _write_generation(self, directory: Path, meta: dict, arrays: Dict[str, np.ndarray], capacity: int):
+        """Write arrays into fresh files sized for capacity and publish them as the next generation."""
+        generation = meta.get("generation", 0) + 1
+        count = len(arrays["ts"])
+        for name, dtype in ARRAYS.items():
+            mapped = np.lib.format.open_memmap(directory / f"{generation}.{name}.npy", mode="w+",
+                                               dtype=dtype, shape=(capacity,))
+            mapped[:count] = arrays[name]
+            mapped.flush()
+        old_generation = meta.get("generation")
+        meta.update(generation=generation, capacity=capacity, count=count)
+        self._write_meta(directory, meta)
+        # Readers that still map the old files keep them alive until they reopen
+        if old_generation is not None:
+            for name in ARRAYS:
+                (directory / f"{old_generation}.{name}.npy").unlink(missing_ok=True)
+
+    def _rebuild(self, db, broker: str, symbol: str, version: int):
+        """Load the whole instrument from the database into a new generation."""
+        directory = self._directory(broker, symbol)
+        df = db.get_series(broker, symbol)
+        sessions = list(dict.fromkeys(df["session_id"]))
+        arrays = {
+            "ts": df["timestamp"].to_numpy(dtype=np.int64),
+            "bid": df["bid"].to_numpy(dtype=np.float64),
+            "ask": df["ask"].to_numpy(dtype=np.float64),
+            "session": pd.Categorical(df["session_id"], categories=sessions).codes.astype(np.int32),
+        }
+        meta, _ = self._read_meta(directory)
+        meta = {**(meta or {}), "sessions": sessions, "data_version": version}
+        self._write_generation(directory, meta, arrays, self._capacity(len(df)))
+        with self._lock:
+            self._stats["rebuilds"] += 1
+        logger.info(f"Built hot series for {broker}/{symbol}: {len(df)} ticks")
+
+    def _append(self, series: _Series, df: pd.DataFrame, version: int):
+        meta = {**series.meta, "data_version": version}
+        sessions = list(meta["sessions"])
+        index = {session_id: i for i, session_id in enumerate(sessions)}
+        for session_id in dict.fromkeys(df["session_id"]):
+            if session_id not in index:
+                index[session_id] = len(sessions)
+                sessions.append(session_id)
+        meta["sessions"] = sessions
+        new = {
+            "ts": df["timestamp"].to_numpy(dtype=np.int64),
+            "bid": df["bid"].to_numpy(dtype=np.float64),
+            "ask": df["ask"].to_numpy(dtype=np.float64),
+            "session": df["session_id"].map(index).to_numpy(dtype=np.int32),
+        }
+        count, total = series.count, series.count + len(df)
+        if total > meta["capacity"]:
+            arrays = {name: np.concatenate([series.arrays[name][:count], new[name]]) for name in ARRAYS}
+            self._write_generation(series.directory, meta, arrays, self._capacity(total))
+            return
+        # Fill the slots past the published count first, then publish the new count
+        for name in ARRAYS:
+            series.arrays[name][count:total] = new[name]
+            series.arrays[name].flush()
+        meta["count"] = total
+        self._write_meta(series.directory, meta)
+
+    def refresh(self, db, broker: str, symbol: str):
+        """Bring one instrument in line with the database: append newer ticks, or rebuild."""
+        version = db.get_data_version()
+        with self._write_lock(broker, symbol):
+            series = self._open(broker, symbol)
+            if series is not None and series.meta["data_version"] == version:
+                return
+            expected = db.count_quotes(broker, symbol)
+            if series is None or series.count > expected:
+                self._rebuild(db, broker, symbol, version)
+                return
+            last_ts = int(series.arrays["ts"][series.count - 1]) if series.count else None
+            rewritten = db.rewritten_since(broker, symbol, series.meta["data_version"])
+            if rewritten is not None and last_ts is not None and rewritten <= last_ts:
+                self._rebuild(db, broker, symbol, version)
+                return
+            newer = db.get_series(broker, symbol, start_time=last_ts + 1 if last_ts is not None else None)
+            if series.count + len(newer) != expected:
+                self._rebuild(db, broker, symbol, version)
+                return
+            if len(newer):
+                self._append(series, newer, version)
+            else:
+                self._write_meta(series.directory, {**series.meta, "data_version": version})
+            with self._lock:
+                self._stats["refreshes"] += 1
+
+    def refresh_cached(self, db):
+        """Refresh every instrument that has files in the cache directory, e.g. right after an ingest."""
+        for meta_path in self.root.glob("*/*/meta.json"):
+            self.refresh(db, meta_path.parent.parent.name, meta_path.parent.name)
+
+    def _evict(self, keep: Tuple[str, str]) -> List[Tuple[str, str]]:
+        """Unmap least recently used instruments until within budget; caller holds _lock.
+
+        Returns the evicted instruments, whose files the caller removes with _drop_files
+        once _lock is released.
+        """
+        total = sum(series.nbytes for series in self._series.values())
+        evicted = []
+        for key in list(self._series):
+            if total <= self.budget_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self._series.pop(key).nbytes
+            evicted.append(key)
+            self._stats["evictions"] += 1
+            logger.info(f"Evicted hot series {key[0]}/{key[1]}")
+        return evicted
+
+    def _drop_files(self, broker: str, symbol: str):
+        """Delete an instrument's generations and meta.json under its write lock; .lock stays for other processes."""
+        with self._write_lock(broker, symbol):
+            directory = self._directory(broker, symbol)
+            # Other workers mapping these files keep their pages; they rebuild on their next refresh
+            (directory / "meta.json").unlink(missing_ok=True)
+            for path in directory.glob("*.npy"):
+                path.unlink(missing_ok=True)
+
+    def _current(self, db, broker: str, symbol: str) -> Optional[_Series]:
+        """Open (building or catching up if needed) and mark as recently used; None if over budget."""
+        if (broker, symbol) in self._oversized or db.get_instrument_id(broker, symbol) is None:
+            with self._lock:
+                self._stats["bypassed"] += 1
+            return None
+        series = self._open(broker, symbol)
+        if series is None or series.meta["data_version"] != db.get_data_version():
+            self.refresh(db, broker, symbol)
+            series = self._open(broker, symbol)
+        with self._lock:
+            if series is None or series.nbytes > self.budget_bytes:
+                self._stats["bypassed"] += 1
+                if series is None:
+                    return None
+                self._oversized.add((broker, symbol))
+                self._series.pop((broker, symbol), None)
+                evicted = [(broker, symbol)]
+            else:
+                self._series[(broker, symbol)] = series
+                self._series.move_to_end((broker, symbol))
+                evicted = self._evict(keep=(broker, symbol))
+                self._stats["hits"] += 1
+        # The write locks are taken without _lock held: _write_lock itself takes _lock
+        for key in evicted:
+            self._drop_files(*key)
+        return None if (broker, symbol) in evicted else series
+
+    def get_series(self, db, broker: str, symbol: str, start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, tail: Optional[int] = None,
+                   head: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """Same frame as QuoteDatabase.get_series for [start_time, end_time], or None to fall back to it.
+
+        tail keeps only the newest `tail` rows of the range, head only the oldest `head`.
+        """
+        series = self._current(db, broker, symbol)
+        if series is None:
+            return None
+        count = series.count
+        ts = series.arrays["ts"][:count]
+        lo = int(np.searchsorted(ts, start_time, side="left")) if start_time is not None else 0
+        hi = int(np.searchsorted(ts, end_time, side="right")) if end_time is not None else count
+        if tail is not None:
+            lo = max(lo, hi - tail)
+        if head is not None:
+            hi = min(hi, lo + head)
+        sessions = np.asarray(series.meta["sessions"], dtype=object)
+        return pd.DataFrame({
+            "timestamp": np.array(ts[lo:hi]),
+            "bid": np.array(series.arrays["bid"][lo:hi]),
+            "ask": np.array(series.arrays["ask"][lo:hi]),
+            "session_id": sessions[series.arrays["session"][lo:hi]],
+        })
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "instruments": len(self._series),
+                "mapped_bytes": sum(series.nbytes for series in self._series.values()),
+                "budget_bytes": self.budget_bytes,
+                **self._stats,
+            }
+
+    def instruments(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return list(self._series)
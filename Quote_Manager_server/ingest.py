@@ -1,53 +1,359 @@
 import os
 import csv
+import math
+import time
+import itertools
+import queue
 import zipfile
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
 from quote_db import QuoteDatabase 
+from quote_metrics import METRICS, RATE_BUCKETS
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_BATCH_SIZE = 50_000
+DEFAULT_QUEUE_SIZE = 8
+PARSERS = ("pandas", "csv")
+DEFAULT_PARSER = "pandas"
+
 def extract_metadata_from_filename(filename):
     parts = filename.replace(".csv", "").split("_")
     broker, symbol, *_session_parts = parts
     session_id = "_".join(_session_parts)
     return broker, symbol, session_id
 
-def ingest_zip_archive(zip_path: str, db: QuoteDatabase):
+def member_fingerprint(info: zipfile.ZipInfo):
+    """(crc, size, mtime) of a ZIP member, straight from the archive's directory."""
+    return info.CRC, info.file_size, "%04d-%02d-%02d %02d:%02d:%02d" % info.date_time
+
+def plan_archive(zip_path: str, db: QuoteDatabase, force: bool = False):
+    """Return [(ZipInfo, status)] for the archive's CSV members.
+
+    status is 'new', 'changed' or 'unchanged' against the ingest manifest; with force
+    every member is reported as 'forced'.
+    """
     archive_name = os.path.basename(zip_path).replace(".zip", "")
+    plan = []
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for info in zip_ref.infolist():
+            if not info.filename.endswith(".csv"):
+                continue
+            recorded = db.get_ingested_member(archive_name, info.filename)
+            if force:
+                status = "forced"
+            elif recorded is None:
+                status = "new"
+            elif tuple(recorded) != member_fingerprint(info):
+                status = "changed"
+            else:
+                status = "unchanged"
+            plan.append((info, status))
+    return plan
+
+def plan_ingestion(zip_paths, db: QuoteDatabase, force: bool = False):
+    """Dry-run report: one dict per CSV member with archive, member, size and status."""
+    return [
+        {"archive": os.path.basename(str(zip_path)), "member": info.filename,
+         "size": info.file_size, "status": status}
+        for zip_path in zip_paths
+        for info, status in plan_archive(str(zip_path), db, force)
+    ]
+
+def iter_csv_member(zip_ref: zipfile.ZipFile, filename: str, parser: str = DEFAULT_PARSER,
+                    chunk_size: int = DEFAULT_BATCH_SIZE):
+    """Yield lists of at most chunk_size (timestamp, bid, ask) tuples without holding the whole file."""
+    if parser != "pandas":
+        with zip_ref.open(filename) as file:
+            rows = _iter_csv_rows(file)
+            while chunk := list(itertools.islice(rows, chunk_size)):
+                yield chunk
+        return
+
+    # Ts is parsed as int64 while it is clean; from the first chunk where it isn't, the member
+    # is read again with Ts as text (same chunk boundaries) and the chunks already sent are skipped
+    sent = 0
+    for ts_dtype in (None, str):
+        with zip_ref.open(filename) as file:
+            try:
+                reader = pd.read_csv(file, usecols=["Ts", "Bid", "Ask"], chunksize=chunk_size, engine="c",
+                                     on_bad_lines="warn", dtype={"Ts": ts_dtype} if ts_dtype else None)
+            except ValueError as e:
+                logger.warning(f"Missing column in {filename} -- {e}")
+                return
+            with reader:
+                for i, df in enumerate(reader):
+                    if i < sent:
+                        continue
+                    if ts_dtype is None and df["Ts"].dtype != np.int64:
+                        break
+                    yield _valid_quotes(df, filename)
+                    sent += 1
+                else:
+                    return
+
+# Ts must fit SQLite's INTEGER (int64); float64 holds every bound exactly
+TS_MIN, TS_MAX = -2.0 ** 63, 2.0 ** 63
+
+def _valid_quotes(df: pd.DataFrame, filename: str):
+    """Coerce Ts/Bid/Ask to numbers and return the rows where all three parsed and Ts is a whole int64.
 
+    An int64 Ts column is used as is; otherwise Ts was read as text and each value is parsed with
+    int() like the csv parser, so "1.0" is rejected and large values keep every digit. The float
+    coercion only sorts the rejected rows into unparseable and fractional/out-of-range.
+    """
+    bid = pd.to_numeric(df["Bid"], errors="coerce").to_numpy(dtype=np.float64)
+    ask = pd.to_numeric(df["Ask"], errors="coerce").to_numpy(dtype=np.float64)
+    numeric_ts = pd.to_numeric(df["Ts"], errors="coerce").to_numpy(dtype=np.float64)
+    parsed = np.isfinite(numeric_ts) & np.isfinite(bid) & np.isfinite(ask)
+    if df["Ts"].dtype == np.int64:
+        ts, whole = df["Ts"].to_numpy(), np.ones(len(df), dtype=bool)
+    else:
+        ts, whole = _whole_ts(df["Ts"])
+    bad_ts = parsed & ~whole
+    valid = parsed & whole
+    if not parsed.all():
+        bad = df[~parsed]
+        logger.error(f"Skipped {len(bad)} unparseable rows in {filename}, first: {bad.head(3).to_dict('records')}")
+    if bad_ts.any():
+        bad = df[bad_ts]
+        logger.error(f"Skipped {len(bad)} rows with a fractional or out-of-range Ts in {filename}, "
+                     f"first: {bad.head(3).to_dict('records')}")
+
+    return list(zip(ts[valid].tolist(), bid[valid].tolist(), ask[valid].tolist()))
+
+def _whole_ts(column: pd.Series):
+    """Parse Ts text with int() as the csv parser does; returns (int64 values, mask of values that parsed and fit)."""
+    ts = np.zeros(len(column), dtype=np.int64)
+    whole = np.zeros(len(column), dtype=bool)
+    for i, value in enumerate(column):
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            continue  # includes NaN for an empty field
+        if TS_MIN <= number < TS_MAX:
+            ts[i], whole[i] = number, True
+    return ts, whole
+
+def _iter_csv_rows(file):
+    reader = csv.DictReader((line.decode("utf-8") for line in file))
+    for row in reader:
+        try:
+            timestamp = int(row["Ts"])
+            bid = float(row["Bid"])
+            ask = float(row["Ask"])
+            if not TS_MIN <= timestamp < TS_MAX:
+                raise ValueError(f"Ts {timestamp} is out of range")
+            if not (math.isfinite(bid) and math.isfinite(ask)):
+                raise ValueError("Bid/Ask must be finite")
+            yield (timestamp, bid, ask)
+        except KeyError as e:
+            logger.warning(f"Missing column in row: {row} -- {e}")
+        except Exception as e:
+            logger.error(f"Error processing row: {row} -- {e}")
+
+def ingest_zip_archive(zip_path: str, db: QuoteDatabase, parser: str = DEFAULT_PARSER,
+                       batch_size: int = DEFAULT_BATCH_SIZE, force: bool = False) -> int:
+    """Ingest new or changed CSVs in one archive and return the number of quotes written."""
+    archive_name = os.path.basename(zip_path).replace(".zip", "")
+    total = 0
+    started = time.perf_counter()
+
+    plan = plan_archive(zip_path, db, force)
     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        for file_info in zip_ref.infolist():
-            if file_info.filename.endswith(".csv"):
-                logger.info(f"Processing CSV: {file_info.filename}")
-                with zip_ref.open(file_info.filename) as file: 
-                    broker, symbol, session_id = extract_metadata_from_filename(file_info.filename)
-                    reader = csv.DictReader((line.decode("utf-8") for line in file))
-                    quotes = []
-                    timestamps = []
-
-                    for row in reader:
-                        try:
-                            timestamp = int(row["Ts"])
-                            bid = float(row["Bid"])
-                            ask = float(row["Ask"])
-                            quotes.append((timestamp, bid, ask))
-                            timestamps.append(timestamp)
-                        except KeyError as e:
-                            logger.warning(f"Missing column in row: {row} -- {e}")
-                        except Exception as e:
-                            logger.error(f"Error processing row: {row} -- {e}")
-
-                    if quotes:
-                        logger.info(f"Parsed {len(quotes)} quotes for session {session_id}")
-
-                        start_time = min(timestamps)
-                        end_time = max(timestamps)
-                        if db.session_exists(session_id):
-                            logger.info(f"Session {session_id} already exists, skipping insertion.")
-                        else:
-                            db.insert_session((session_id, broker, symbol, archive_name, start_time, end_time))
-                        db.insert_quotes_bulk(session_id, quotes)
+        for file_info, status in plan:
+            if status == "unchanged":
+                logger.info(f"Skipping unchanged CSV: {file_info.filename}")
+                continue
+            logger.info(f"Processing CSV ({status}): {file_info.filename}")
+            broker, symbol, session_id = extract_metadata_from_filename(file_info.filename)
+            chunks = iter_csv_member(zip_ref, file_info.filename, parser, batch_size)
+            # A changed file replaces its session's rows rather than merging into them
+            count = db.insert_quotes_stream(session_id, chunks, session_info=(broker, symbol, archive_name),
+                                            replace=status in ("changed", "forced"))
+
+            if count:
+                logger.info(f"Loaded {count} quotes for session {session_id}")
+                db.refresh_rollups(session_id)
+                db.bump_data_version()
+                total += count
+            else:
+                logger.warning(f"No quotes parsed from file: {file_info.filename}")
+            db.record_ingested_member(archive_name, file_info.filename, member_fingerprint(file_info), count)
+    db.conn.commit()
+    seconds = time.perf_counter() - started
+    record_ingest_metrics(total, seconds)
+    logger.info(f"Ingestion completed for archive: {archive_name}: {total} rows in {seconds:.3f}s "
+                f"({total / seconds if seconds > 0 else 0:.0f} rows/s)")
+    return total
+
+def record_ingest_metrics(rows: int, seconds: float):
+    """Per-archive ingest throughput for /metrics; a no-op while metrics are disabled."""
+    METRICS.inc("quote_ingest_rows_total", rows)
+    METRICS.inc("quote_ingest_seconds_total", seconds)
+    if rows and seconds > 0:
+        METRICS.observe("quote_ingest_rows_per_second", rows / seconds, RATE_BUCKETS)
+
+# -------- Parallel ingestion --------
+# Worker processes stream CSV members and push batches onto one bounded queue; the
+# calling process is the only SQLite writer. The queue bound keeps memory flat when
+# parsing outruns the writer.
+
+_worker_queue = None
+_worker_abort = None
+
+# How long a worker blocks on a full queue before checking whether the writer gave up
+QUEUE_PUT_TIMEOUT = 0.5
+# After a failure, how long to wait for workers to notice before terminating them
+ABORT_GRACE_SECONDS = 10
+
+class _IngestAborted(Exception):
+    """The writer failed and set the abort flag; the worker stops without sending more."""
+
+def _init_worker(batch_queue, abort):
+    global _worker_queue, _worker_abort
+    _worker_queue = batch_queue
+    _worker_abort = abort
+
+def _put(message):
+    # A plain put() would block forever on a full queue once the writer stops reading
+    while True:
+        if _worker_abort.is_set():
+            raise _IngestAborted()
+        try:
+            _worker_queue.put(message, timeout=QUEUE_PUT_TIMEOUT)
+            return
+        except queue.Full:
+            continue
+
+def _parse_member_to_queue(zip_path: str, filename: str, batch_size: int, parser: str):
+    archive_name = os.path.basename(zip_path).replace(".zip", "")
+    try:
+        broker, symbol, session_id = extract_metadata_from_filename(filename)
+        parsed = 0
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            for chunk in iter_csv_member(zip_ref, filename, parser, batch_size):
+                if chunk:
+                    _put(("batch", zip_path, (session_id, (broker, symbol, archive_name), chunk)))
+                    parsed += len(chunk)
+        if not parsed:
+            logger.warning(f"No quotes parsed from file: {filename}")
+        _put(("done", zip_path, (filename, parsed, None)))
+    except _IngestAborted:
+        return
+    except Exception as e:
+        try:
+            _put(("done", zip_path, (filename, 0, f"{filename}: {e}")))
+        except _IngestAborted:
+            return
+
+def _abort_pool(pool: ProcessPoolExecutor, futures, batch_queue, abort):
+    """Stop a pool whose writer failed: flag the workers, drain the queue so none stays blocked, then shut down."""
+    abort.set()
+    pool.shutdown(wait=False, cancel_futures=True)
+    deadline = time.perf_counter() + ABORT_GRACE_SECONDS
+    while not all(f.done() for f in futures) and time.perf_counter() < deadline:
+        try:
+            batch_queue.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    if not all(f.done() for f in futures):
+        logger.error("Ingest workers did not stop after the writer failed; terminating them")
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+
+def ingest_archives_parallel(zip_paths, db: QuoteDatabase, workers=None, batch_size=DEFAULT_BATCH_SIZE,
+                             queue_size=DEFAULT_QUEUE_SIZE, parser=DEFAULT_PARSER, force=False):
+    """Parse archives' new or changed CSV members in a process pool and write them through db.
+
+    Returns one stats dict per archive: archive, rows, seconds, rows_per_sec, errors.
+    """
+    jobs = []
+    fingerprints = {}
+    replace = set()  # sessions whose changed files replace their rows
+    for zip_path in map(str, zip_paths):
+        for info, status in plan_archive(zip_path, db, force):
+            if status == "unchanged":
+                logger.info(f"Skipping unchanged CSV: {info.filename}")
+                continue
+            jobs.append((zip_path, info.filename))
+            fingerprints[(zip_path, info.filename)] = member_fingerprint(info)
+            if status in ("changed", "forced"):
+                replace.add(extract_metadata_from_filename(info.filename)[2])
+
+    pending = {}
+    for zip_path, _ in jobs:
+        pending[zip_path] = pending.get(zip_path, 0) + 1
+    stats = {zip_path: {"archive": os.path.basename(zip_path), "rows": 0, "errors": [], "started": None}
+             for zip_path in map(str, zip_paths)}
+    results = []
+    append_only = {}  # session_id -> True when this run created the session
+
+    ctx = multiprocessing.get_context()
+    batch_queue = ctx.Queue(maxsize=queue_size)
+    abort = ctx.Event()
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                               initializer=_init_worker, initargs=(batch_queue, abort))
+    futures = []
+    try:
+        with db.ingest_pragmas():
+            futures = [pool.submit(_parse_member_to_queue, zip_path, filename, batch_size, parser)
+                       for zip_path, filename in jobs]
+            remaining = len(jobs)
+            while remaining:
+                try:
+                    kind, zip_path, payload = batch_queue.get(timeout=1)
+                except queue.Empty:
+                    crashed = [f for f in futures if f.done() and f.exception() is not None]
+                    if crashed:
+                        raise crashed[0].exception()
+                    continue
+
+                archive = stats[zip_path]
+                if archive["started"] is None:
+                    archive["started"] = time.perf_counter()
+                if kind == "batch":
+                    session_id, session_info, quotes = payload
+                    if session_id not in append_only:
+                        append_only[session_id] = db.start_session_load(session_id, session_info, quotes,
+                                                                        replace=session_id in replace)
+                    db.insert_quote_chunk(session_id, quotes, append_only=append_only[session_id])
+                    archive["rows"] += len(quotes)
+                elif kind == "done":
+                    remaining -= 1
+                    filename, parsed, error = payload
+                    if error:
+                        logger.error(f"Ingestion error in {zip_path}: {error}")
+                        archive["errors"].append(error)
                     else:
-                        logger.warning(f"No quotes parsed from file: {file_info.filename}")
+                        archive_name = os.path.basename(zip_path).replace(".zip", "")
+                        if parsed:
+                            db.refresh_rollups(extract_metadata_from_filename(filename)[2])
+                            db.bump_data_version()
+                        db.record_ingested_member(archive_name, filename, fingerprints[(zip_path, filename)], parsed)
+                    pending[zip_path] -= 1
+                    if pending[zip_path] == 0:
+                        results.append(_finish_archive(archive))
+    except BaseException:
+        # Leaving a `with ProcessPoolExecutor` here would wait on workers stuck on the full queue
+        _abort_pool(pool, futures, batch_queue, abort)
+        raise
+    pool.shutdown()
+
+    # Archives without any CSV members never produce a queue message
+    results += [_finish_archive(s) for p, s in stats.items() if p not in pending]
     db.conn.commit()
-    logger.info(f"Ingestion completed for archive: {archive_name}")
+    return results
+
+def _finish_archive(archive):
+    started = archive.pop("started")
+    seconds = time.perf_counter() - started if started else 0.0
+    archive["seconds"] = round(seconds, 3)
+    archive["rows_per_sec"] = round(archive["rows"] / seconds) if seconds > 0 else 0
+    record_ingest_metrics(archive["rows"], seconds)
+    logger.info(f"Archive {archive['archive']}: {archive['rows']} rows in {archive['seconds']}s "
+                f"({archive['rows_per_sec']} rows/s)")
+    return archive
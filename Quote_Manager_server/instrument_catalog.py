@@ -0,0 +1,93 @@
+import threading
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 86400 * 1000
+
+def _day(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+class InstrumentCatalog:
+    """In-memory broker -> symbol -> {dates, sessions, time bounds} snapshot of one database.
+
+    Each instrument entry holds instrument_id, start_time, end_time, dates (sorted
+    YYYY-MM-DD, UTC) and sessions_by_date (date -> session ids, by start time).
+    """
+
+    def __init__(self, version: int, instruments: Dict[str, Dict[str, dict]]):
+        self.version = version
+        self.instruments = instruments
+        self.symbols = {symbol for by_symbol in instruments.values() for symbol in by_symbol}
+
+    @classmethod
+    def load(cls, conn, version: int) -> "InstrumentCatalog":
+        instruments: Dict[str, Dict[str, dict]] = {}
+        by_id = {}
+        for instrument_id, broker, symbol in conn.execute(
+            "SELECT instrument_id, broker, symbol FROM instruments ORDER BY instrument_id"
+        ):
+            entry = {"instrument_id": instrument_id, "start_time": None, "end_time": None,
+                     "dates": [], "sessions_by_date": {}}
+            instruments.setdefault(broker, {})[symbol] = entry
+            by_id[instrument_id] = entry
+
+        # Days that actually have ticks come from the 1d rollups
+        for instrument_id, bucket_ts in conn.execute(
+            "SELECT instrument_id, bucket_ts FROM quote_rollups WHERE resolution = ? ORDER BY bucket_ts", (DAY_MS,)
+        ):
+            if instrument_id in by_id:
+                by_id[instrument_id]["dates"].append(_day(bucket_ts))
+
+        sessions = conn.execute("""
+            SELECT i.instrument_id, s.session_id, s.start_time, s.end_time
+            FROM sessions s
+            JOIN instruments i ON i.broker = s.broker AND i.symbol = s.symbol
+            ORDER BY s.start_time
+        """).fetchall()
+        for instrument_id, session_id, start_time, end_time in sessions:
+            entry = by_id[instrument_id]
+            entry["start_time"] = start_time if entry["start_time"] is None else min(entry["start_time"], start_time)
+            entry["end_time"] = end_time if entry["end_time"] is None else max(entry["end_time"], end_time)
+            for day_start in range(start_time // DAY_MS * DAY_MS, end_time + 1, DAY_MS):
+                entry["sessions_by_date"].setdefault(_day(day_start), []).append(session_id)
+
+        for entry in by_id.values():
+            # Without rollups (not yet rebuilt), fall back to the days the sessions span
+            if not entry["dates"]:
+                entry["dates"] = sorted(entry["sessions_by_date"])
+            dates = set(entry["dates"])
+            entry["sessions_by_date"] = {d: s for d, s in entry["sessions_by_date"].items() if d in dates}
+
+        # Brokers/instruments that only exist in the instruments table have no sessions yet
+        instruments = {b: {s: e for s, e in by_symbol.items() if e["start_time"] is not None}
+                       for b, by_symbol in instruments.items()}
+        return cls(version, {b: by_symbol for b, by_symbol in instruments.items() if by_symbol})
+
+    def brokers(self) -> List[str]:
+        return list(self.instruments)
+
+    def symbols_for(self, broker: str) -> List[str]:
+        return list(self.instruments.get(broker, {}))
+
+    def entry(self, broker: str, symbol: str) -> Optional[dict]:
+        return self.instruments.get(broker, {}).get(symbol)
+
+# One catalog per database file, shared by every connection in the process
+_catalogs: Dict[str, InstrumentCatalog] = {}
+_catalog_lock = threading.Lock()
+
+def get_catalog(db_path: str, conn, version: int) -> InstrumentCatalog:
+    """Return the cached catalog for db_path, reloading it through conn if version moved on."""
+    catalog = _catalogs.get(db_path)
+    if catalog is not None and catalog.version == version:
+        return catalog
+    with _catalog_lock:
+        catalog = _catalogs.get(db_path)
+        if catalog is None or catalog.version != version:
+            catalog = InstrumentCatalog.load(conn, version)
+            _catalogs[db_path] = catalog
+            logger.info(f"Loaded instrument catalog for {db_path} at data version {version}")
+    return catalog
@@ -0,0 +1,20 @@
+import sys
+import logging
+from quote_db import QuoteDatabase, SCHEMA_MIGRATIONS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+DB_PATH = sys.argv[1] if len(sys.argv) > 1 else "quotes.db"
+
+# Opening the database applies any pending SCHEMA_MIGRATIONS; run this once after
+# upgrading so the (possibly slow) backfill doesn't happen on the first API request.
+db = QuoteDatabase(DB_PATH)
+version = db.conn.execute("PRAGMA user_version").fetchone()[0]
+logging.info(f"{DB_PATH} is at schema version {version} (latest {len(SCHEMA_MIGRATIONS)})")
+
+# Databases loaded before rollups existed have sessions but no rollup rows
+has_rollups = db.conn.execute("SELECT 1 FROM quote_rollups LIMIT 1").fetchone()
+has_sessions = db.conn.execute("SELECT 1 FROM sessions LIMIT 1").fetchone()
+if has_sessions and not has_rollups:
+    logging.info("Building rollups for existing sessions")
+    db.rebuild_rollups()
+db.close()
@@ -0,0 +1,26 @@
+import json
+import base64
+import hashlib
+from typing import Sequence, Tuple
+
+class InvalidCursor(ValueError):
+    """A continuation token that is malformed or was issued for a different query."""
+
+def _fingerprint(query: Sequence) -> str:
+    return hashlib.sha1(json.dumps(list(query), separators=(",", ":")).encode()).hexdigest()[:12]
+
+def encode_cursor(position: Sequence, query: Sequence) -> str:
+    """Opaque token for the keyset `position` (last row served) of the listing described by `query`."""
+    raw = json.dumps({"p": list(position), "q": _fingerprint(query)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(token: str, query: Sequence) -> Tuple:
+    """The keyset position in a token from encode_cursor; InvalidCursor unless it came from the same query."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        position, fingerprint = tuple(data["p"]), data["q"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if fingerprint != _fingerprint(query):
+        raise InvalidCursor("Cursor was issued for a different query")
+    return position
@@ -0,0 +1,143 @@
+import os
+import itertools
+import logging
+from pathlib import Path
+from typing import Iterator, List, Optional
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only the Parquet backend needs it
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 86400 * 1000
+# Row groups carry min/max timestamp statistics, so smaller groups prune more finely
+ROW_GROUP_SIZE = 128 * 1024
+COLUMNS = ["timestamp", "bid", "ask", "session_id"]
+
+def _lower_bound(start_time: Optional[int], since_ts: Optional[int]) -> Optional[int]:
+    """Fold start_time (inclusive) and since_ts (exclusive) into one inclusive lower bound."""
+    bounds = [b for b in (start_time, since_ts + 1 if since_ts is not None else None) if b is not None]
+    return max(bounds) if bounds else None
+
+class ParquetQuoteStore:
+    """Closed sessions stored as root/broker=<b>/symbol=<s>/date=<YYYY-MM-DD>/<session_id>.parquet.
+
+    Each file holds one session's ticks for one UTC day, sorted by timestamp. Reads prune
+    whole days by directory name, then row groups by timestamp statistics, and memory-map
+    the files they open. Session metadata stays in SQLite (see QuoteDatabase.archive_session).
+    """
+
+    def __init__(self, root):
+        if pa is None:
+            raise RuntimeError("The Parquet storage backend needs pyarrow: pip install pyarrow")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.schema = pa.schema([
+            ("timestamp", pa.int64()),
+            ("bid", pa.float64()),
+            ("ask", pa.float64()),
+            ("session_id", pa.dictionary(pa.int32(), pa.string())),
+        ])
+        self.filesystem = pyarrow.fs.LocalFileSystem(use_mmap=True)
+
+    def _instrument_dir(self, broker: str, symbol: str) -> Path:
+        return self.root / f"broker={broker}" / f"symbol={symbol}"
+
+    @staticmethod
+    def _day_of(ts_ms: int) -> str:
+        return pd.Timestamp(ts_ms, unit="ms").strftime("%Y-%m-%d")
+
+    def write_session(self, broker: str, symbol: str, session_id: str, df: pd.DataFrame) -> int:
+        """Write a session's timestamp/bid/ask frame, one file per UTC day; returns the rows written."""
+        df = df[["timestamp", "bid", "ask"]].sort_values("timestamp", kind="stable")
+        df = df.assign(session_id=session_id)
+        days = df["timestamp"].to_numpy() // DAY_MS
+        for day, part in df.groupby(days, sort=True):
+            day_dir = self._instrument_dir(broker, symbol) / f"date={self._day_of(int(day) * DAY_MS)}"
+            path = day_dir / f"{session_id}.parquet"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(part, schema=self.schema, preserve_index=False)
+            # Written beside the target and renamed so readers never see a half-written file
+            tmp_path = path.with_suffix(".parquet.tmp")
+            pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE, compression="zstd")
+            os.replace(tmp_path, path)
+        logger.info(f"Wrote {len(df)} quotes for session {session_id} to {self._instrument_dir(broker, symbol)}")
+        return len(df)
+
+    def delete_session(self, broker: str, symbol: str, session_id: str):
+        for path in self._instrument_dir(broker, symbol).glob(f"date=*/{session_id}.parquet"):
+            path.unlink()
+
+    def _files(self, broker: str, symbol: str, start_time: Optional[int] = None,
+               end_time: Optional[int] = None, session_id: Optional[str] = None) -> List[str]:
+        """Partition pruning: only files whose day overlaps [start_time, end_time], oldest day first."""
+        first_day = self._day_of(start_time) if start_time is not None else None
+        last_day = self._day_of(end_time) if end_time is not None else None
+        files = []
+        for day_dir in sorted(self._instrument_dir(broker, symbol).glob("date=*")):
+            day = day_dir.name[len("date="):]
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            files += sorted(str(p) for p in day_dir.glob(f"{session_id or '*'}.parquet"))
+        return files
+
+    def _read(self, files: List[str], lower: Optional[int] = None, end_time: Optional[int] = None) -> pd.DataFrame:
+        if not files:
+            return pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in
+                                 zip(COLUMNS, ["int64", "float64", "float64", "object"])})
+        condition = None
+        if lower is not None:
+            condition = ds.field("timestamp") >= lower
+        if end_time is not None:
+            upper = ds.field("timestamp") <= end_time
+            condition = upper if condition is None else condition & upper
+        dataset = ds.dataset(files, schema=self.schema, format="parquet", filesystem=self.filesystem)
+        df = dataset.to_table(filter=condition).to_pandas()
+        df["session_id"] = df["session_id"].astype(object)
+        return df
+
+    def scan(self, broker: str, symbol: str, start_time: Optional[int] = None, end_time: Optional[int] = None,
+             since_ts: Optional[int] = None, session_id: Optional[str] = None) -> pd.DataFrame:
+        """Return timestamp/bid/ask/session_id in [start_time, end_time] (and > since_ts), oldest first."""
+        lower = _lower_bound(start_time, since_ts)
+        df = self._read(self._files(broker, symbol, lower, end_time, session_id), lower, end_time)
+        return df.sort_values("timestamp", kind="stable", ignore_index=True)
+
+    def newest(self, broker: str, symbol: str, limit: int, start_time: Optional[int] = None,
+               since_ts: Optional[int] = None) -> pd.DataFrame:
+        """Return up to limit of the newest rows, newest first, reading one day at a time from the end."""
+        lower = _lower_bound(start_time, since_ts)
+        files = self._files(broker, symbol, lower)
+        parts, rows = [], 0
+        while files and rows < limit:
+            day = os.path.dirname(files[-1])
+            day_files = [f for f in files if os.path.dirname(f) == day]
+            files = files[:-len(day_files)]
+            part = self._read(day_files, lower)
+            parts.append(part)
+            rows += len(part)
+        df = pd.concat(parts, ignore_index=True) if parts else self._read([])
+        return df.sort_values("timestamp", ascending=False, kind="stable", ignore_index=True).head(limit)
+
+    def iter_days(self, broker: str, symbol: str, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                  since_ts: Optional[int] = None, session_id: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """Like scan, but one sorted frame per UTC day so only a day is in memory at a time."""
+        lower = _lower_bound(start_time, since_ts)
+        files = self._files(broker, symbol, lower, end_time, session_id)
+        for _, day_files in itertools.groupby(files, key=os.path.dirname):
+            df = self._read(list(day_files), lower, end_time)
+            if len(df):
+                yield df.sort_values("timestamp", kind="stable", ignore_index=True)
+
+    def count(self, broker: str, symbol: str) -> int:
+        """Row count from the files' footers, without reading any data pages."""
+        return sum(pq.ParquetFile(f).metadata.num_rows for f in self._files(broker, symbol))
+
+    def size_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self.root.rglob("*.parquet"))
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+DISCONNECT_POLL_SECONDS = 0.1
+
+class QueryTimeout(Exception):
+    """The query ran longer than its timeout and was interrupted."""
+
+class QueryCancelled(Exception):
+    """The client went away before the query finished, so it was interrupted."""
+
+class QueryExecutor:
+    """Runs blocking sqlite3/pandas work on a bounded thread pool so the event loop stays free.
+
+    A query that times out or whose client disconnects is stopped with the connection's
+    interrupt() and run() raises straight away. The worker may still be unwinding, so the
+    job is handed to on_abandon; the reader pool uses it to take the connection back only
+    once the job is done.
+    """
+
+    def __init__(self, max_workers: int = 4, timeout: Optional[float] = 30.0):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quote-query")
+        self._lock = threading.Lock()
+        self._stats = {"completed": 0, "timed_out": 0, "cancelled": 0}
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self._stats[outcome] += 1
+
+    async def run(self, fn: Callable, *args, interrupt: Optional[Callable[[], None]] = None,
+                  timeout: Optional[float] = None,
+                  is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                  on_abandon: Optional[Callable[[Future], None]] = None, **kwargs):
+        timeout = self.timeout if timeout is None else timeout
+        job = self._pool.submit(fn, *args, **kwargs)
+        result = asyncio.wrap_future(job)
+        watcher = asyncio.ensure_future(self._wait_for_disconnect(is_disconnected)) if is_disconnected else None
+        try:
+            done, _ = await asyncio.wait({result, watcher} - {None}, timeout=timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            self._abort(job, result, interrupt, on_abandon)
+            self._count("cancelled")
+            raise
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+        if result in done:
+            self._count("completed")
+            return result.result()
+
+        self._abort(job, result, interrupt, on_abandon)
+        if watcher is not None and watcher in done:
+            self._count("cancelled")
+            raise QueryCancelled(f"{getattr(fn, '__name__', fn)} cancelled: client disconnected")
+        self._count("timed_out")
+        logger.warning(f"{getattr(fn, '__name__', fn)} timed out after {timeout}s")
+        raise QueryTimeout(f"{getattr(fn, '__name__', fn)} timed out after {timeout}s")
+
+    @staticmethod
+    async def _wait_for_disconnect(is_disconnected):
+        while not await is_disconnected():
+            await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+    @staticmethod
+    def _abort(job, result, interrupt, on_abandon):
+        if job.cancel():
+            return  # never started
+        if interrupt is not None:
+            interrupt()
+        # The interrupted query's error is expected; mark it retrieved whenever it arrives
+        result.add_done_callback(lambda f: f.cancelled() or f.exception())
+        if on_abandon is not None:
+            on_abandon(job)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"max_workers": self.max_workers, "timeout_seconds": self.timeout, **self._stats}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+class SingleFlight:
+    """Lets concurrent callers asking for the same key share one in-flight computation and its result.
+
+    Only calls that overlap are merged; nothing is kept once the leader finishes (that is the
+    ResponseCache's job). If the leader gives up because its own client left, the callers
+    waiting on it start over instead of failing with it. Runs on the event loop, one per process.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {"leaders": 0, "coalesced": 0, "abandoned": 0}
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable]):
+        """Await fn(), or the result of an identical call already in flight under key."""
+        while key in self._inflight:
+            future = self._inflight[key]
+            self._stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # this caller was cancelled, not the leader
+            except QueryCancelled:
+                pass
+            self._stats["abandoned"] += 1
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting when the leader fails; don't warn about an unretrieved exception
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        self._stats["leaders"] += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {**self._stats, "in_flight": len(self._inflight)}
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from typing import Dict, List, Set, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+Instrument = Tuple[str, str]  # (broker, symbol)
+# Most ticks per instrument in one stream message; a larger backlog goes out as several messages
+STREAM_BATCH_SIZE = 5000
+
+class Subscription:
+    """One client's view of the broadcaster: a bounded queue of quote batches."""
+
+    def __init__(self, instruments: List[Instrument], max_pending: int):
+        self.instruments = instruments
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.dropped = 0
+
+    def offer(self, message: dict):
+        # A slow client loses its oldest batch rather than holding up everyone else
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+class QuoteBroadcaster:
+    """Polls for newly ingested quotes once per change and fans them out to every subscriber.
+
+    New data is detected through the database's data_version, so ingests from other
+    processes (batch_ingest.py) are picked up too. Each update costs one get_series_after
+    read covering every instrument with at least one subscriber, however many clients are
+    listening; a backlog (e.g. a full-day ingest) is paged out STREAM_BATCH_SIZE ticks at a time.
+    """
+
+    def __init__(self, db_pool, poll_interval: float = 1.0, max_pending: int = 100):
+        self.db_pool = db_pool
+        self.poll_interval = poll_interval
+        self.max_pending = max_pending
+        self._subscribers: Dict[Instrument, Set[Subscription]] = {}
+        self._watermarks: Dict[Instrument, int] = {}
+        self._version = None
+        self._wakeup = asyncio.Event()
+        self._loop = None
+        self.db_reads = 0
+
+    async def subscribe(self, instruments: List[Instrument]) -> Subscription:
+        """Register a client; it receives ticks ingested after its instruments' current last tick."""
+        subscription = Subscription(instruments, self.max_pending)
+        # The catalog read blocks, so it runs in a worker thread rather than on the event loop
+        latest = await asyncio.to_thread(self._latest_timestamps, instruments)
+        for instrument in instruments:
+            if instrument not in self._subscribers:
+                self._subscribers[instrument] = set()
+                self._watermarks.setdefault(instrument, latest[instrument])
+            self._subscribers[instrument].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for instrument in subscription.instruments:
+            listeners = self._subscribers.get(instrument)
+            if listeners is not None:
+                listeners.discard(subscription)
+                if not listeners:
+                    del self._subscribers[instrument]
+                    self._watermarks.pop(instrument, None)
+
+    def notify(self):
+        """Wake the poller now instead of at the next interval; safe to call from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _latest_timestamps(self, instruments: List[Instrument]) -> Dict[Instrument, int]:
+        with self.db_pool.reader() as db:
+            catalog = db.catalog()
+            entries = {instrument: catalog.entry(*instrument) for instrument in instruments}
+        return {instrument: entry["end_time"] if entry else 0 for instrument, entry in entries.items()}
+
+    def _poll(self, instruments: List[Instrument]):
+        """Blocking part, run in a worker thread: version check plus one paged read for all instruments.
+
+        Returns (version, messages, more); more means some instrument filled its page and the
+        rest of its backlog follows on the next poll.
+        """
+        with self.db_pool.reader() as db:
+            version = db.get_data_version()
+            if version == self._version:
+                return version, [], False
+            since = {instrument: self._watermarks.get(instrument, 0) for instrument in instruments}
+            df = db.get_series_after(since, STREAM_BATCH_SIZE)
+            self.db_reads += 1
+        messages, more = [], False
+        for (broker, symbol), batch in df.groupby(["broker", "symbol"], sort=False):
+            timestamps = batch["timestamp"].to_numpy()
+            if len(batch) == STREAM_BATCH_SIZE:
+                more = True
+                # The next page starts strictly after the watermark, so don't split ticks sharing a timestamp
+                whole = int(np.searchsorted(timestamps, timestamps[-1]))
+                if whole:
+                    batch, timestamps = batch.iloc[:whole], timestamps[:whole]
+            messages.append({
+                "broker": broker,
+                "symbol": symbol,
+                "session_id": batch["session_id"].tolist(),
+                "timestamp": timestamps.tolist(),
+                "bid": batch["bid"].tolist(),
+                "ask": batch["ask"].tolist(),
+                "watermark": int(timestamps[-1]),
+            })
+        return version, messages, more
+
+    async def poll_once(self):
+        instruments = list(self._subscribers)
+        if not instruments:
+            return
+        version, messages, more = await asyncio.to_thread(self._poll, instruments)
+        if more:
+            self._wakeup.set()  # keep draining the backlog, one page per instrument per poll
+        else:
+            self._version = version
+        for message in messages:
+            instrument = (message["broker"], message["symbol"])
+            self._watermarks[instrument] = message["watermark"]
+            for subscription in list(self._subscribers.get(instrument, ())):
+                subscription.offer(message)
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        logger.info(f"Quote broadcaster started (poll every {self.poll_interval}s)")
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error(f"Broadcast poll failed: {e}", exc_info=True)
@@ -0,0 +1,81 @@
+"""Small client for pulling quotes into notebooks over the compact wire formats.
+
+    from quote_client import QuoteClient
+    client = QuoteClient("http://localhost:8000")
+    data = client.get_data("BrokerA", "EURUSD", "BrokerB", "EURUSD", limit=1_000_000)
+    for series in data["series"]:
+        print(series["broker"], series["symbol"], len(series["timestamp"]))
+
+Each series is a dict of NumPy arrays (timestamp in epoch ms, bid, ask, session_id);
+frame() turns one into a DataFrame.
+"""
+from typing import Iterator, List, Optional, Tuple
+import httpx
+import pandas as pd
+import wire_format
+
+class QuoteClient:
+    def __init__(self, base_url: str = "http://localhost:8000", media_type: str = wire_format.PACKED,
+                 timeout: float = 60.0):
+        self.media_type = media_type
+        # httpx sends Accept-Encoding: gzip (and br when brotli is installed) and decompresses for us
+        self.client = httpx.Client(base_url=f"{base_url.rstrip('/')}/api/quotes", timeout=timeout,
+                                   headers={"Accept": media_type})
+
+    def _decode(self, response: httpx.Response) -> dict:
+        response.raise_for_status()
+        return wire_format.decode(response.content, response.headers.get("content-type", wire_format.JSON))
+
+    def get_data(self, broker_a: str, symbol_a: str, broker_b: str, symbol_b: str, **params) -> dict:
+        """GET /api/data; params are the route's query parameters (limit, time_range_hours, downsample, ...)."""
+        params = {"broker_a": broker_a, "symbol_a": symbol_a, "broker_b": broker_b, "symbol_b": symbol_b, **params}
+        return self._decode(self.client.get("/api/data", params=params))
+
+    def get_multi(self, instruments: List[Tuple[str, str]], **params) -> dict:
+        """GET /api/multi for several (broker, symbol) pairs; limit/points apply per series."""
+        query = [("instrument", f"{broker}:{symbol}") for broker, symbol in instruments] + list(params.items())
+        return self._decode(self.client.get("/api/multi", params=query))
+
+    def get_quotes(self, broker: str, symbol: str, start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, since_ts: Optional[int] = None) -> dict:
+        """POST /quotes for one instrument and time range (epoch ms)."""
+        body = {"broker": broker, "symbol": symbol, "start_time": start_time, "end_time": end_time,
+                "since_ts": since_ts}
+        return self._decode(self.client.post("/quotes", json=body))
+
+    def iter_quote_pages(self, broker: str, symbol: str, page_size: int = 100_000, **filters) -> Iterator[dict]:
+        """POST /quotes one keyset page at a time, in (session_id, timestamp) order, until the last page.
+
+        filters are FetchQuoteRequest fields (start_time, end_time, since_ts).
+        """
+        body = {"broker": broker, "symbol": symbol, "page_size": page_size, **filters}
+        while True:
+            response = self.client.post("/quotes", json=body)
+            yield self._decode(response)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return
+            body["cursor"] = cursor
+
+    def export(self, broker: str, symbol: str, path: str, format: str = "csv", **params) -> int:
+        """Stream GET /export (csv, ndjson or arrow) into a file without holding it in memory; returns bytes written."""
+        params = {"broker": broker, "symbol": symbol, "format": format, **params}
+        written = 0
+        with self.client.stream("GET", "/export", params=params, headers={"Accept": "*/*"}) as response:
+            response.raise_for_status()
+            with open(path, "wb") as f:
+                for chunk in response.iter_bytes():
+                    written += f.write(chunk)
+        return written
+
+    @staticmethod
+    def frame(series: dict) -> pd.DataFrame:
+        return pd.DataFrame({
+            "timestamp": pd.to_datetime(series["timestamp"], unit="ms"),
+            "bid": series["bid"],
+            "ask": series["ask"],
+            "session_id": series["session_id"],
+        })
+
+    def close(self):
+        self.client.close()
@@ -15,6 +15,125 @@ class FetchData(BaseModel):
 
 class FetchDataResponse(BaseModel):
     data: List[FetchData]
+    watermark: Optional[int] = None  # safe since_ts for both series on the next poll (ms)
+    watermarks: Dict[str, Optional[int]] = Field(default_factory=dict)  # "broker:symbol" -> last ts returned
+    truncated: bool = False  # a series has more rows after its watermark; poll again right away
+
+class FetchDataSeries(BaseModel):
+    broker: str
+    symbol: str
+    session_id: List[str]
+    timestamp: List[int]  # epoch ms
+    bid_price: List[Optional[float]]
+    ask_price: List[Optional[float]]
+
+class FetchDataColumnsResponse(BaseModel):
+    series: List[FetchDataSeries]
+    watermark: Optional[int] = None
+    watermarks: Dict[str, Optional[int]] = Field(default_factory=dict)
+    truncated: bool = False
+
+class MultiSeries(FetchDataSeries):
+    truncated: bool = False  # the range held more ticks than the per-series limit/points
+    watermark: Optional[int] = None  # last tick returned for this series (ms)
+
+class AlignedMids(BaseModel):
+    step_ms: int
+    ts: List[int]  # epoch ms grid shared by every series
+    mid: Dict[str, List[Optional[float]]]  # keyed "broker:symbol"
+
+class MultiSeriesResponse(BaseModel):
+    series: List[MultiSeries]  # oldest first, in request order
+    aligned: Optional[AlignedMids] = None
+    watermark: Optional[int] = None
+
+
+
+class ComparisonResponse(BaseModel):
+    step_ms: int
+    ts: List[int]  # epoch ms grid shared by both series
+    bid_a: List[Optional[float]]
+    ask_a: List[Optional[float]]
+    bid_b: List[Optional[float]]
+    ask_b: List[Optional[float]]
+    mid_a: List[Optional[float]]
+    mid_b: List[Optional[float]]
+    spread: List[Optional[float]]  # ask_a - bid_b
+
+
+
+class StaleGapStats(BaseModel):
+    threshold_ms: int
+    count: int
+    total_ms: int
+    max_ms: Optional[int] = None
+    longest: List[List[int]]  # [last tick before, first tick after], epoch ms, longest first
+
+
+class BrokerAnalytics(BaseModel):
+    broker: str
+    symbol: str
+    ticks: int
+    tick_rate: Optional[float] = None  # ticks per second
+    spread: Dict[str, Optional[float]]  # ask - bid per tick: mean, std, min, max, p1 ... p99
+    stale_gaps: StaleGapStats
+
+
+class LeadLagStats(BaseModel):
+    step_ms: int
+    lag_ms: Optional[int] = None  # > 0: broker B's mid follows broker A's by this much
+    correlation: Optional[float] = None  # of mid-price changes at lag_ms
+    lags_ms: List[int]
+    correlations: List[Optional[float]]
+
+
+class AnalyticsResponse(BaseModel):
+    start_ms: Optional[int] = None  # overlap of both series; mid_difference and lead_lag cover only this
+    end_ms: Optional[int] = None
+    a: BrokerAnalytics
+    b: BrokerAnalytics
+    mid_difference: Dict[str, Optional[float]]  # mid_a - mid_b on the step_ms grid
+    lead_lag: LeadLagStats
+
+
+
+class OHLCResponse(BaseModel):
+    broker: str
+    symbol: str
+    resolution_ms: int  # 0 when there is no data
+    ts: List[int]  # bucket start, epoch ms
+    bid_open: List[float]
+    bid_high: List[float]
+    bid_low: List[float]
+    bid_close: List[float]
+    ask_open: List[float]
+    ask_high: List[float]
+    ask_low: List[float]
+    ask_close: List[float]
+    spread_mean: List[float]
+    tick_count: List[int]
+
+
+
+class CacheStatsResponse(BaseModel):
+    hits: int
+    misses: int
+    not_modified: int  # 304 responses
+    evictions: int
+    entries: int
+    max_entries: int
+    ttl_seconds: float
+
+class HotCacheStatsResponse(BaseModel):
+    enabled: bool
+    instruments: int = 0
+    mapped_bytes: int = 0
+    budget_bytes: int = 0
+    hits: int = 0
+    refreshes: int = 0
+    rebuilds: int = 0
+    evictions: int = 0
+    bypassed: int = 0  # served from the database: unknown or over-budget instrument
 
 
 
@@ -24,6 +143,10 @@ class FetchQuoteRequest(BaseModel):
     date: Optional[str] = None
     start_time: Optional[int] = None
     end_time: Optional[int] = None 
+    since_ts: Optional[int] = None  # only quotes newer than this (ms), e.g. the last watermark
+    # Set either to page in (session_id, timestamp) order; page_size alone starts at the first row
+    page_size: Optional[int] = Field(default=None, ge=1, le=100_000)
+    cursor: Optional[str] = None  # next_cursor from the previous page
 
 
 class QuoteResponse(BaseModel):
@@ -37,6 +160,8 @@ class BrokersSymbolsResponse(BaseModel):
 
 class FetchQuoteResponse(BaseModel):
     quotes: List[QuoteResponse]
+    watermark: Optional[int] = None
+    next_cursor: Optional[str] = None  # None on the last page, or when not paging
 
 class FetchBrokersResponse(BaseModel):
     brokers: List[str]
@@ -58,12 +183,16 @@ class ListSessionRequest(BaseModel):
     broker: str
     symbol: str
     date: str
+    page_size: Optional[int] = Field(default=None, ge=1, le=10_000)
+    cursor: Optional[str] = None  # next_cursor from the previous page
 
 class ListSessionResponse(BaseModel):
     sessions: List[str]
+    next_cursor: Optional[str] = None  # None on the last page, or when not paging
 
 class IngestRequest(BaseModel):
     zip_path: str  # path to archive
+    force: bool = False  # reload members the ingest manifest says are unchanged
 
 class IngestResponse(BaseModel):
     status: str  # "success" or "failed"
@@ -1,18 +1,160 @@
+import heapq
 import sqlite3
-from typing import List, Tuple, Optional
+import operator
+import itertools
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
 from datetime import datetime, timezone, timedelta
 import logging
+import numpy as np
 import pandas as pd
 from pydantic import field_validator
+import quote_series
+from instrument_catalog import InstrumentCatalog, get_catalog
+from parquet_store import ParquetQuoteStore
+from quote_metrics import METRICS, instrumented_query
 
 logger = logging.getLogger(__name__)
 
+def time_range_start_ms(time_range_hours) -> Optional[int]:
+    """Convert a time_range_hours value ('all' or hours) into a lower timestamp bound in ms."""
+    if time_range_hours is None or time_range_hours == 'all':
+        return None
+    current_time_ms = int(datetime.now().timestamp() * 1000)
+    return current_time_ms - int(time_range_hours) * 3600 * 1000
+
+# Schema migrations applied on top of the base tables from _create_tables, tracked
+# with PRAGMA user_version. Append new steps; never edit one that has shipped.
+SCHEMA_MIGRATIONS = [
+    # 1: instrument key on quotes + indexes so per-instrument time-range scans are index range reads
+    """
+    CREATE TABLE IF NOT EXISTS instruments (
+        instrument_id INTEGER PRIMARY KEY,
+        broker TEXT NOT NULL,
+        symbol TEXT NOT NULL,
+        UNIQUE(broker, symbol)
+    );
+    INSERT OR IGNORE INTO instruments (broker, symbol)
+        SELECT DISTINCT broker, symbol FROM sessions;
+    ALTER TABLE quotes ADD COLUMN instrument_id INTEGER REFERENCES instruments(instrument_id);
+    UPDATE quotes SET instrument_id = (
+        SELECT i.instrument_id
+        FROM sessions s
+        JOIN instruments i ON i.broker = s.broker AND i.symbol = s.symbol
+        WHERE s.session_id = quotes.session_id
+    );
+    CREATE INDEX IF NOT EXISTS idx_sessions_instrument ON sessions(broker, symbol, start_time);
+    CREATE INDEX IF NOT EXISTS idx_quotes_instrument_ts
+        ON quotes(instrument_id, timestamp, bid, ask, session_id);
+    """,
+    # 2: manifest of loaded archive members so re-runs only pick up new or changed files
+    """
+    CREATE TABLE IF NOT EXISTS ingest_manifest (
+        archive_name TEXT NOT NULL,
+        member TEXT NOT NULL,
+        crc INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        mtime TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        ingested_at INTEGER NOT NULL,
+        PRIMARY KEY(archive_name, member)
+    );
+    """,
+    # 3: per-instrument OHLC/spread rollups, maintained at ingest (see refresh_rollups)
+    """
+    CREATE TABLE IF NOT EXISTS quote_rollups (
+        instrument_id INTEGER NOT NULL,
+        resolution INTEGER NOT NULL,
+        bucket_ts INTEGER NOT NULL,
+        bid_open REAL NOT NULL,
+        bid_high REAL NOT NULL,
+        bid_low REAL NOT NULL,
+        bid_close REAL NOT NULL,
+        ask_open REAL NOT NULL,
+        ask_high REAL NOT NULL,
+        ask_low REAL NOT NULL,
+        ask_close REAL NOT NULL,
+        spread_mean REAL NOT NULL,
+        tick_count INTEGER NOT NULL,
+        PRIMARY KEY(instrument_id, resolution, bucket_ts)
+    ) WITHOUT ROWID;
+    """,
+    # 4: data_version, bumped by every ingest, lets in-process caches detect new data
+    """
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0);
+    """,
+    # 5: where a session's quotes live: 'sqlite' (quotes table) or 'parquet' (see archive_session)
+    """
+    ALTER TABLE sessions ADD COLUMN storage TEXT NOT NULL DEFAULT 'sqlite';
+    """,
+    # 6: oldest timestamp an ingest may have rewritten in place, per instrument and data_version
+    """
+    CREATE TABLE IF NOT EXISTS quote_rewrites (
+        instrument_id INTEGER NOT NULL,
+        data_version INTEGER NOT NULL,
+        start_time INTEGER NOT NULL,
+        PRIMARY KEY(instrument_id, data_version)
+    ) WITHOUT ROWID;
+    """,
+]
+
+# Rollup resolutions in ms, finest first: 1s, 1m, 1h, 1d
+ROLLUP_RESOLUTIONS = [1000, 60 * 1000, 3600 * 1000, 86400 * 1000]
+
+# Rows per fetchmany page when streaming quotes out (see iter_quotes)
+EXPORT_BATCH_SIZE = 10_000
+# Default rows per page for keyset-paginated quote listings (see fetch_quotes_page)
+QUOTE_PAGE_SIZE = 10_000
+# One quotes row as read by get_series_arrays
+TICK_DTYPE = np.dtype([('ts', np.int64), ('bid', np.float64), ('ask', np.float64)])
+
+# Connection pragmas; override per connection with QuoteDatabase(pragmas={...}), None skips one.
+# WAL lets readers keep going while an ingest transaction is open.
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # negative means KiB
+}
+
+# Applied for the duration of a bulk load and restored afterwards. synchronous=OFF trades
+# durability of the last few transactions on power loss for much faster commits.
+INGEST_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "OFF",
+}
+
 class QuoteDatabase:
-    def __init__(self, db_path="quotes.db"):
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+    def __init__(self, db_path="quotes.db", read_only=False, pragmas=None, parquet_dir=None):
+        self.db_path = db_path
+        self.read_only = read_only
+        # With a parquet_dir, closed sessions can be moved out of the quotes table; reads merge both
+        self.quote_store = ParquetQuoteStore(parquet_dir) if parquet_dir else None
+        # A query its caller gave up on (timeout/disconnect) that may still be unwinding on this connection
+        self.in_flight: Optional[Future] = None
+        if read_only:
+            # Readers never run DDL; the writer owns schema creation and migrations
+            self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self.conn.execute("PRAGMA foreign_keys = ON")
+        self._apply_pragmas({**DEFAULT_PRAGMAS, **(pragmas or {})})
+        METRICS.attach(self.conn)
+
+        if not read_only:
+            self._create_tables()
+            self._migrate()
 
-        self._create_tables()
+    def _apply_pragmas(self, pragmas):
+        for name, value in pragmas.items():
+            if value is None or (self.read_only and name == "journal_mode"):
+                continue
+            self.conn.execute(f"PRAGMA {name} = {value}")
 
     def _create_tables(self):
         self.conn.execute("""
@@ -39,13 +181,72 @@ class QuoteDatabase:
         """)
         self.conn.commit()
 
+    def _migrate(self):
+        """Bring an existing database up to the latest SCHEMA_MIGRATIONS step."""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, script in enumerate(SCHEMA_MIGRATIONS[version:], start=version + 1):
+            logger.info(f"Migrating database schema to version {target}")
+            self.conn.executescript(f"BEGIN; {script} PRAGMA user_version = {target}; COMMIT;")
+
+    def get_data_version(self) -> int:
+        return self.conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()[0]
+
+    def bump_data_version(self):
+        """Signal readers (catalog, caches) in any process that ingested data changed."""
+        with self.conn:
+            self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+
+    def rewritten_since(self, broker: str, symbol: str, version: int) -> Optional[int]:
+        """Oldest timestamp of the instrument that an ingest may have rewritten at data_version >= version."""
+        row = self.conn.execute("""
+            SELECT MIN(r.start_time)
+            FROM quote_rewrites r
+            JOIN instruments i ON i.instrument_id = r.instrument_id
+            WHERE i.broker = ? AND i.symbol = ? AND r.data_version >= ?
+        """, (broker, symbol, version)).fetchone()
+        return row[0]
+
+    def catalog(self) -> InstrumentCatalog:
+        """Shared instrument catalog, reloaded only when the data version has changed."""
+        return get_catalog(self.db_path, self.conn, self.get_data_version())
+
+    def get_instrument_id(self, broker: str, symbol: str) -> Optional[int]:
+        cursor = self.conn.execute(
+            "SELECT instrument_id FROM instruments WHERE broker = ? AND symbol = ?", (broker, symbol)
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+
     def session_exists(self, session_id: str) -> bool:
         query = "SELECT 1 FROM sessions WHERE session_id = ? LIMIT 1"
         cursor = self.conn.execute(query, (session_id,))
         return cursor.fetchone() is not None
 
+    def get_ingested_member(self, archive_name: str, member: str) -> Optional[Tuple[int, int, str]]:
+        """Return the (crc, size, mtime) recorded when this archive member was last loaded."""
+        cursor = self.conn.execute(
+            "SELECT crc, size, mtime FROM ingest_manifest WHERE archive_name = ? AND member = ?",
+            (archive_name, member)
+        )
+        return cursor.fetchone()
+
     # -------- Insertion Methods --------
 
+    def record_ingested_member(self, archive_name: str, member: str, fingerprint: Tuple[int, int, str], rows: int):
+        """Mark an archive member as loaded; fingerprint is (crc, size, mtime) from its ZipInfo."""
+        self.conn.execute("""
+            INSERT INTO ingest_manifest (archive_name, member, crc, size, mtime, rows, ingested_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(archive_name, member)
+            DO UPDATE SET
+                crc = excluded.crc,
+                size = excluded.size,
+                mtime = excluded.mtime,
+                rows = excluded.rows,
+                ingested_at = excluded.ingested_at
+        """, (archive_name, member, *fingerprint, rows, int(datetime.now().timestamp() * 1000)))
+        self.conn.commit()
+
     def insert_session(self, session_data: Tuple[str, str, str, str, int, int]):
         logger.info(f"Inserting session: {session_data[0]}")
         """Insert a session: (session_id, broker, symbol, archive_name, start_time, end_time)"""
@@ -53,6 +254,9 @@ class QuoteDatabase:
             INSERT INTO sessions (session_id, broker, symbol, archive_name, start_time, end_time)
             VALUES (?, ?, ?, ?, ?, ?)
         """, session_data)
+        self.conn.execute(
+            "INSERT OR IGNORE INTO instruments (broker, symbol) VALUES (?, ?)", session_data[1:3]
+        )
         self.conn.commit()
         logger.info(f"Inserted session: {session_data[0]}, time range: {session_data[4]} to {session_data[5]}")
 
@@ -61,107 +265,506 @@ class QuoteDatabase:
             logger.warning(f"Skipped empty quote list for session {session_id}")
             return
 
-        query = """
-        INSERT INTO quotes (session_id, timestamp, bid, ask)
-        VALUES (?, ?, ?, ?)
-        ON CONFLICT(session_id, timestamp)
-        DO UPDATE SET
-            bid = excluded.bid,
-            ask = excluded.ask
-        """
         try:
-            self.conn.executemany(query, [(session_id, *q) for q in quotes])
-            self.conn.commit()
+            self.insert_quote_chunk(session_id, quotes)
             logger.info(f"Quotes inserted successfully for session {session_id} ({len(quotes)} quotes)")
         except Exception as e:
             logger.error(f"Error inserting quotes for session {session_id}: {e}", exc_info=True)
 
+    @contextmanager
+    def ingest_pragmas(self, pragmas=None):
+        """Switch to INGEST_PRAGMAS (plus overrides) for a bulk load, then restore the previous values."""
+        pragmas = {**INGEST_PRAGMAS, **(pragmas or {})}
+        previous = {name: self.conn.execute(f"PRAGMA {name}").fetchone()[0] for name in pragmas}
+        self._apply_pragmas(pragmas)
+        try:
+            yield
+        finally:
+            self._apply_pragmas(previous)
+
+    def start_session_load(self, session_id: str, session_info: Tuple[str, str, str],
+                           first_chunk: List[Tuple[int, float, float]], replace: bool = False) -> bool:
+        """Create the session from its first chunk if it is new.
+
+        session_info is (broker, symbol, archive_name). replace is for a changed (or forced)
+        member: an existing session is cleared first, so rows dropped from the file don't
+        linger. Returns True when the session starts out empty, meaning its quotes can take
+        the append-only insert path.
+        """
+        timestamps = [q[0] for q in first_chunk]
+        if not self.session_exists(session_id):
+            self.insert_session((session_id, *session_info, min(timestamps), max(timestamps)))
+            return True
+        if not replace:
+            logger.info(f"Session {session_id} already exists, loading into it.")
+            self.restore_session(session_id)
+            return False
+        self.clear_session(session_id, rewritten_from=min(timestamps))
+        with self.conn:
+            self.conn.execute("UPDATE sessions SET start_time = ?, end_time = ? WHERE session_id = ?",
+                              (min(timestamps), max(timestamps), session_id))
+        return True
+
+    def clear_session(self, session_id: str, rewritten_from: Optional[int] = None) -> int:
+        """Delete a session's quotes (SQLite or Parquet) ahead of reloading it; the session row stays.
+
+        Rollups for the days it covered are rebuilt without it, and readers are told the range
+        changed (from rewritten_from, if earlier). Returns the SQLite rows removed.
+        """
+        row = self.conn.execute("""
+            SELECT i.instrument_id, s.broker, s.symbol, s.storage, s.start_time
+            FROM sessions s
+            JOIN instruments i ON i.broker = s.broker AND i.symbol = s.symbol
+            WHERE s.session_id = ?
+        """, (session_id,)).fetchone()
+        if row is None:
+            return 0
+        instrument_id, broker, symbol, storage, start_time = row
+        if storage == 'parquet':
+            # Files first: a crash before the UPDATE leaves an empty session, not stale rows
+            self._require_quote_store().delete_session(broker, symbol, session_id)
+        with self.conn:
+            removed = self.conn.execute("DELETE FROM quotes WHERE session_id = ?", (session_id,)).rowcount
+            self.conn.execute("UPDATE sessions SET storage = 'sqlite' WHERE session_id = ?", (session_id,))
+            self._record_rewrite(instrument_id, min(start_time, rewritten_from or start_time))
+        self.refresh_rollups(session_id)
+        logger.info(f"Cleared session {session_id} for reload ({removed} quotes)")
+        return removed
+
+    def _record_rewrite(self, instrument_id: int, start_time: int):
+        # Caller holds the transaction; see rewritten_since
+        self.conn.execute("""
+            INSERT INTO quote_rewrites (instrument_id, data_version, start_time)
+            VALUES (?, (SELECT value FROM meta WHERE key = 'data_version'), ?)
+            ON CONFLICT(instrument_id, data_version)
+            DO UPDATE SET start_time = MIN(start_time, excluded.start_time)
+        """, (instrument_id, start_time))
+
+    def insert_quote_chunk(self, session_id: str, quotes: List[Tuple[int, float, float]], append_only=False):
+        """Write one chunk of (timestamp, bid, ask) in a single transaction.
+
+        append_only is for sessions that started empty in this load: there are no older rows
+        to reconcile, so a repeated timestamp within the file just replaces the earlier row.
+        Otherwise rows are upserted and the write is recorded for readers (see rewritten_since).
+        Either way the session's start/end time is widened to cover the chunk.
+        """
+        if append_only:
+            query = """
+            INSERT OR REPLACE INTO quotes (session_id, instrument_id, timestamp, bid, ask)
+            VALUES (?, ?, ?, ?, ?)
+            """
+        else:
+            query = """
+            INSERT INTO quotes (session_id, instrument_id, timestamp, bid, ask)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(session_id, timestamp)
+            DO UPDATE SET
+                bid = excluded.bid,
+                ask = excluded.ask
+            """
+        with self.conn:
+            instrument_id = self.conn.execute("""
+                SELECT i.instrument_id
+                FROM sessions s
+                JOIN instruments i ON i.broker = s.broker AND i.symbol = s.symbol
+                WHERE s.session_id = ?
+            """, (session_id,)).fetchone()[0]
+            self.conn.executemany(query, ((session_id, instrument_id, *q) for q in quotes))
+            timestamps = [q[0] for q in quotes]
+            if not append_only:
+                # Upserts can change prices under timestamps readers already hold
+                self._record_rewrite(instrument_id, min(timestamps))
+            self.conn.execute("""
+                UPDATE sessions SET start_time = MIN(start_time, ?), end_time = MAX(end_time, ?)
+                WHERE session_id = ?
+            """, (min(timestamps), max(timestamps), session_id))
+
+    def insert_quotes_stream(self, session_id: str, chunks: Iterable[List[Tuple[int, float, float]]],
+                             session_info: Optional[Tuple[str, str, str]] = None, replace: bool = False) -> int:
+        """Load an iterator of quote chunks for one session, one transaction per chunk.
+
+        Only one chunk is held at a time, so memory stays flat regardless of file size.
+        When session_info (broker, symbol, archive_name) is given and the session is new,
+        it is created from the data and loaded append-only; replace reloads an existing one
+        from scratch (see start_session_load). Returns the rows written.
+        """
+        total = 0
+        append_only = False
+        with self.ingest_pragmas():
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if total == 0 and session_info is not None:
+                    append_only = self.start_session_load(session_id, session_info, chunk, replace)
+                self.insert_quote_chunk(session_id, chunk, append_only=append_only)
+                total += len(chunk)
+        return total
+
+    def refresh_rollups(self, session_id: str):
+        """Recompute the rollups for every day the session touches on its instrument.
+
+        Whole days are rebuilt from raw quotes (all sessions of the instrument), one day
+        at a time, so re-ingesting a session keeps rollups exact without a full rebuild.
+        """
+        row = self.conn.execute("""
+            SELECT i.instrument_id, s.broker, s.symbol, s.start_time, s.end_time
+            FROM sessions s
+            JOIN instruments i ON i.broker = s.broker AND i.symbol = s.symbol
+            WHERE s.session_id = ?
+        """, (session_id,)).fetchone()
+        if row is None:
+            return
+        instrument_id, broker, symbol, start_time, end_time = row
+        day = ROLLUP_RESOLUTIONS[-1]
+        for day_start in range(start_time // day * day, end_time + 1, day):
+            df = self.get_series(broker, symbol, start_time=day_start, end_time=day_start + day - 1)
+            ts, bid, ask = df['timestamp'].to_numpy(), df['bid'].to_numpy(), df['ask'].to_numpy()
+            with self.conn:
+                self.conn.execute("""
+                    DELETE FROM quote_rollups
+                    WHERE instrument_id = ? AND bucket_ts >= ? AND bucket_ts < ?
+                """, (instrument_id, day_start, day_start + day))
+                for resolution in ROLLUP_RESOLUTIONS:
+                    rollup = quote_series.ohlc_rollup(ts, bid, ask, resolution)
+                    self.conn.executemany(f"""
+                        INSERT INTO quote_rollups (instrument_id, resolution, {", ".join(quote_series.ROLLUP_COLUMNS)})
+                        VALUES (?, ?, {", ".join("?" * len(quote_series.ROLLUP_COLUMNS))})
+                    """, ((instrument_id, resolution, *r) for r in rollup.itertuples(index=False)))
+        logger.info(f"Refreshed rollups for session {session_id}")
+
+    def rebuild_rollups(self):
+        """Refresh rollups for every session, e.g. after upgrading a database loaded before rollups existed."""
+        for (session_id,) in self.conn.execute("SELECT session_id FROM sessions ORDER BY start_time").fetchall():
+            self.refresh_rollups(session_id)
+
+    # -------- Parquet Storage --------
+
+    def _require_quote_store(self) -> ParquetQuoteStore:
+        if self.quote_store is None:
+            raise RuntimeError(f"{self.db_path} has sessions in Parquet storage; open it with parquet_dir")
+        return self.quote_store
+
+    def archive_session(self, session_id: str) -> int:
+        """Move a closed session's quotes from the quotes table into the Parquet store.
+
+        The files are written before the rows are deleted, so a crash in between leaves the
+        session readable from SQLite. Rollups and metadata stay in SQLite. Returns the rows moved.
+        """
+        store = self._require_quote_store()
+        row = self.conn.execute(
+            "SELECT broker, symbol, storage FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or row[2] == 'parquet':
+            return 0
+        broker, symbol, _ = row
+        df = pd.read_sql_query(
+            "SELECT timestamp, bid, ask FROM quotes WHERE session_id = ? ORDER BY timestamp",
+            self.conn, params=(session_id,)
+        )
+        rows = store.write_session(broker, symbol, session_id, df)
+        with self.conn:
+            self.conn.execute("UPDATE sessions SET storage = 'parquet' WHERE session_id = ?", (session_id,))
+            self.conn.execute("DELETE FROM quotes WHERE session_id = ?", (session_id,))
+        logger.info(f"Archived session {session_id} to Parquet ({rows} quotes)")
+        return rows
+
+    def archive_closed_sessions(self, closed_before: int) -> int:
+        """Archive every SQLite-stored session that ended before closed_before (epoch ms)."""
+        cursor = self.conn.execute("""
+            SELECT session_id FROM sessions WHERE storage = 'sqlite' AND end_time < ? ORDER BY start_time
+        """, (closed_before,))
+        return sum(self.archive_session(session_id) for (session_id,) in cursor.fetchall())
+
+    def restore_session(self, session_id: str) -> int:
+        """Move an archived session back into the quotes table so it can be appended to or re-ingested."""
+        row = self.conn.execute(
+            "SELECT broker, symbol, storage FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or row[2] != 'parquet':
+            return 0
+        broker, symbol, _ = row
+        store = self._require_quote_store()
+        df = store.scan(broker, symbol, session_id=session_id)
+        instrument_id = self.get_instrument_id(broker, symbol)
+        with self.conn:
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO quotes (session_id, instrument_id, timestamp, bid, ask)
+                VALUES (?, ?, ?, ?, ?)
+            """, ((session_id, instrument_id, int(ts), bid, ask)
+                  for ts, bid, ask in df[["timestamp", "bid", "ask"]].itertuples(index=False)))
+            self.conn.execute("UPDATE sessions SET storage = 'sqlite' WHERE session_id = ?", (session_id,))
+        store.delete_session(broker, symbol, session_id)
+        logger.info(f"Restored session {session_id} from Parquet ({len(df)} quotes)")
+        return len(df)
+
+    def _archived_instruments(self, broker: Optional[str] = None, symbol: Optional[str] = None
+                              ) -> List[Tuple[str, str]]:
+        """Instruments (optionally filtered) with at least one session in the Parquet store."""
+        if self.quote_store is None:
+            return []
+        query = "SELECT DISTINCT broker, symbol FROM sessions WHERE storage = 'parquet'"
+        params = []
+        if broker is not None:
+            query += " AND broker = ?"
+            params.append(broker)
+        if symbol is not None:
+            query += " AND symbol = ?"
+            params.append(symbol)
+        return self.conn.execute(query, params).fetchall()
+
     # -------- Fetching Methods --------
 
+    @instrumented_query
+    def get_instrument_bounds(self, broker: str, symbol: str) -> Optional[Tuple[int, int]]:
+        """Return (first, last) session time for an instrument, or None if it has no sessions."""
+        row = self.conn.execute("""
+            SELECT MIN(start_time), MAX(end_time) FROM sessions WHERE broker = ? AND symbol = ?
+        """, (broker, symbol)).fetchone()
+        return row if row and row[0] is not None else None
+
+    @instrumented_query
+    def count_quotes(self, broker: str, symbol: str) -> int:
+        """Number of stored quotes for one instrument, SQLite and Parquet together."""
+        count = self.conn.execute("""
+            SELECT COUNT(*) FROM quotes
+            WHERE instrument_id = (SELECT instrument_id FROM instruments WHERE broker = ? AND symbol = ?)
+        """, (broker, symbol)).fetchone()[0]
+        if self._archived_instruments(broker, symbol):
+            count += self.quote_store.count(broker, symbol)
+        return count
+
+    @instrumented_query
+    def get_rollups(
+        self,
+        broker: str,
+        symbol: str,
+        resolution: int,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Return rollup rows (bucket_ts, OHLC, spread_mean, tick_count) for one resolution, oldest first."""
+        query = f"""
+        SELECT {", ".join("r." + c for c in quote_series.ROLLUP_COLUMNS)}
+        FROM quote_rollups r
+        JOIN instruments i ON r.instrument_id = i.instrument_id
+        WHERE i.broker = ? AND i.symbol = ? AND r.resolution = ?
+        """
+        params = [broker, symbol, resolution]
+        if start_time is not None:
+            query += " AND r.bucket_ts >= ?"
+            params.append(start_time // resolution * resolution)
+        if end_time is not None:
+            query += " AND r.bucket_ts <= ?"
+            params.append(end_time)
+        query += " ORDER BY r.bucket_ts"
+        return pd.read_sql_query(query, self.conn, params=tuple(params))
+
+    @instrumented_query
     def fetch_quotes(
         self,
         broker: Optional[str] = None,
         symbol: Optional[str] = None,
         start_time: Optional[int] = None,
-        end_time: Optional[int] = None
-    ) -> List[Tuple[str, str, float, float]]:
+        end_time: Optional[int] = None,
+        since_ts: Optional[int] = None
+    ) -> List[Tuple[str, int, float, float]]:
+        """Return (session_id, timestamp ms, bid, ask); since_ts keeps only rows strictly newer than it."""
         query = """
         SELECT q.session_id, q.timestamp, q.bid, q.ask
         FROM quotes q
-        JOIN sessions s ON q.session_id = s.session_id
-        WHERE 1=1
+        WHERE q.instrument_id IN (SELECT instrument_id FROM instruments WHERE 1=1
         """
         params = []
 
         if broker is not None:
-            query += " AND s.broker = ?"
+            query += " AND broker = ?"
             params.append(broker)
         if symbol is not None:
-            query += " AND s.symbol = ?"
+            query += " AND symbol = ?"
             params.append(symbol)
+        query += ")"
         if start_time is not None:
             query += " AND q.timestamp >= ?"
             params.append(start_time)
         if end_time is not None:
             query += " AND q.timestamp <= ?"
             params.append(end_time)
+        if since_ts is not None:
+            query += " AND q.timestamp > ?"
+            params.append(since_ts)
+
+        rows = self.conn.execute(query, params).fetchall()
+        for archived in self._archived_instruments(broker, symbol):
+            df = self.quote_store.scan(*archived, start_time=start_time, end_time=end_time, since_ts=since_ts)
+            rows += zip(df["session_id"], df["timestamp"].tolist(), df["bid"].tolist(), df["ask"].tolist())
+        return rows
+
+    def iter_quotes(
+        self,
+        broker: str,
+        symbol: str,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        since_ts: Optional[int] = None,
+        batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator[List[Tuple[str, int, float, float]]]:
+        """Yield one instrument's (session_id, timestamp ms, bid, ask) rows oldest first, batch_size at a time.
+
+        SQLite rows are paged off one cursor with fetchmany and archived Parquet rows are read
+        a day at a time, so memory stays at about one batch (or one archived day) whatever
+        the range. The whole iteration runs in a single read transaction.
+        """
+        query = """
+        SELECT q.session_id, q.timestamp, q.bid, q.ask
+        FROM quotes q
+        WHERE q.instrument_id = (SELECT instrument_id FROM instruments WHERE broker = ? AND symbol = ?)
+        """
+        params = [broker, symbol]
+        if start_time is not None:
+            query += " AND q.timestamp >= ?"
+            params.append(start_time)
+        if end_time is not None:
+            query += " AND q.timestamp <= ?"
+            params.append(end_time)
+        if since_ts is not None:
+            query += " AND q.timestamp > ?"
+            params.append(since_ts)
+        query += " ORDER BY q.timestamp"
 
         cursor = self.conn.execute(query, params)
-        results = cursor.fetchall()
-        
-        def to_iso(ts: int) -> str:
-            if ts > 1e12:
-                ts = ts / 1000
-            return datetime.fromtimestamp(ts / 1000, tz=timezone.utc).isoformat().replace("+00:00", "Z")
-        
-        return[
-            (session_id, to_iso(timestamp), bid, ask)
-            for session_id, timestamp, bid, ask in results
-        ]
+        try:
+            def sqlite_batches():
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        return
+                    yield batch
+
+            if not self._archived_instruments(broker, symbol):
+                yield from sqlite_batches()
+                return
 
+            # Archived sessions may overlap live ones in time, so merge the two sorted streams
+            archived_rows = itertools.chain.from_iterable(
+                zip(df["session_id"], df["timestamp"].tolist(), df["bid"].tolist(), df["ask"].tolist())
+                for df in self.quote_store.iter_days(broker, symbol, start_time=start_time,
+                                                     end_time=end_time, since_ts=since_ts))
+            merged = heapq.merge(itertools.chain.from_iterable(sqlite_batches()), archived_rows,
+                                 key=operator.itemgetter(1))
+            while True:
+                batch = list(itertools.islice(merged, batch_size))
+                if not batch:
+                    return
+                yield batch
+        finally:
+            cursor.close()
 
 
+
+    @instrumented_query
+    def fetch_quotes_page(
+        self,
+        broker: Optional[str] = None,
+        symbol: Optional[str] = None,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        since_ts: Optional[int] = None,
+        after: Optional[Tuple[str, int]] = None,
+        limit: int = QUOTE_PAGE_SIZE,
+        session_id: Optional[str] = None
+    ) -> List[Tuple[str, int, float, float]]:
+        """Up to `limit` fetch_quotes rows in (session_id, timestamp) order, strictly after the key `after`.
+
+        Only sessions overlapping the range are walked, in id order, with one seek on the
+        UNIQUE(session_id, timestamp) index each (Parquet sessions are read a day at a time from
+        the cursor on), stopping once the page is full, so a page costs the same however deep into
+        the range it starts. session_id restricts the walk to that one session.
+        """
+        query = "SELECT session_id, broker, symbol, storage FROM sessions WHERE 1=1"
+        params = []
+        if broker is not None:
+            query += " AND broker = ?"
+            params.append(broker)
+        if symbol is not None:
+            query += " AND symbol = ?"
+            params.append(symbol)
+        if start_time is not None:
+            query += " AND end_time >= ?"
+            params.append(start_time)
+        if end_time is not None:
+            query += " AND start_time <= ?"
+            params.append(end_time)
+        if since_ts is not None:
+            query += " AND end_time > ?"
+            params.append(since_ts)
+        if session_id is not None:
+            query += " AND session_id = ?"
+            params.append(session_id)
+        if after is not None:
+            query += " AND session_id >= ?"
+            params.append(after[0])
+        query += " ORDER BY session_id"
+
+        rows = []
+        for session, session_broker, session_symbol, storage in self.conn.execute(query, params).fetchall():
+            lower = [ts for ts in (since_ts, after[1] if after is not None and session == after[0] else None)
+                     if ts is not None]
+            newer_than = max(lower) if lower else None
+            remaining = limit - len(rows)
+            if storage == 'parquet':
+                days = self._require_quote_store().iter_days(session_broker, session_symbol, start_time=start_time,
+                                                             end_time=end_time, since_ts=newer_than,
+                                                             session_id=session)
+                for df in days:
+                    df = df.head(limit - len(rows))
+                    rows += zip(df["session_id"], df["timestamp"].tolist(), df["bid"].tolist(), df["ask"].tolist())
+                    if len(rows) >= limit:
+                        break
+            else:
+                page_query = "SELECT session_id, timestamp, bid, ask FROM quotes WHERE session_id = ?"
+                page_params = [session]
+                if start_time is not None:
+                    page_query += " AND timestamp >= ?"
+                    page_params.append(start_time)
+                if end_time is not None:
+                    page_query += " AND timestamp <= ?"
+                    page_params.append(end_time)
+                if newer_than is not None:
+                    page_query += " AND timestamp > ?"
+                    page_params.append(newer_than)
+                page_query += " ORDER BY timestamp LIMIT ?"
+                page_params.append(remaining)
+                rows += self.conn.execute(page_query, page_params).fetchall()
+            if len(rows) >= limit:
+                break
+        return rows
+
+    @instrumented_query
     def get_all_brokers(self) -> List[str]:
-        cursor = self.conn.execute("SELECT DISTINCT broker FROM sessions")
-        return [row[0] for row in cursor.fetchall()]
+        return self.catalog().brokers()
     
 
+    @instrumented_query
     def get_symbols_by_broker(self, broker: str) -> List[str]:
-        cursor = self.conn.execute("""
-        SELECT DISTINCT symbol FROM sessions
-        WHERE broker = ?
-        """, (broker,))
-        return [row[0] for row in cursor.fetchall()]
+        return self.catalog().symbols_for(broker)
     
     
+    @instrumented_query
     def get_brokers_and_symbols(self):
-        cursor = self.conn.execute("SELECT DISTINCT broker FROM sessions")
-        brokers_list = [row[0] for row in cursor.fetchall()]
-
-        result = {}
-        for broker in brokers_list:
-            result[broker] = self.get_symbols_by_broker(broker)
-        return result
+        catalog = self.catalog()
+        return {broker: catalog.symbols_for(broker) for broker in catalog.brokers()}
 
+    @instrumented_query
     def get_dates_by_broker_symbol(self, broker: str, symbol: str) -> List[str]:
-        cursor = self.conn.execute("""
-        SELECT DISTINCT DATE(q.timestamp / 1000, 'unixepoch')
-        FROM quotes q
-        JOIN sessions s ON q.session_id = s.session_id
-        WHERE s.broker = ? AND s.symbol = ?
-        ORDER BY 1
-        """, (broker, symbol))
-        return [row[0] for row in cursor.fetchall() if row[0] is not None]
+        entry = self.catalog().entry(broker, symbol)
+        return list(entry["dates"]) if entry else []
 
+    @instrumented_query
     def get_sessions_by_date(self, broker: str, symbol: str, date: str) -> List[str]:
-        cursor = self.conn.execute("""
-        SELECT DISTINCT s.session_id
-        FROM sessions s
-        JOIN quotes q ON s.session_id = q.session_id
-        WHERE s.broker = ? AND s.symbol = ? AND DATE(q.timestamp / 1000, 'unixepoch') = ?
-        """, (broker, symbol, date))
-        return [row[0] for row in cursor.fetchall()]
+        entry = self.catalog().entry(broker, symbol)
+        return list(entry["sessions_by_date"].get(date, [])) if entry else []
 
+    @instrumented_query
     def get_quotes_by_session(self, session_id: str) -> List[Tuple[str, float, float]]:
         cursor = self.conn.execute("""
         SELECT datetime(timestamp, 'unixepoch') as ts, bid, ask
@@ -171,6 +774,7 @@ class QuoteDatabase:
         """, (session_id,))
         return cursor.fetchall()
 
+    @instrumented_query
     def get_sessions_by_date_range(self, broker: str, symbol: str, date: str) -> List[str]:
         cursor = self.conn.execute("""
         SELECT session_id
@@ -180,44 +784,145 @@ class QuoteDatabase:
         """, (broker, symbol, date, date))
         return [row[0] for row in cursor.fetchall()]
     
+    @instrumented_query
+    def get_series(
+        self,
+        broker: str,
+        symbol: str,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Return timestamp/bid/ask/session_id for one broker/symbol, oldest first, timestamps as int64 ms."""
+        query = """
+        SELECT q.timestamp, q.bid, q.ask, q.session_id
+        FROM quotes q
+        JOIN instruments i ON q.instrument_id = i.instrument_id
+        WHERE i.broker = ? AND i.symbol = ?
+        """
+        params = [broker, symbol]
+        if start_time is not None:
+            query += " AND q.timestamp >= ?"
+            params.append(start_time)
+        if end_time is not None:
+            query += " AND q.timestamp <= ?"
+            params.append(end_time)
+        query += " ORDER BY q.timestamp"
+
+        df = pd.read_sql_query(query, self.conn, params=tuple(params))
+        if self._archived_instruments(broker, symbol):
+            archived = self.quote_store.scan(broker, symbol, start_time=start_time, end_time=end_time)
+            df = pd.concat([df, archived], ignore_index=True).sort_values('timestamp', kind='stable',
+                                                                          ignore_index=True)
+        df['timestamp'] = df['timestamp'].astype('int64')
+        return df
+
+    @instrumented_query
+    def get_series_arrays(
+        self,
+        broker: str,
+        symbol: str,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """get_series as arrays: ts (int64), bid/ask (float64), session (int32 index into 'sessions').
+
+        For whole-range numeric work like analytics. Each session overlapping the range is one
+        read of the covering idx_quotes_instrument_ts straight into a NumPy array, so no
+        DataFrame or per-row session_id strings are built.
+        """
+        query = "SELECT session_id, start_time, end_time FROM sessions WHERE broker = ? AND symbol = ? AND storage = 'sqlite'"
+        params = [broker, symbol]
+        if start_time is not None:
+            query += " AND end_time >= ?"
+            params.append(start_time)
+        if end_time is not None:
+            query += " AND start_time <= ?"
+            params.append(end_time)
+        sessions = self.conn.execute(query + " ORDER BY start_time", params).fetchall()
+        instrument_id = self.get_instrument_id(broker, symbol)
+        # With disjoint session bounds every tick inside a session's bounds is that session's
+        disjoint = all(start > previous[2] for previous, (_, start, _) in zip(sessions, sessions[1:]))
+
+        parts = []
+        for session_id, first, last in sessions:
+            query = "SELECT timestamp, bid, ask FROM quotes WHERE instrument_id = ? AND timestamp BETWEEN ? AND ?"
+            params = [instrument_id, max(first, start_time) if start_time is not None else first,
+                      min(last, end_time) if end_time is not None else last]
+            if not disjoint:
+                query += " AND session_id = ?"
+                params.append(session_id)
+            parts.append(np.fromiter(self.conn.execute(query, params), dtype=TICK_DTYPE))
+        names = [session_id for session_id, _, _ in sessions]
+        codes = [np.full(len(part), code, dtype=np.int32) for code, part in enumerate(parts)]
+        if self._archived_instruments(broker, symbol):
+            archived = self.quote_store.scan(broker, symbol, start_time=start_time, end_time=end_time)
+            archived_codes, archived_names = pd.factorize(archived['session_id'])
+            part = np.empty(len(archived), dtype=TICK_DTYPE)
+            part['ts'], part['bid'], part['ask'] = archived['timestamp'], archived['bid'], archived['ask']
+            parts.append(part)
+            codes.append((archived_codes + len(names)).astype(np.int32))
+            names += list(archived_names)
+
+        ticks = np.concatenate(parts) if parts else np.empty(0, dtype=TICK_DTYPE)
+        session = np.concatenate(codes) if codes else np.empty(0, dtype=np.int32)
+        if len(parts) > 1:
+            order = np.argsort(ticks['ts'], kind='stable')
+            ticks, session = ticks[order], session[order]
+        return {"ts": np.ascontiguousarray(ticks['ts']), "bid": np.ascontiguousarray(ticks['bid']),
+                "ask": np.ascontiguousarray(ticks['ask']), "session": session, "sessions": names}
+
+    @instrumented_query
     def get_data(self, broker_a, symbol_a, broker_b, symbol_b, limit=1000, time_range_hours='all'):
         try:
-            # Debug: Check if brokers and symbols exist
-            available_brokers = pd.read_sql_query("SELECT DISTINCT broker FROM sessions", self.conn)['broker'].tolist()
-            available_symbols = pd.read_sql_query("SELECT DISTINCT symbol FROM sessions", self.conn)['symbol'].tolist()
+            # Check that the brokers and symbols exist
+            catalog = self.catalog()
+            available_brokers = catalog.brokers()
+            available_symbols = catalog.symbols
             if broker_a not in available_brokers or broker_b not in available_brokers:
-                print(f"Broker not found: broker_a={broker_a}, broker_b={broker_b}, available={available_brokers}")
+                logger.warning(f"Broker not found: broker_a={broker_a}, broker_b={broker_b}, available={available_brokers}")
                 return pd.DataFrame()
             if symbol_a not in available_symbols or symbol_b not in available_symbols:
-                print(f"Symbol not found: symbol_a={symbol_a}, symbol_b={symbol_b}, available={available_symbols}")
+                logger.warning(f"Symbol not found: symbol_a={symbol_a}, symbol_b={symbol_b}, available={available_symbols}")
                 return pd.DataFrame()
 
-            # Base query
-            query = """
-            SELECT q.session_id, q.bid, q.ask, q.timestamp, s.broker, s.symbol
-            FROM quotes q
-            JOIN sessions s ON q.session_id = s.session_id
-            WHERE (
-                (s.broker = ? AND s.symbol = ?) OR
-                (s.broker = ? AND s.symbol = ?)
-            )
-            """
-            params = [broker_a, symbol_a, broker_b, symbol_b]
-
-            # Add time range filter if not 'all'
-            if time_range_hours != 'all':
-                current_time_ms = int(datetime.now().timestamp() * 1000)
-                time_range_ms = int(time_range_hours) * 3600 * 1000  # Convert hours to milliseconds
-                query += " AND q.timestamp >= ?"
-                params.append(current_time_ms - time_range_ms)
+            # One newest-first index range read per instrument (covering index on
+            # instrument_id, timestamp), merged and trimmed to the overall limit
+            start_time = time_range_start_ms(time_range_hours)
+            parts = []
+            params = []
+            for broker, symbol in dict.fromkeys([(broker_a, symbol_a), (broker_b, symbol_b)]):
+                part = """
+                SELECT * FROM (
+                    SELECT q.session_id, q.bid, q.ask, q.timestamp, i.broker, i.symbol
+                    FROM quotes q
+                    JOIN instruments i ON q.instrument_id = i.instrument_id
+                    WHERE i.broker = ? AND i.symbol = ?
+                """
+                params += [broker, symbol]
+                if start_time is not None:
+                    part += " AND q.timestamp >= ?"
+                    params.append(start_time)
+                part += " ORDER BY q.timestamp DESC LIMIT ?)"
+                params.append(limit)
+                parts.append(part)
 
-            query += " ORDER BY q.timestamp DESC LIMIT ?"
+            query = " UNION ALL ".join(parts) + " ORDER BY timestamp DESC LIMIT ?"
             params.append(limit)
 
             df = pd.read_sql_query(query, self.conn, params=tuple(params))
+            # Archived sessions contribute their own newest `limit` rows per instrument
+            archived = [
+                self.quote_store.newest(broker, symbol, limit, start_time)
+                    .assign(broker=broker, symbol=symbol)
+                for broker, symbol in dict.fromkeys([(broker_a, symbol_a), (broker_b, symbol_b)])
+                if self._archived_instruments(broker, symbol)
+            ]
+            if archived:
+                df = pd.concat([df, *archived], ignore_index=True)[df.columns]
+                df = df.sort_values('timestamp', ascending=False, kind='stable', ignore_index=True).head(limit)
             if df.empty:
-                print(f"No data returned for query: broker_a={broker_a}, symbol_a={symbol_a}, "
-                      f"broker_b={broker_b}, symbol_b={symbol_b}, time_range={time_range_hours}")
+                logger.debug(f"No data returned for query: broker_a={broker_a}, symbol_a={symbol_a}, "
+                             f"broker_b={broker_b}, symbol_b={symbol_b}, time_range={time_range_hours}")
                 return pd.DataFrame()
 
             # Convert Unix epoch milliseconds to datetime
@@ -225,13 +930,97 @@ class QuoteDatabase:
 
             return df
         except Exception as e:
-            print(f"Error in get_data: {e}")
+            logger.error(f"Error in get_data: {e}", exc_info=True)
             return pd.DataFrame()
 
 
 
 
 
+    @instrumented_query
+    def get_newest_series(
+        self,
+        instruments: List[Tuple[str, str]],
+        limit: int,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        since_ts: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Newest `limit` rows of every (broker, symbol) in the range, fetched in one statement.
+
+        Unlike get_data the limit applies per instrument, so a busy feed can't crowd out a quiet
+        one. Returns session_id/bid/ask/timestamp/broker/symbol, newest first within each instrument.
+        """
+        since = {instrument: since_ts for instrument in instruments}
+        return self._series_heads(since, limit, start_time, end_time, newest=True)
+
+    @instrumented_query
+    def get_series_after(
+        self,
+        since: Dict[Tuple[str, str], Optional[int]],
+        limit: int,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Oldest `limit` rows of each (broker, symbol) strictly after its own watermark in `since`.
+
+        What an incremental poll needs: a backlog larger than `limit` is returned in order over
+        several polls instead of being skipped. Same columns as get_newest_series, oldest first.
+        """
+        return self._series_heads(since, limit, start_time, end_time, newest=False)
+
+    def _series_heads(self, since, limit, start_time, end_time, newest):
+        """One UNION ALL of per-instrument index range reads, each with its own LIMIT and since bound."""
+        parts = []
+        params = []
+        for (broker, symbol), since_ts in since.items():
+            part = """
+            SELECT * FROM (
+                SELECT q.session_id, q.bid, q.ask, q.timestamp, i.broker, i.symbol
+                FROM quotes q
+                JOIN instruments i ON q.instrument_id = i.instrument_id
+                WHERE i.broker = ? AND i.symbol = ?
+            """
+            params += [broker, symbol]
+            if start_time is not None:
+                part += " AND q.timestamp >= ?"
+                params.append(start_time)
+            if end_time is not None:
+                part += " AND q.timestamp <= ?"
+                params.append(end_time)
+            if since_ts is not None:
+                part += " AND q.timestamp > ?"
+                params.append(since_ts)
+            part += f" ORDER BY q.timestamp {'DESC' if newest else 'ASC'} LIMIT ?)"
+            params.append(limit)
+            parts.append(part)
+        columns = ['session_id', 'bid', 'ask', 'timestamp', 'broker', 'symbol']
+        if not parts:
+            return pd.DataFrame(columns=columns)
+
+        df = pd.read_sql_query(" UNION ALL ".join(parts), self.conn, params=tuple(params))
+        archived = []
+        for (broker, symbol), since_ts in since.items():
+            if not self._archived_instruments(broker, symbol):
+                continue
+            if newest and end_time is None:
+                part = self.quote_store.newest(broker, symbol, limit, start_time, since_ts)
+            else:
+                part = self.quote_store.scan(broker, symbol, start_time=start_time, end_time=end_time,
+                                             since_ts=since_ts)
+                part = part.iloc[::-1].head(limit) if newest else part.head(limit)
+            archived.append(part.assign(broker=broker, symbol=symbol))
+        if archived:
+            df = pd.concat([df, *archived], ignore_index=True)[columns]
+            df = (df.sort_values('timestamp', ascending=not newest, kind='stable', ignore_index=True)
+                    .groupby(['broker', 'symbol'], sort=False).head(limit).reset_index(drop=True))
+        df['timestamp'] = df['timestamp'].astype('int64')
+        return df
+
+    def interrupt(self):
+        """Abort whatever statement this connection is running; safe to call from another thread."""
+        self.conn.interrupt()
+
     def close(self):
         if self.conn:
             self.conn.close()
@@ -0,0 +1,76 @@
+import io
+from typing import Iterable, Iterator, List, Tuple
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: without it the Arrow export format is not offered
+    pa = None
+
+import fast_json
+import wire_format
+
+Row = Tuple[str, int, float, float]  # (session_id, timestamp ms, bid, ask), as from QuoteDatabase.iter_quotes
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "arrow": wire_format.ARROW,
+}
+EXPORT_EXTENSIONS = {"csv": "csv", "ndjson": "ndjson", "arrow": "arrows"}
+
+def available_formats() -> List[str]:
+    return [name for name in EXPORT_MEDIA_TYPES if name != "arrow" or pa is not None]
+
+def _csv(batches: Iterable[List[Row]]) -> Iterator[bytes]:
+    yield b"timestamp,bid,ask,session_id\n"
+    for batch in batches:
+        # repr round-trips floats exactly; session ids are generated and never contain commas
+        yield "".join(f"{ts},{bid!r},{ask!r},{session_id}\n" for session_id, ts, bid, ask in batch).encode()
+
+def _ndjson(batches: Iterable[List[Row]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield b"".join(fast_json.dumps({"timestamp": ts, "bid": bid, "ask": ask, "session_id": session_id}) + b"\n"
+                       for session_id, ts, bid, ask in batch)
+
+def _arrow(batches: Iterable[List[Row]], broker: str, symbol: str) -> Iterator[bytes]:
+    """An Arrow IPC stream, one record batch per page; broker and symbol ride in the schema metadata."""
+    schema = pa.schema([
+        ("timestamp", pa.int64()),
+        ("bid", pa.float64()),
+        ("ask", pa.float64()),
+        ("session_id", pa.dictionary(pa.int32(), pa.string())),
+    ], metadata={"broker": broker, "symbol": symbol})
+    sink = io.BytesIO()
+
+    def drain() -> bytes:
+        chunk = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return chunk
+
+    writer = pa.ipc.new_stream(sink, schema)
+    yield drain()
+    for batch in batches:
+        session_ids, ts, bid, ask = zip(*batch)
+        writer.write_batch(pa.record_batch([
+            pa.array(np.fromiter(ts, dtype=np.int64, count=len(batch))),
+            pa.array(np.fromiter(bid, dtype=np.float64, count=len(batch))),
+            pa.array(np.fromiter(ask, dtype=np.float64, count=len(batch))),
+            pa.array(session_ids, type=pa.string()).dictionary_encode(),
+        ], schema=schema))
+        yield drain()
+    writer.close()
+    yield drain()
+
+def encode_export(batches: Iterable[List[Row]], format: str, broker: str, symbol: str) -> Iterator[bytes]:
+    """Turn row batches into body chunks for one export format; one chunk per batch."""
+    if format == "csv":
+        return _csv(batches)
+    if format == "ndjson":
+        return _ndjson(batches)
+    if format == "arrow":
+        if pa is None:
+            raise RuntimeError("Arrow export needs pyarrow: pip install pyarrow")
+        return _arrow(batches, broker, symbol)
+    raise ValueError(f"Unknown export format {format!r}")
@@ -0,0 +1,222 @@
+import time
+import bisect
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+slow_query_logger = logging.getLogger("quote_metrics.slow_queries")
+
+# Bucket upper bounds in seconds, shared by every latency histogram
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROWS_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+RATE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000)
+
+HELP = {
+    "quote_http_request_seconds": "HTTP request latency by route template, method and status",
+    "quote_db_query_seconds": "Time spent in a QuoteDatabase read method",
+    "quote_db_query_rows": "Rows returned by a QuoteDatabase read method",
+    "quote_db_slow_queries_total": "QuoteDatabase calls slower than the slow-query threshold",
+    "quote_serialize_seconds": "Time spent building or encoding response bodies",
+    "quote_ingest_rows_total": "Quotes written by archive ingestion",
+    "quote_ingest_seconds_total": "Wall time spent ingesting archives",
+    "quote_ingest_rows_per_second": "Ingestion throughput per archive",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+class Metrics:
+    """In-process counters and histograms rendered in the Prometheus text format.
+
+    Disabled by default: every recording call then returns after one attribute check, and
+    nothing hooks into SQLite. With several uvicorn workers each process keeps its own
+    numbers, so scrape each worker (or run one) to get the whole picture.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_query_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._local = threading.local()
+
+    def configure(self, enabled: bool, slow_query_ms: Optional[float] = None):
+        """Turn recording on or off; slow_query_ms (when enabled) logs query plans of slower calls."""
+        self.enabled = enabled
+        self.slow_query_seconds = slow_query_ms / 1000 if enabled and slow_query_ms else None
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        if not self.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    # -------- Slow-query capture --------
+
+    def attach(self, conn):
+        """Record the SQL a connection runs during instrumented calls; no-op unless a slow-query threshold is set."""
+        if self.slow_query_seconds is None:
+            return
+        conn.set_trace_callback(self._trace)
+
+    def _trace(self, statement: str):
+        captured = getattr(self._local, "statements", None)
+        if captured is not None and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append(statement)
+
+    def _log_slow(self, conn, method: str, seconds: float, rows: Optional[int], statements: Iterable[str]):
+        """One log record per slow call: each distinct statement it ran with its query plan."""
+        self.inc("quote_db_slow_queries_total", method=method)
+        lines = [f"Slow query in {method}: {seconds * 1000:.1f} ms, {rows} rows"]
+        for statement in dict.fromkeys(statements):
+            try:
+                plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()]
+            except Exception as e:
+                plan = [f"(no plan: {e})"]
+            lines.append(f"  SQL: {' '.join(statement.split())[:2000]}")
+            lines += [f"    PLAN: {line}" for line in plan]
+        slow_query_logger.warning("\n".join(lines))
+
+    # -------- Rendering --------
+
+    @staticmethod
+    def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = labels + extra
+        if not pairs:
+            return ""
+        escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    def render(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        """Prometheus text exposition (version 0.0.4) of everything recorded, plus point-in-time gauges."""
+        with self._lock:
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            histograms = [(key, list(h.counts), h.sum, h.buckets) for key, h in histograms]
+            counters = sorted(self._counters.items())
+        lines, described = [], set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), counts, total, buckets in histograms:
+            describe(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{self._format_labels(labels, (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {total}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {cumulative}")
+        for (name, labels), value in counters:
+            describe(name, "counter")
+            lines.append(f"{name}{self._format_labels(labels)} {value}")
+        for name, value in sorted((gauges or {}).items()):
+            describe(name, "gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+METRICS = Metrics()
+
+def _row_count(result) -> Optional[int]:
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+def instrumented_query(method):
+    """Time a QuoteDatabase read method and count its rows; slow calls get their query plans logged."""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not METRICS.enabled:
+            return method(self, *args, **kwargs)
+        capture = METRICS.slow_query_seconds is not None and getattr(METRICS._local, "statements", None) is None
+        if capture:
+            METRICS._local.statements = []
+        t0 = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - t0
+            statements = METRICS._local.statements if capture else ()
+            if capture:
+                METRICS._local.statements = None
+        rows = _row_count(result)
+        METRICS.observe("quote_db_query_seconds", seconds, method=name)
+        if rows is not None:
+            METRICS.observe("quote_db_query_rows", rows, ROWS_BUCKETS, method=name)
+        if capture and seconds >= METRICS.slow_query_seconds:
+            METRICS._log_slow(self.conn, name, seconds, rows, statements)
+        return result
+
+    return wrapper
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template (not raw path, to bound label values)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS.enabled:
+            await self.app(scope, receive, send)
+            return
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            METRICS.observe("quote_http_request_seconds", time.perf_counter() - t0,
+                            route=getattr(route, "path", "unmatched"), method=scope["method"],
+                            status=status["code"])
@@ -0,0 +1,169 @@
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_STEP_MS = 1000
+
+
+def grid_step(start_ms: int, end_ms: int, step_ms: Optional[int] = None, max_points: Optional[int] = None) -> int:
+    """Pick a grid step (ms) that honours step_ms but never exceeds max_points."""
+    step = step_ms or DEFAULT_STEP_MS
+    if max_points and max_points > 1:
+        span = max(end_ms - start_ms, 0)
+        step = max(step, math.ceil(span / (max_points - 1)))
+    return max(int(step), 1)
+
+
+def build_grid(start_ms: int, end_ms: int, step_ms: int) -> np.ndarray:
+    """Return an int64 epoch-ms grid from start_ms to end_ms inclusive."""
+    return np.arange(start_ms, end_ms + 1, step_ms, dtype=np.int64)
+
+
+def interpolate(ts: np.ndarray, values: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """Linearly interpolate values onto grid; points outside the series' own range are NaN."""
+    if len(ts) == 0:
+        return np.full(len(grid), np.nan)
+    return np.interp(grid.astype(np.float64), ts.astype(np.float64), values, left=np.nan, right=np.nan)
+
+
+def to_json_list(values: np.ndarray) -> List[Optional[float]]:
+    """Convert a float array to a list, mapping NaN to None so it serialises as null."""
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
+
+
+DOWNSAMPLERS = ("lttb", "minmax")
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of n_out points that preserve the shape of y(x)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    # Interior points are split into n_out - 2 equal-count buckets; first and last are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the triangle's third vertex
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Per equal-count bucket keep the first, min, max and last point (up to n_out in total)."""
+    n = len(y)
+    n_buckets = max(n_out // 4, 1)
+    if n <= n_out:
+        return np.arange(n)
+    bucket = np.arange(n) * n_buckets // n
+    groups = pd.Series(y).groupby(bucket)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:] - 1, n - 1]
+    picks = np.concatenate([starts, ends, groups.idxmin().to_numpy(), groups.idxmax().to_numpy()])
+    return np.unique(picks)
+
+
+def downsample_indices(method: str, ts: np.ndarray, values: np.ndarray, n_out: int) -> np.ndarray:
+    if method == "lttb":
+        return lttb_indices(ts, values, n_out)
+    if method == "minmax":
+        return minmax_indices(values, n_out)
+    raise ValueError(f"Unknown downsampling method: {method}")
+
+
+ROLLUP_COLUMNS = ["bucket_ts", "bid_open", "bid_high", "bid_low", "bid_close",
+                  "ask_open", "ask_high", "ask_low", "ask_close", "spread_mean", "tick_count"]
+
+
+def ohlc_rollup(ts: np.ndarray, bid: np.ndarray, ask: np.ndarray, resolution_ms: int) -> pd.DataFrame:
+    """Aggregate time-ordered ticks into bid/ask OHLC, mean spread and tick count per bucket."""
+    df = pd.DataFrame({"bucket_ts": ts // resolution_ms * resolution_ms, "bid": bid, "ask": ask,
+                       "spread": ask - bid})
+    out = df.groupby("bucket_ts", sort=True).agg(
+        bid_open=("bid", "first"), bid_high=("bid", "max"), bid_low=("bid", "min"), bid_close=("bid", "last"),
+        ask_open=("ask", "first"), ask_high=("ask", "max"), ask_low=("ask", "min"), ask_close=("ask", "last"),
+        spread_mean=("spread", "mean"), tick_count=("bid", "size"),
+    )
+    return out.reset_index()[ROLLUP_COLUMNS]
+
+
+# Percentiles reported for spread and mid-difference distributions
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+def distribution(values: np.ndarray) -> dict:
+    """mean, std, min, max and PERCENTILES (as p1, p5, ...) of the finite values; all None when empty."""
+    values = values[np.isfinite(values)]
+    names = ["mean", "std", "min", "max"] + [f"p{p}" for p in PERCENTILES]
+    if len(values) == 0:
+        return dict.fromkeys(names)
+    stats = [values.mean(), values.std(), values.min(), values.max(), *np.percentile(values, PERCENTILES)]
+    return {name: float(v) for name, v in zip(names, stats)}
+
+
+def as_of(ts: np.ndarray, values: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """Last known value at or before each grid point (no interpolation); NaN before the first tick."""
+    idx = np.searchsorted(ts, grid, side="right") - 1
+    out = values[np.maximum(idx, 0)].astype(np.float64)
+    out[idx < 0] = np.nan
+    return out
+
+
+def tick_rate(ts: np.ndarray) -> Optional[float]:
+    """Average ticks per second between the first and last tick."""
+    if len(ts) < 2 or ts[-1] == ts[0]:
+        return None
+    return float((len(ts) - 1) * 1000 / (ts[-1] - ts[0]))
+
+
+def stale_gaps(ts: np.ndarray, sessions: np.ndarray, min_gap_ms: int, top: int = 5) -> dict:
+    """Gaps of at least min_gap_ms between consecutive ticks of the same session (breaks between sessions don't count)."""
+    gaps = np.diff(ts)
+    codes = pd.factorize(sessions)[0]
+    stale = np.flatnonzero((gaps >= min_gap_ms) & (codes[1:] == codes[:-1]))
+    longest = stale[np.argsort(gaps[stale], kind="stable")[::-1][:top]]
+    return {
+        "threshold_ms": int(min_gap_ms),
+        "count": int(len(stale)),
+        "total_ms": int(gaps[stale].sum()),
+        "max_ms": int(gaps[stale].max()) if len(stale) else None,
+        "longest": [[int(ts[i]), int(ts[i + 1])] for i in longest],
+    }
+
+
+# Up to this many lags cross_correlation uses direct dot products instead of an FFT
+DIRECT_CORRELATION_LAGS = 256
+
+
+def cross_correlation(x: np.ndarray, y: np.ndarray, max_lag: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Pearson correlation of x[t] with y[t + k] for k in [-max_lag, max_lag], via one FFT.
+
+    A peak at positive k means y follows x by k steps.
+    """
+    n = len(x)
+    max_lag = min(max_lag, n - 1)
+    lags = np.arange(-max_lag, max_lag + 1)
+    x = x - x.mean()
+    y = y - y.mean()
+    norm = math.sqrt(float(np.dot(x, x)) * float(np.dot(y, y)))
+    if n < 2 or norm == 0:
+        return lags, np.full(len(lags), np.nan)
+    if len(lags) <= DIRECT_CORRELATION_LAGS:
+        # A narrow window is cheaper as one dot product per lag than as an FFT of the whole series
+        sums = [np.dot(x[:n - k], y[k:]) if k >= 0 else np.dot(x[-k:], y[:n + k]) for k in lags]
+        return lags, np.asarray(sums) / norm
+    size = 1 << int(2 * n - 1).bit_length()
+    full = np.fft.irfft(np.conj(np.fft.rfft(x, size)) * np.fft.rfft(y, size), size)
+    # full[k] = sum_t x[t] * y[t + k]; negative lags wrap around to the end
+    return lags, full[lags] / norm
@@ -1,11 +1,16 @@
 import os
-from decimal import Decimal
 import pandas as pd
+import numpy as np
 import logging
 
-from sqlalchemy import Float
-from ingest import ingest_zip_archive
-from quote_db import QuoteDatabase
+from ingest import ingest_zip_archive, ingest_archives_parallel, plan_ingestion, DEFAULT_BATCH_SIZE, DEFAULT_PARSER
+from quote_db import QuoteDatabase, time_range_start_ms, ROLLUP_RESOLUTIONS, EXPORT_BATCH_SIZE, QUOTE_PAGE_SIZE
+from quote_export import encode_export
+from page_cursor import InvalidCursor, encode_cursor, decode_cursor
+from query_executor import QueryExecutor, SingleFlight
+from hot_series_cache import HotSeriesCache
+from quote_metrics import METRICS
+import quote_series
 from quote_contracts import (
     FetchQuoteRequest,
     QuoteResponse,
@@ -19,33 +24,93 @@ from quote_contracts import (
     ListSessionResponse,
     IngestRequest, 
     IngestResponse,
-    FetchData,
     FetchDataResponse,
-    BrokersSymbolsResponse
+    BrokersSymbolsResponse,
+    ComparisonResponse,
+    OHLCResponse,
+    AnalyticsResponse,
+    BrokerAnalytics,
+    LeadLagStats
 )
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Cap on the analytics alignment grid; step_ms is widened for longer ranges (a day at 100 ms is 864k)
+MAX_ANALYTICS_GRID_POINTS = 2_000_000
+# Sessions per /sessions page when a cursor is sent without page_size
+SESSION_PAGE_SIZE = 100
+
+def _timestamp_text(values: pd.Series) -> List[str]:
+    """str(pd.Timestamp) for every value, vectorised: '... 12:00:59.836000', or '... 12:00:59' on a whole second."""
+    us = values.to_numpy(dtype='datetime64[us]')
+    text = np.datetime_as_string(us, unit='us')
+    if len(text):
+        text.view('<U1').reshape(len(text), -1)[:, 10] = ' '
+    return np.where(us.astype(np.int64) % 1_000_000 == 0, text.astype('<U19'), text).tolist()
+
 class QuoteService:
-    def __init__(self, db: QuoteDatabase):
+    def __init__(self, db: QuoteDatabase, executor: Optional[QueryExecutor] = None,
+                 hot_cache: Optional[HotSeriesCache] = None, flights: Optional[SingleFlight] = None):
         self.db = db
+        self.executor = executor
+        self.hot_cache = hot_cache
+        self.flights = flights
+
+    async def run_async(self, method, *args, timeout=None, is_disconnected=None, **kwargs):
+        """Await a blocking service method on the query pool, interrupting its SQL on timeout or disconnect."""
+        return await self.executor.run(method, *args, interrupt=self.db.interrupt, timeout=timeout,
+                                       is_disconnected=is_disconnected,
+                                       on_abandon=lambda job: setattr(self.db, "in_flight", job), **kwargs)
+
+    async def run_shared(self, key, method, *args, timeout=None, is_disconnected=None, **kwargs):
+        """run_async, but concurrent calls with the same normalized key share one execution and its result.
+
+        key must capture everything the result depends on (parameters and data version);
+        without a SingleFlight this is just run_async.
+        """
+        if self.flights is None:
+            return await self.run_async(method, *args, timeout=timeout, is_disconnected=is_disconnected, **kwargs)
+        return await self.flights.run(key, lambda: self.run_async(method, *args, timeout=timeout,
+                                                                  is_disconnected=is_disconnected, **kwargs))
 
     
 
-    def ingest_archives_from_folder(self, folder: Path):
+    def ingest_archives_from_folder(self, folder: Path, workers: int = 1, batch_size: int = DEFAULT_BATCH_SIZE,
+                                    parser: str = DEFAULT_PARSER, force: bool = False, dry_run: bool = False):
+        """Ingest new or changed archive members in folder; workers > 1 parses in a process pool.
+
+        dry_run only returns (and logs) what would be loaded; force ignores the manifest.
+        """
+        if dry_run:
+            plan = plan_ingestion(sorted(folder.glob("*.zip")), self.db, force)
+            for entry in plan:
+                logger.info(f"[dry-run] {entry['status']:<9} {entry['archive']}/{entry['member']} ({entry['size']} bytes)")
+            to_load = [entry for entry in plan if entry["status"] != "unchanged"]
+            logger.info(f"[dry-run] {len(to_load)} of {len(plan)} members would be loaded")
+            return plan
+
+        if workers > 1:
+            zip_files = sorted(folder.glob("*.zip"))
+            logger.info(f"Ingesting {len(zip_files)} archives with {workers} workers")
+            results = ingest_archives_parallel(zip_files, self.db, workers=workers, batch_size=batch_size,
+                                               parser=parser, force=force)
+            self._refresh_hot_cache()
+            return results
+
         for zip_file in folder.glob("*.zip"):
             if not zip_file.exists():
                 logger.warning(f"ZIP archive not found: {zip_file}")
                 continue
             logger.info(f"Ingesting archive: {zip_file}")
-            result = self.ingest_archive(IngestRequest(zip_path=str(zip_file)))
+            result = self.ingest_archive(IngestRequest(zip_path=str(zip_file), force=force), parser=parser)
             if result.status == "success":
                 logger.info(f"Archive ingested successfully: {zip_file}")
             else:
                 logger.error(f"Ingestion error for {zip_file}: {result.message}")
 
-    def ingest_archive(self, request: IngestRequest) -> IngestResponse:
+    def ingest_archive(self, request: IngestRequest, parser: str = DEFAULT_PARSER) -> IngestResponse:
         """Ingest a ZIP archive into the database."""
         zip_path = Path(request.zip_path)
 
@@ -54,7 +119,8 @@ class QuoteService:
             return IngestResponse(status="failed", message="ZIP archive not found.")
 
         try:
-            ingest_zip_archive(zip_path, db=self.db)
+            ingest_zip_archive(zip_path, db=self.db, parser=parser, force=request.force)
+            self._refresh_hot_cache()
             return IngestResponse(
                 status="success",
                 message="Archive ingested successfully."
@@ -68,6 +134,35 @@ class QuoteService:
 
 
 
+    def _refresh_hot_cache(self):
+        """Append freshly ingested ticks to the hot series this process has mapped."""
+        if self.hot_cache is not None:
+            self.hot_cache.refresh_cached(self.db)
+
+    def _series(self, broker, symbol, start_time=None, end_time=None) -> pd.DataFrame:
+        """db.get_series, answered from the hot series cache when one is configured."""
+        if self.hot_cache is not None:
+            series = self.hot_cache.get_series(self.db, broker, symbol, start_time, end_time)
+            if series is not None:
+                return series
+        return self.db.get_series(broker, symbol, start_time=start_time, end_time=end_time)
+
+    def _series_arrays(self, broker, symbol, start_time=None, end_time=None) -> Dict[str, np.ndarray]:
+        """db.get_series_arrays (ts, bid, ask, session codes), answered from the hot series cache when one is configured."""
+        if self.hot_cache is not None:
+            series = self.hot_cache.get_series(self.db, broker, symbol, start_time, end_time)
+            if series is not None:
+                codes, sessions = pd.factorize(series['session_id'])
+                return {"ts": series['timestamp'].to_numpy(dtype=np.int64),
+                        "bid": series['bid'].to_numpy(dtype=np.float64),
+                        "ask": series['ask'].to_numpy(dtype=np.float64),
+                        "session": codes, "sessions": list(sessions)}
+        return self.db.get_series_arrays(broker, symbol, start_time=start_time, end_time=end_time)
+
+    def data_version(self) -> int:
+        """Counter bumped by every ingest; cached responses are only valid for one version."""
+        return self.db.get_data_version()
+
     def get_all_brokers(self) -> FetchBrokersResponse:
         """Return all brokers in the database."""
         brokers = self.db.get_all_brokers()
@@ -89,21 +184,66 @@ class QuoteService:
         return ListDatesResponse(dates=dates)
 
     def get_sessions(self, request: ListSessionRequest) -> ListSessionResponse:
-        """Return all sessions for a broker, symbol, and date."""
+        """Return all sessions for a broker, symbol, and date, or one page of them when paging."""
         sessions = self.db.get_sessions_by_date(
             request.broker, request.symbol, request.date
         )
-        return ListSessionResponse(sessions=sessions)
+        if request.page_size is None and request.cursor is None:
+            return ListSessionResponse(sessions=sessions)
 
-    def get_quotes(self, request: FetchQuoteRequest) -> FetchQuoteResponse:
-        """Return all quotes for a broker, symbol, and time range."""
-        quotes = self.db.fetch_quotes(    
+        # The day's sessions come from the in-memory catalog, so resuming after a key is a list lookup
+        query = ("sessions", request.broker, request.symbol, request.date)
+        start = 0
+        if request.cursor:
+            after = decode_cursor(request.cursor, query)
+            if len(after) != 1 or after[0] not in sessions:
+                raise InvalidCursor("Cursor session is no longer listed")
+            start = sessions.index(after[0]) + 1
+        page = sessions[start:start + (request.page_size or SESSION_PAGE_SIZE)]
+        more = start + len(page) < len(sessions)
+        return ListSessionResponse(sessions=page, next_cursor=encode_cursor(page[-1:], query) if more else None)
+
+    def _quote_rows(self, request: FetchQuoteRequest):
+        """(rows, next_cursor): every fetch_quotes row, or with page_size/cursor one keyset page of them."""
+        if request.page_size is None and request.cursor is None:
+            rows = self.db.fetch_quotes(
+                broker=request.broker,
+                symbol=request.symbol,
+                start_time=request.start_time,
+                end_time=request.end_time,
+                since_ts=request.since_ts
+            )
+            return rows, None
+
+        # A cursor is only valid for the filters it was issued under
+        query = ("quotes", request.broker, request.symbol, request.start_time, request.end_time, request.since_ts)
+        after = decode_cursor(request.cursor, query) if request.cursor else None
+        if after is not None and not (len(after) == 2 and isinstance(after[0], str)
+                                      and isinstance(after[1], int) and not isinstance(after[1], bool)):
+            raise InvalidCursor("Malformed cursor position")
+        page_size = request.page_size or QUOTE_PAGE_SIZE
+        # One extra row tells whether another page follows
+        rows = self.db.fetch_quotes_page(
             broker=request.broker,
             symbol=request.symbol,
             start_time=request.start_time,
-            end_time=request.end_time
+            end_time=request.end_time,
+            since_ts=request.since_ts,
+            after=after,
+            limit=page_size + 1
         )
+        if len(rows) <= page_size:
+            return rows, None
+        rows = rows[:page_size]
+        return rows, encode_cursor(rows[-1][:2], query)
+
+    def get_quotes(self, request: FetchQuoteRequest) -> FetchQuoteResponse:
+        """Return all quotes for a broker, symbol, and time range, or one page with page_size/cursor."""
+        quotes, next_cursor = self._quote_rows(request)
+        watermark = max((row[1] for row in quotes), default=request.since_ts)
         return FetchQuoteResponse(
+            watermark=watermark,
+            next_cursor=next_cursor,
             quotes=[
                 QuoteResponse(
                     session_id=row[0],
@@ -114,64 +254,449 @@ class QuoteService:
                 for row in quotes
             ]
         )
-    def get_data(self, broker_a, symbol_a, broker_b, symbol_b, limit=1000, time_range_hours='all'):
-        df = self.db.get_data(broker_a, symbol_a, broker_b, symbol_b, limit, time_range_hours)
-        if df.empty:
-            print(f"No data after initial fetch: broker_a={broker_a}, symbol_a={symbol_a}, "
-                  f"broker_b={broker_b}, symbol_b={symbol_b}")
-            return []
 
-        # Separate data for each broker/symbol pair
-        df_a = df[(df['broker'] == broker_a) & (df['symbol'] == symbol_a)].copy()
-        df_b = df[(df['broker'] == broker_b) & (df['symbol'] == symbol_b)].copy()
+    def get_quotes_payload(self, request: FetchQuoteRequest, format: str = 'json') -> dict:
+        """The /quotes body as plain data: FetchQuoteResponse's shape ('json') or one series of arrays ('arrays')."""
+        quotes, next_cursor = self._quote_rows(request)
+        watermark = max((row[1] for row in quotes), default=request.since_ts)
+        with METRICS.timer("quote_serialize_seconds", stage="payload", format=format):
+            if format == 'arrays':
+                session_ids, timestamps, bids, asks = zip(*quotes) if quotes else ((), (), (), ())
+                series = [{
+                    "broker": request.broker,
+                    "symbol": request.symbol,
+                    "session_id": list(session_ids),
+                    "timestamp": np.array(timestamps, dtype=np.int64),
+                    "bid": np.array(bids, dtype=np.float64),
+                    "ask": np.array(asks, dtype=np.float64),
+                }]
+                return {"series": series, "watermark": watermark, "next_cursor": next_cursor}
+            return {
+                "watermark": watermark,
+                "next_cursor": next_cursor,
+                "quotes": [dict(zip(('session_id', 'timestamp', 'bid', 'ask'), row)) for row in quotes]
+            }
 
-        result = []
+    def export_quotes(self, broker: str, symbol: str, format: str = 'csv', start_time: Optional[int] = None,
+                      end_time: Optional[int] = None, since_ts: Optional[int] = None,
+                      batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+        """Body chunks for a streamed export of one instrument's range, oldest first; one chunk per batch."""
+        batches = self.db.iter_quotes(broker, symbol, start_time=start_time, end_time=end_time,
+                                      since_ts=since_ts, batch_size=batch_size)
+        return encode_export(batches, format, broker, symbol)
 
-        # Process df_a 
-        if not df_a.empty:
-            df_a = df_a.dropna(subset=['timestamp'])  # Only drop invalid timestamps
-            if df_a.empty:
-                print(f"No valid data for {broker_a}/{symbol_a} after dropping invalid timestamps")
-            else:
-                result_a = [
-                    FetchData(
-                        session_id=row['session_id'],
-                        bid_price=(row['bid']) if pd.notna(row['bid']) else None,
-                        ask_price=(row['ask']) if pd.notna(row['ask']) else None,
-                        timestamp=str(row['timestamp']),
-                        broker=broker_a,
-                        symbol=symbol_a
-                    )
-                    for _, row in df_a.iterrows()
-                ]
-                result.extend(result_a)
-
-        # Process df_b 
-        if not df_b.empty:
-            df_b = df_b.dropna(subset=['timestamp'])  # Only drop invalid timestamps
-            if df_b.empty:
-                print(f"No valid data for {broker_b}/{symbol_b} after dropping invalid timestamps")
+    def _split_series(self, df, broker_a, symbol_a, broker_b, symbol_b):
+        """Yield (broker, symbol, frame) for each requested pair with valid timestamps."""
+        for broker, symbol in ((broker_a, symbol_a), (broker_b, symbol_b)):
+            part = df[(df['broker'] == broker) & (df['symbol'] == symbol)]
+            if part.empty:
+                continue
+            part = part.dropna(subset=['timestamp'])  # Only drop invalid timestamps
+            if part.empty:
+                logger.debug(f"No valid data for {broker}/{symbol} after dropping invalid timestamps")
+                continue
+            yield broker, symbol, part
+
+    def _fetch_frame(self, broker_a, symbol_a, broker_b, symbol_b, limit, time_range_hours, downsample, points,
+                     since=None):
+        """(frame, truncated series): the newest `limit` rows (hot series cache, else db.get_data), or with
+        downsample the whole range per series.
+
+        since maps (broker, symbol) to an epoch-ms watermark. Without downsample, any watermark turns
+        the read into an incremental poll: the oldest `limit` rows strictly after each series' own
+        watermark, so a backlog is paged through instead of skipped; truncated names the series that
+        have more. With downsample it only moves each series' range start past its watermark.
+        """
+        start_time = time_range_start_ms(time_range_hours)
+        instruments = list(dict.fromkeys([(broker_a, symbol_a), (broker_b, symbol_b)]))
+        since = {key: (since or {}).get(key) for key in instruments}
+        if not downsample:
+            if any(value is not None for value in since.values()):
+                return self._oldest_after(since, limit, start_time)
+            df = self._newest_from_hot_cache(broker_a, symbol_a, broker_b, symbol_b, limit, start_time)
+            if df is not None:
+                return df, set()
+            return self.db.get_data(broker_a, symbol_a, broker_b, symbol_b, limit, time_range_hours), set()
+
+        frames = []
+        for broker, symbol in instruments:
+            series_start = start_time
+            if since[(broker, symbol)] is not None:
+                series_start = max(start_time or 0, since[(broker, symbol)] + 1)
+            series = self._series(broker, symbol, start_time=series_start)
+            if series.empty:
+                continue
+            ts = series['timestamp'].to_numpy()
+            mid = (series['bid'].to_numpy() + series['ask'].to_numpy()) / 2
+            part = series.iloc[quote_series.downsample_indices(downsample, ts, mid, points)]
+            frames.append(part.assign(broker=broker, symbol=symbol))
+        if not frames:
+            return pd.DataFrame(), set()
+        df = pd.concat(frames, ignore_index=True)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df, set()
+
+    def _oldest_after(self, since, limit, start_time):
+        """(frame, truncated series) with the oldest `limit` rows after each series' watermark, oldest first."""
+        frames = self._series_after(since, limit, start_time)
+        truncated = {key for key, (_, more) in frames.items() if more}
+        parts = [frame.assign(broker=broker, symbol=symbol)
+                 for (broker, symbol), (frame, _) in frames.items() if len(frame)]
+        if not parts:
+            return pd.DataFrame(), truncated
+        df = pd.concat(parts, ignore_index=True)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df[['session_id', 'bid', 'ask', 'timestamp', 'broker', 'symbol']], truncated
+
+    def _series_after(self, since, limit, start_time, end_time=None):
+        """(oldest-first frame, truncated) per (broker, symbol) in `since`: its oldest `limit` rows after its watermark.
+
+        Hot-cached series are sliced from the cache; the rest share one db.get_series_after call.
+        One extra row per series tells whether the limit cut it short.
+        """
+        frames = {}
+        missing = {}
+        for (broker, symbol), since_ts in since.items():
+            series_start = start_time if since_ts is None else max(start_time or 0, since_ts + 1)
+            series = None
+            if self.hot_cache is not None:
+                series = self.hot_cache.get_series(self.db, broker, symbol, start_time=series_start,
+                                                   end_time=end_time, head=limit + 1)
+            if series is None:
+                missing[(broker, symbol)] = since_ts
             else:
-                result_b = [
-                    FetchData(
-                        session_id=row['session_id'],
-                        bid_price=(row['bid']) if pd.notna(row['bid']) else None,
-                        ask_price=(row['ask']) if pd.notna(row['ask']) else None,
-                        timestamp=str(row['timestamp']),
-                        broker=broker_b,
-                        symbol=symbol_b
-                    )
-                    for _, row in df_b.iterrows()
-                ]
-                result.extend(result_b)
-
-        if not result:
-            print(f"No valid data after processing: broker_a={broker_a}, symbol_a={symbol_a}, "
-                  f"broker_b={broker_b}, symbol_b={symbol_b}")
+                frames[(broker, symbol)] = series
+        if missing:
+            df = self.db.get_series_after(missing, limit + 1, start_time=start_time, end_time=end_time)
+            for (broker, symbol), part in df.groupby(['broker', 'symbol'], sort=False):
+                frames[(broker, symbol)] = part
+        empty = pd.DataFrame({'timestamp': np.array([], dtype=np.int64), 'bid': [], 'ask': [], 'session_id': []})
+        return {
+            key: (frames[key].head(limit), len(frames[key]) > limit) if key in frames else (empty, False)
+            for key in since
+        }
+
+    def _newest_from_hot_cache(self, broker_a, symbol_a, broker_b, symbol_b, limit, start_time):
+        """db.get_data's frame built from hot series tails, or None if either series isn't cached."""
+        if self.hot_cache is None:
+            return None
+        frames = []
+        for broker, symbol in dict.fromkeys([(broker_a, symbol_a), (broker_b, symbol_b)]):
+            series = self.hot_cache.get_series(self.db, broker, symbol, start_time=start_time, tail=limit)
+            if series is None:
+                return None
+            frames.append(series.assign(broker=broker, symbol=symbol))
+        df = pd.concat(frames, ignore_index=True)
+        if df.empty:
+            return pd.DataFrame()
+        df = df.sort_values('timestamp', ascending=False, kind='stable', ignore_index=True).head(limit)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df[['session_id', 'bid', 'ask', 'timestamp', 'broker', 'symbol']]
+
+    def _rows_from_frame(self, df, broker_a, symbol_a, broker_b, symbol_b):
+        result = []
+        for broker, symbol, part in self._split_series(df, broker_a, symbol_a, broker_b, symbol_b):
+            n = len(part)
+            result.extend(
+                dict(zip(('session_id', 'bid_price', 'ask_price', 'timestamp', 'broker', 'symbol'), row))
+                for row in zip(
+                    part['session_id'].tolist(),
+                    quote_series.to_json_list(part['bid'].to_numpy(dtype=np.float64)),
+                    quote_series.to_json_list(part['ask'].to_numpy(dtype=np.float64)),
+                    _timestamp_text(part['timestamp']),
+                    [broker] * n,
+                    [symbol] * n
+                )
+            )
+        return result
+
+    def _columns_from_frame(self, df, broker_a, symbol_a, broker_b, symbol_b):
+        series = []
+        for broker, symbol, part in self._split_series(df, broker_a, symbol_a, broker_b, symbol_b):
+            series.append({
+                "broker": broker,
+                "symbol": symbol,
+                "session_id": part['session_id'].tolist(),
+                "timestamp": part['timestamp'].to_numpy(dtype='datetime64[ms]').astype(np.int64).tolist(),
+                "bid_price": quote_series.to_json_list(part['bid'].to_numpy(dtype=np.float64)),
+                "ask_price": quote_series.to_json_list(part['ask'].to_numpy(dtype=np.float64))
+            })
+        return series
+
+    def _arrays_from_frame(self, df, broker_a, symbol_a, broker_b, symbol_b):
+        """Like _columns_from_frame but with NumPy arrays, for the binary wire formats."""
+        return [{
+            "broker": broker,
+            "symbol": symbol,
+            "session_id": part['session_id'].tolist(),
+            "timestamp": part['timestamp'].to_numpy(dtype='datetime64[ms]').astype(np.int64),
+            "bid": part['bid'].to_numpy(dtype=np.float64),
+            "ask": part['ask'].to_numpy(dtype=np.float64),
+        } for broker, symbol, part in self._split_series(df, broker_a, symbol_a, broker_b, symbol_b)]
+
+    def get_data(self, broker_a, symbol_a, broker_b, symbol_b, limit=1000, time_range_hours='all',
+                 downsample=None, points=1000, since_ts=None):
+        """Return rows in the FetchData shape as plain dicts, built column-wise from the frame.
+
+        downsample ('lttb' or 'minmax') covers the whole time range with at most `points`
+        rows per series instead of the newest `limit` raw ticks.
+        """
+        since = {(broker_a, symbol_a): since_ts, (broker_b, symbol_b): since_ts}
+        df, _ = self._fetch_frame(broker_a, symbol_a, broker_b, symbol_b, limit, time_range_hours, downsample,
+                                  points, since)
+        if df.empty:
+            logger.debug(f"No data after initial fetch: broker_a={broker_a}, symbol_a={symbol_a}, "
+                         f"broker_b={broker_b}, symbol_b={symbol_b}")
             return []
 
+        result = self._rows_from_frame(df, broker_a, symbol_a, broker_b, symbol_b)
+        if downsample or since_ts is not None:
+            return result
+
         # Limit the total number of records, increase if need be
         return result[:limit]
-        
-    
 
+    def get_data_payload(self, format, broker_a, symbol_a, broker_b, symbol_b, limit=1000, time_range_hours='all',
+                         downsample=None, points=1000, since_ts=None, since_ts_a=None, since_ts_b=None):
+        """Build the /api/data body ('rows', 'columns' or NumPy 'arrays' per series) plus watermarks.
+
+        since_ts_a/since_ts_b override since_ts for one series. watermarks["broker:symbol"] is the
+        last timestamp (epoch ms) returned for that series, or its since value when nothing new
+        arrived; clients pass them back on their next poll. truncated means a series has more rows
+        after its watermark. The single watermark is safe to send back as since_ts for both series:
+        the newest timestamp returned, or while truncated the lowest truncated series' watermark.
+        """
+        since = {(broker_a, symbol_a): since_ts if since_ts_a is None else since_ts_a,
+                 (broker_b, symbol_b): since_ts if since_ts_b is None else since_ts_b}
+        df, truncated = self._fetch_frame(broker_a, symbol_a, broker_b, symbol_b, limit, time_range_hours,
+                                          downsample, points, since)
+        watermarks = {}
+        for (broker, symbol), series_since in since.items():
+            part = df[(df['broker'] == broker) & (df['symbol'] == symbol)]['timestamp'] if not df.empty else ()
+            watermarks[f"{broker}:{symbol}"] = (
+                int(part.max().to_datetime64().astype('datetime64[ms]').astype(np.int64))
+                if len(part) and part.notna().any() else series_since)
+        if truncated:
+            watermark = min(watermarks[f"{broker}:{symbol}"] for broker, symbol in truncated)
+        else:
+            watermark = max((value for value in watermarks.values() if value is not None), default=None)
+        incremental = not downsample and any(value is not None for value in since.values())
+        meta = {"watermark": watermark, "watermarks": watermarks, "truncated": bool(truncated)}
+
+        with METRICS.timer("quote_serialize_seconds", stage="payload", format=format):
+            if format == 'columns':
+                series = self._columns_from_frame(df, broker_a, symbol_a, broker_b, symbol_b) if not df.empty else []
+                return {"series": series, **meta}
+            if format == 'arrays':
+                series = self._arrays_from_frame(df, broker_a, symbol_a, broker_b, symbol_b) if not df.empty else []
+                return {"series": series, **meta}
+
+            rows = self._rows_from_frame(df, broker_a, symbol_a, broker_b, symbol_b) if not df.empty else []
+            return {"data": rows if downsample or incremental else rows[:limit], **meta}
+
+    def _multi_frames(self, instruments, limit, start_time, end_time, downsample, points):
+        """(oldest-first frame, truncated) per instrument: the newest `limit` ticks, or the downsampled range.
+
+        Raw reads come from the hot series cache where mapped; the rest share one
+        db.get_newest_series call. One extra row per series tells whether the limit cut it short.
+        """
+        frames = {}
+        if downsample:
+            for broker, symbol in instruments:
+                series = self._series(broker, symbol, start_time=start_time, end_time=end_time)
+                if series.empty:
+                    frames[(broker, symbol)] = (series, False)
+                    continue
+                ts = series['timestamp'].to_numpy()
+                mid = (series['bid'].to_numpy() + series['ask'].to_numpy()) / 2
+                idx = quote_series.downsample_indices(downsample, ts, mid, points)
+                frames[(broker, symbol)] = (series.iloc[idx], len(idx) < len(series))
+            return frames
+
+        missing = []
+        for broker, symbol in instruments:
+            series = None
+            if self.hot_cache is not None:
+                series = self.hot_cache.get_series(self.db, broker, symbol, start_time=start_time,
+                                                   end_time=end_time, tail=limit + 1)
+            if series is None:
+                missing.append((broker, symbol))
+            else:
+                frames[(broker, symbol)] = series
+        if missing:
+            df = self.db.get_newest_series(missing, limit + 1, start_time=start_time, end_time=end_time)
+            for (broker, symbol), part in df.groupby(['broker', 'symbol'], sort=False):
+                frames[(broker, symbol)] = part.iloc[::-1]
+        empty = pd.DataFrame({'timestamp': np.array([], dtype=np.int64), 'bid': [], 'ask': [], 'session_id': []})
+        return {
+            key: (frames[key].tail(limit), len(frames[key]) > limit) if key in frames else (empty, False)
+            for key in instruments
+        }
+
+    def get_multi_payload(self, format, instruments: List[Tuple[str, str]], limit=1000, time_range_hours='all',
+                          start_time=None, end_time=None, downsample=None, points=1000, since_ts=None,
+                          align=False, step_ms=None, max_points=2000):
+        """Any number of (broker, symbol) series for one plot: 'columns' lists or NumPy 'arrays' per series.
+
+        limit (or points when downsampling) applies to each series separately, so a fast feed
+        never starves a slow one; `truncated` marks series that hit it. align adds every series'
+        mid interpolated onto one shared grid, as /api/compare does for two.
+
+        With since_ts (and no downsample) each series instead returns its oldest `limit` ticks after
+        since_ts, so a backlog is paged through rather than skipped. Each series' watermark is the
+        last tick it returned; the top-level one is safe to send back as since_ts for all of them.
+        """
+        if start_time is None:
+            start_time = time_range_start_ms(time_range_hours)
+        instruments = list(dict.fromkeys(instruments))
+        if since_ts is not None and not downsample:
+            frames = self._series_after(dict.fromkeys(instruments, since_ts), limit, start_time, end_time)
+        else:
+            if since_ts is not None:
+                start_time = max(start_time or 0, since_ts + 1)
+            frames = self._multi_frames(instruments, limit, start_time, end_time, downsample, points)
+        watermarks = {key: int(frame['timestamp'].iloc[-1]) if len(frame) else since_ts
+                      for key, (frame, _) in frames.items()}
+        truncated_marks = [watermarks[key] for key, (_, truncated) in frames.items() if truncated]
+        if since_ts is not None and not downsample and truncated_marks:
+            watermark = min(truncated_marks)
+        else:
+            watermark = max((mark for mark in watermarks.values() if mark is not None), default=None)
+
+        with METRICS.timer("quote_serialize_seconds", stage="payload", format=f"multi_{format}"):
+            series = []
+            for (broker, symbol), (frame, truncated) in frames.items():
+                ts = frame['timestamp'].to_numpy(dtype=np.int64)
+                bid = frame['bid'].to_numpy(dtype=np.float64)
+                ask = frame['ask'].to_numpy(dtype=np.float64)
+                item = {"broker": broker, "symbol": symbol, "session_id": frame['session_id'].tolist(),
+                        "truncated": truncated, "watermark": watermarks[(broker, symbol)]}
+                if format == 'arrays':
+                    item.update(timestamp=ts, bid=bid, ask=ask)
+                else:
+                    item.update(timestamp=ts.tolist(), bid_price=quote_series.to_json_list(bid),
+                                ask_price=quote_series.to_json_list(ask))
+                series.append(item)
+            payload = {"series": series, "aligned": None, "watermark": watermark}
+            if align:
+                payload["aligned"] = self._align_mids(frames, step_ms, max_points)
+            return payload
+
+    def _align_mids(self, frames, step_ms, max_points):
+        spans = [(int(frame['timestamp'].iloc[0]), int(frame['timestamp'].iloc[-1]))
+                 for frame, _ in frames.values() if len(frame)]
+        if not spans:
+            return {"step_ms": 0, "ts": [], "mid": {f"{broker}:{symbol}": [] for broker, symbol in frames}}
+        start_ms, end_ms = min(s for s, _ in spans), max(e for _, e in spans)
+        step = quote_series.grid_step(start_ms, end_ms, step_ms, max_points)
+        grid = quote_series.build_grid(start_ms, end_ms, step)
+        mid = {}
+        for (broker, symbol), (frame, _) in frames.items():
+            values = (frame['bid'].to_numpy(dtype=np.float64) + frame['ask'].to_numpy(dtype=np.float64)) / 2
+            mid[f"{broker}:{symbol}"] = quote_series.to_json_list(
+                quote_series.interpolate(frame['timestamp'].to_numpy(dtype=np.int64), values, grid))
+        return {"step_ms": step, "ts": grid.tolist(), "mid": mid}
+
+    def get_comparison(self, broker_a, symbol_a, broker_b, symbol_b, time_range_hours='all',
+                       step_ms=None, max_points=2000) -> ComparisonResponse:
+        """Align broker A and broker B on a common time grid and return column arrays."""
+        start_time = time_range_start_ms(time_range_hours)
+        df_a = self._series(broker_a, symbol_a, start_time=start_time)
+        df_b = self._series(broker_b, symbol_b, start_time=start_time)
+        if df_a.empty and df_b.empty:
+            return ComparisonResponse(step_ms=0, ts=[], bid_a=[], ask_a=[], bid_b=[], ask_b=[],
+                                      mid_a=[], mid_b=[], spread=[])
+
+        ts_a = df_a['timestamp'].to_numpy()
+        ts_b = df_b['timestamp'].to_numpy()
+        bounds = np.concatenate([ts_a[[0, -1]] if len(ts_a) else ts_a,
+                                 ts_b[[0, -1]] if len(ts_b) else ts_b])
+        start_ms, end_ms = int(bounds.min()), int(bounds.max())
+
+        step = quote_series.grid_step(start_ms, end_ms, step_ms, max_points)
+        grid = quote_series.build_grid(start_ms, end_ms, step)
+
+        bid_a = quote_series.interpolate(ts_a, df_a['bid'].to_numpy(), grid)
+        ask_a = quote_series.interpolate(ts_a, df_a['ask'].to_numpy(), grid)
+        bid_b = quote_series.interpolate(ts_b, df_b['bid'].to_numpy(), grid)
+        ask_b = quote_series.interpolate(ts_b, df_b['ask'].to_numpy(), grid)
+
+        return ComparisonResponse(
+            step_ms=step,
+            ts=grid.tolist(),
+            bid_a=quote_series.to_json_list(bid_a),
+            ask_a=quote_series.to_json_list(ask_a),
+            bid_b=quote_series.to_json_list(bid_b),
+            ask_b=quote_series.to_json_list(ask_b),
+            mid_a=quote_series.to_json_list((bid_a + ask_a) / 2),
+            mid_b=quote_series.to_json_list((bid_b + ask_b) / 2),
+            spread=quote_series.to_json_list(ask_a - bid_b)
+        )
+
+    def get_ohlc(self, broker, symbol, time_range_hours='all', max_points=500) -> OHLCResponse:
+        """Return rollup bars at the finest resolution whose bucket count fits in max_points."""
+        bounds = self.db.get_instrument_bounds(broker, symbol)
+        if bounds is None:
+            return OHLCResponse(broker=broker, symbol=symbol, resolution_ms=0, ts=[], bid_open=[], bid_high=[],
+                                bid_low=[], bid_close=[], ask_open=[], ask_high=[], ask_low=[], ask_close=[],
+                                spread_mean=[], tick_count=[])
+
+        start_time = time_range_start_ms(time_range_hours)
+        span = bounds[1] - max(bounds[0], start_time or bounds[0])
+        resolution = next((r for r in ROLLUP_RESOLUTIONS if span // r + 1 <= max_points), ROLLUP_RESOLUTIONS[-1])
+
+        df = self.db.get_rollups(broker, symbol, resolution, start_time=start_time)
+        columns = {c: df[c].tolist() for c in quote_series.ROLLUP_COLUMNS if c != 'bucket_ts'}
+        return OHLCResponse(broker=broker, symbol=symbol, resolution_ms=resolution,
+                            ts=df['bucket_ts'].tolist(), **columns)
+
+    def _broker_analytics(self, broker, symbol, series, stale_gap_ms) -> BrokerAnalytics:
+        ts = series['ts']
+        return BrokerAnalytics(
+            broker=broker,
+            symbol=symbol,
+            ticks=len(ts),
+            tick_rate=quote_series.tick_rate(ts),
+            spread=quote_series.distribution(series['ask'] - series['bid']),
+            stale_gaps=quote_series.stale_gaps(ts, series['session'], stale_gap_ms),
+        )
+
+    def get_analytics(self, broker_a, symbol_a, broker_b, symbol_b, time_range_hours='all', start_time=None,
+                      end_time=None, step_ms=100, max_lag_ms=5000, stale_gap_ms=5000) -> AnalyticsResponse:
+        """Spread, tick rate and stale gaps per broker, plus mid difference and lead/lag between them.
+
+        Runs over every tick in the range. For the cross-broker figures both series are sampled
+        as-of on a step_ms grid over the span where both have quotes; lead/lag is the peak of
+        the cross-correlation of mid changes within +/- max_lag_ms. Both series are read straight
+        into NumPy (get_series_arrays); with QUOTES_HOT_CACHE_DIR set they come from memory instead.
+        """
+        if start_time is None:
+            start_time = time_range_start_ms(time_range_hours)
+        series_a = self._series_arrays(broker_a, symbol_a, start_time=start_time, end_time=end_time)
+        series_b = self._series_arrays(broker_b, symbol_b, start_time=start_time, end_time=end_time)
+        a = self._broker_analytics(broker_a, symbol_a, series_a, stale_gap_ms)
+        b = self._broker_analytics(broker_b, symbol_b, series_b, stale_gap_ms)
+
+        ts_a = series_a['ts']
+        ts_b = series_b['ts']
+        overlap = (max(ts_a[0], ts_b[0]), min(ts_a[-1], ts_b[-1])) if len(ts_a) and len(ts_b) else None
+        if overlap is None or overlap[0] >= overlap[1]:
+            return AnalyticsResponse(a=a, b=b, mid_difference=quote_series.distribution(np.array([])),
+                                     lead_lag=LeadLagStats(step_ms=step_ms, lags_ms=[], correlations=[]))
+
+        step = quote_series.grid_step(int(overlap[0]), int(overlap[1]), step_ms, MAX_ANALYTICS_GRID_POINTS)
+        grid = quote_series.build_grid(int(overlap[0]), int(overlap[1]), step)
+        mid_a = quote_series.as_of(ts_a, (series_a['bid'] + series_a['ask']) / 2, grid)
+        mid_b = quote_series.as_of(ts_b, (series_b['bid'] + series_b['ask']) / 2, grid)
+
+        lags, correlations = quote_series.cross_correlation(np.diff(mid_a), np.diff(mid_b), max_lag_ms // step)
+        best = int(np.nanargmax(correlations)) if np.isfinite(correlations).any() else None
+        lead_lag = LeadLagStats(
+            step_ms=step,
+            lag_ms=int(lags[best]) * step if best is not None else None,
+            correlation=float(correlations[best]) if best is not None else None,
+            lags_ms=(lags * step).tolist(),
+            correlations=quote_series.to_json_list(correlations),
+        )
+        return AnalyticsResponse(start_ms=int(overlap[0]), end_ms=int(overlap[1]), a=a, b=b,
+                                 mid_difference=quote_series.distribution(mid_a - mid_b), lead_lag=lead_lag)
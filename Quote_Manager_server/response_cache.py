@@ -0,0 +1,68 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+class ResponseCache:
+    """LRU + TTL cache of encoded response bodies, stamped with the data version they were built at.
+
+    An entry is only served while its data version matches the current one, so an
+    ingest (which bumps the version) invalidates everything without explicit purges.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, str, bytes, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        # Content hash, so a poll still gets 304 when an ingest didn't change this response
+        return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+    def get(self, key: Hashable, version: int) -> Optional[Tuple[str, bytes, dict]]:
+        """Return (etag, body, headers) for a fresh entry at this data version, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, stored_at, etag, body, headers = entry
+                if entry_version == version and time.monotonic() - stored_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return etag, body, headers
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, version: int, body: bytes, headers: Optional[dict] = None) -> str:
+        """Store an encoded body plus the headers that describe it (e.g. Content-Encoding); returns its ETag."""
+        etag = self.make_etag(body)
+        with self._lock:
+            self._entries[key] = (version, time.monotonic(), etag, body, headers or {})
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return etag
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
@@ -1,6 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from quote_db import QuoteDatabase
+import asyncio
+from typing import List, Optional, Tuple, Union
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+import fast_json
+import wire_format
+from quote_metrics import METRICS
+from response_cache import ResponseCache
+from quote_series import DOWNSAMPLERS
+from quote_db import QuoteDatabase, EXPORT_BATCH_SIZE
+from quote_export import EXPORT_MEDIA_TYPES, EXPORT_EXTENSIONS, available_formats
 from quote_service import QuoteService
+from page_cursor import InvalidCursor
+from query_executor import QueryCancelled, QueryTimeout
 from quote_contracts import (    
     FetchQuoteRequest, FetchQuoteResponse,
     ListSymbolsRequest, ListSymbolsResponse,
@@ -8,38 +19,299 @@ from quote_contracts import (
     ListSessionRequest, ListSessionResponse,
     IngestRequest, IngestResponse,    
     FetchBrokersResponse,
-    FetchData, FetchDataResponse,
-    BrokersSymbolsResponse
+    FetchData, FetchDataResponse, FetchDataColumnsResponse,
+    MultiSeriesResponse,
+    BrokersSymbolsResponse,
+    ComparisonResponse,
+    OHLCResponse,
+    AnalyticsResponse,
+    CacheStatsResponse,
+    HotCacheStatsResponse
 )
 
 router = APIRouter()
 
-def get_db():
-    db = QuoteDatabase("quotes.db")
-    try:
+def get_db(request: Request):
+    # Borrow a read-only connection from the pool opened in the app lifespan
+    with request.app.state.db_pool.reader() as db:
+        yield db
+
+def get_writer_db(request: Request):
+    with request.app.state.db_pool.write() as db:
         yield db
-    finally:
-        db.conn.close()
 
-def get_service(db: QuoteDatabase = Depends(get_db)):
-    return QuoteService(db=db)
+def get_service(request: Request, db: QuoteDatabase = Depends(get_db)):
+    return QuoteService(db=db, executor=request.app.state.query_executor, hot_cache=request.app.state.hot_cache,
+                        flights=request.app.state.single_flight)
+
+def get_writer_service(request: Request, db: QuoteDatabase = Depends(get_writer_db)):
+    return QuoteService(db=db, hot_cache=request.app.state.hot_cache)
+
+def get_response_cache(request: Request) -> ResponseCache:
+    return request.app.state.response_cache
+
+def encode_body(media_type: str, payload: dict, encoding: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+    """Serialise a payload for the negotiated media type and compress it; returns (body, Content-Encoding).
+
+    Binary media types expect payload['series'] arrays.
+    """
+    with METRICS.timer("quote_serialize_seconds", stage="encode", format=media_type):
+        if media_type == wire_format.PACKED:
+            body = wire_format.encode_packed(payload["series"], payload["watermark"])
+        elif media_type == wire_format.ARROW:
+            body = wire_format.encode_arrow(payload["series"], payload["watermark"])
+        else:
+            body = fast_json.dumps(payload)
+    with METRICS.timer("quote_serialize_seconds", stage="compress", format=encoding or "identity"):
+        return wire_format.compress(body, encoding)
+
+# 'all' or a whole number of hours; anything else is a 422 rather than a 500 from time_range_start_ms
+TIME_RANGE_PATTERN = r"^(all|[0-9]+)$"
+
+def range_key(time_range_hours: str) -> str:
+    """Normalise time_range_hours for cache and single-flight keys ('24' and '024' are one range)."""
+    return time_range_hours if time_range_hours == 'all' else str(int(time_range_hours))
+
+async def run_query(request: Request, service: QuoteService, method, *args, key=None):
+    """Run a service call off the event loop; give up with 504 on timeout, 499 if the client left.
+
+    With a key, identical concurrent calls share one execution (QuoteService.run_shared).
+    """
+    try:
+        if key is not None:
+            return await service.run_shared(key, method, *args, is_disconnected=request.is_disconnected)
+        return await service.run_async(method, *args, is_disconnected=request.is_disconnected)
+    except QueryTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except QueryCancelled as e:
+        raise HTTPException(status_code=499, detail=str(e))
 
 @router.post("/ingest", response_model=IngestResponse)
-def ingest_quotes(request: IngestRequest, service: QuoteService = Depends(get_service)):
-    return service.ingest_archive(request)
+def ingest_quotes(request: IngestRequest, http_request: Request, service: QuoteService = Depends(get_writer_service)):
+    result = service.ingest_archive(request)
+    http_request.app.state.broadcaster.notify()
+    return result
+
+STREAM_HEARTBEAT_SECONDS = 15
+# Upper bound on instruments per /api/multi request; each one is its own index range read
+MAX_MULTI_INSTRUMENTS = 16
+
+def parse_instruments(instrument: List[str]) -> List[Tuple[str, str]]:
+    """Split repeated broker:symbol query values; 422 on anything else."""
+    instruments = [tuple(item.split(":", 1)) for item in instrument]
+    if any(len(pair) != 2 or not all(pair) for pair in instruments):
+        raise HTTPException(status_code=422, detail="instrument must look like broker:symbol")
+    return instruments
 
-@router.get("/api/data", response_model=FetchDataResponse)
+@router.get("/stream")
+async def stream_quotes(
+    request: Request,
+    instrument: List[str] = Query(..., description="broker:symbol, repeat for several instruments")
+):
+    """Server-Sent Events: one `quotes` event per batch of newly ingested ticks per instrument."""
+    instruments = parse_instruments(instrument)
+    broadcaster = request.app.state.broadcaster
+    subscription = await broadcaster.subscribe(instruments)
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: quotes\ndata: {fast_json.dumps(message).decode()}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/api/data", response_model=Union[FetchDataResponse, FetchDataColumnsResponse])
 async def get_data(
+    request: Request,
     broker_a: str = Query(...),
     symbol_a: str = Query(...),
     broker_b: str = Query(...),
     symbol_b: str = Query(...),
-    time_range_hours: str = Query('all', description="Time range: 'all' or hours (1, 6, 24)"),
+    time_range_hours: str = Query('all', pattern=TIME_RANGE_PATTERN, description="Time range: 'all' or whole hours (1, 6, 24)"),
     limit: int = Query(1000, description="Maximum number of records"),
+    format: str = Query('rows', pattern="^(rows|columns)$", description="'rows' (one object per tick) or 'columns' (arrays per series)"),
+    downsample: Optional[str] = Query(None, pattern=f"^({'|'.join(DOWNSAMPLERS)})$", description="Downsample the whole range instead of returning the newest `limit` ticks"),
+    points: int = Query(1000, ge=4, description="Maximum points per series when downsampling"),
+    since_ts: Optional[int] = Query(None, description="Only rows newer than this epoch-ms watermark; returns the oldest `limit` per series"),
+    since_ts_a: Optional[int] = Query(None, description="since_ts for series A only (its entry in watermarks)"),
+    since_ts_b: Optional[int] = Query(None, description="since_ts for series B only (its entry in watermarks)"),
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    service: QuoteService = Depends(get_service),
+    cache: ResponseCache = Depends(get_response_cache)
+):
+    # Binary media types (see wire_format) always carry per-series arrays, whatever `format` says
+    media_type = wire_format.negotiate(accept)
+    encoding = wire_format.pick_encoding(accept_encoding)
+    # points only matters when downsampling, limit only when not
+    key = ("data", format if media_type == wire_format.JSON else media_type, broker_a, symbol_a, broker_b, symbol_b,
+           range_key(time_range_hours), points if downsample else limit, downsample, since_ts, since_ts_a, since_ts_b,
+           encoding)
+    version = await run_query(request, service, service.data_version)
+
+    cached = cache.get(key, version)
+    if cached is not None:
+        etag, body, body_headers = cached
+    else:
+        # Payloads are built from plain lists, so skip per-row model validation and encode directly
+        def get_data_body():
+            # Encoding a large payload is as slow as the query, so it stays off the event loop too
+            payload = service.get_data_payload(format if media_type == wire_format.JSON else 'arrays',
+                                               broker_a, symbol_a, broker_b, symbol_b, limit,
+                                               time_range_hours, downsample, points, since_ts, since_ts_a,
+                                               since_ts_b)
+            return encode_body(media_type, payload, encoding)
+
+        # Tabs polling the same chart miss the cache together; only one of them runs the query
+        body, content_encoding = await run_query(request, service, get_data_body, key=(key, version))
+        body_headers = {"Content-Encoding": content_encoding} if content_encoding else {}
+        etag = cache.put(key, version, body, body_headers)
+
+    # no-cache makes browsers revalidate every poll with If-None-Match on their own
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+    if if_none_match == etag:
+        cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers={**headers, **body_headers})
+
+@router.get("/api/multi", response_model=MultiSeriesResponse)
+async def get_multi(
+    request: Request,
+    instrument: List[str] = Query(..., description="broker:symbol, repeat for several instruments"),
+    time_range_hours: str = Query('all', pattern=TIME_RANGE_PATTERN, description="Time range: 'all' or whole hours (1, 6, 24)"),
+    start_time: Optional[int] = Query(None, description="Epoch ms; overrides time_range_hours"),
+    end_time: Optional[int] = Query(None, description="Epoch ms, inclusive"),
+    limit: int = Query(1000, ge=1, description="Newest ticks per series"),
+    downsample: Optional[str] = Query(None, pattern=f"^({'|'.join(DOWNSAMPLERS)})$", description="Downsample each series' whole range instead of returning its newest `limit` ticks"),
+    points: int = Query(1000, ge=4, description="Maximum points per series when downsampling"),
+    since_ts: Optional[int] = Query(None, description="Only rows newer than this epoch-ms watermark"),
+    align: bool = Query(False, description="Add every series' mid on one shared time grid (JSON only)"),
+    step_ms: Optional[int] = Query(None, ge=1, description="Alignment grid step; widened to fit max_points"),
+    max_points: int = Query(2000, ge=2, description="Alignment grid point budget"),
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    service: QuoteService = Depends(get_service),
+    cache: ResponseCache = Depends(get_response_cache)
+):
+    """Any number of series for one plot, each with its own limit/points budget; see /api/data for formats."""
+    instruments = list(dict.fromkeys(parse_instruments(instrument)))
+    if len(instruments) > MAX_MULTI_INSTRUMENTS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_MULTI_INSTRUMENTS} instruments per request")
+
+    media_type = wire_format.negotiate(accept)
+    encoding = wire_format.pick_encoding(accept_encoding)
+    aligned = align and media_type == wire_format.JSON
+    key = ("multi", media_type, tuple(instruments), range_key(time_range_hours), start_time, end_time,
+           points if downsample else limit, downsample, since_ts, aligned and (step_ms, max_points), encoding)
+    version = await run_query(request, service, service.data_version)
+
+    cached = cache.get(key, version)
+    if cached is not None:
+        etag, body, body_headers = cached
+    else:
+        def get_multi_body():
+            payload = service.get_multi_payload('columns' if media_type == wire_format.JSON else 'arrays',
+                                                instruments, limit, time_range_hours, start_time, end_time,
+                                                downsample, points, since_ts, aligned, step_ms, max_points)
+            return encode_body(media_type, payload, encoding)
+
+        body, content_encoding = await run_query(request, service, get_multi_body, key=(key, version))
+        body_headers = {"Content-Encoding": content_encoding} if content_encoding else {}
+        etag = cache.put(key, version, body, body_headers)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+    if if_none_match == etag:
+        cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers={**headers, **body_headers})
+
+@router.get("/api/cache/stats", response_model=CacheStatsResponse)
+def get_cache_stats(cache: ResponseCache = Depends(get_response_cache)):
+    return cache.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics(request: Request):
+    """Prometheus text format: recorded histograms/counters plus cache and query-pool gauges."""
+    state = request.app.state
+    gauges = {}
+    sources = {"response_cache": state.response_cache.stats(), "query_executor": state.query_executor.stats()}
+    if state.single_flight is not None:
+        sources["single_flight"] = state.single_flight.stats()
+    if state.hot_cache is not None:
+        sources["hot_cache"] = state.hot_cache.stats()
+    for prefix, stats in sources.items():
+        gauges.update({f"quote_{prefix}_{name}": value for name, value in stats.items()
+                       if isinstance(value, (int, float))})
+    gauges["quote_broadcaster_db_reads"] = state.broadcaster.db_reads
+    gauges["quote_metrics_enabled"] = int(METRICS.enabled)
+    return PlainTextResponse(METRICS.render(gauges), media_type="text/plain; version=0.0.4")
+
+@router.get("/api/hot-cache/stats", response_model=HotCacheStatsResponse)
+def get_hot_cache_stats(request: Request):
+    hot_cache = request.app.state.hot_cache
+    if hot_cache is None:
+        return HotCacheStatsResponse(enabled=False)
+    return HotCacheStatsResponse(enabled=True, **hot_cache.stats())
+
+@router.get("/api/compare", response_model=ComparisonResponse)
+async def get_comparison(
+    request: Request,
+    broker_a: str = Query(...),
+    symbol_a: str = Query(...),
+    broker_b: str = Query(...),
+    symbol_b: str = Query(...),
+    time_range_hours: str = Query('all', pattern=TIME_RANGE_PATTERN, description="Time range: 'all' or whole hours (1, 6, 24)"),
+    step_ms: Optional[int] = Query(None, ge=1, description="Grid step in milliseconds (default 1000)"),
+    max_points: int = Query(2000, ge=2, description="Upper bound on grid points; widens step_ms if needed"),
     service: QuoteService = Depends(get_service)
 ):
-    data = service.get_data(broker_a, symbol_a, broker_b, symbol_b, limit, time_range_hours)
-    return {"data": data}
+    return await run_query(request, service, service.get_comparison, broker_a, symbol_a, broker_b, symbol_b,
+                           time_range_hours, step_ms, max_points,
+                           key=("compare", broker_a, symbol_a, broker_b, symbol_b, range_key(time_range_hours),
+                                step_ms, max_points))
+
+@router.get("/api/analytics", response_model=AnalyticsResponse)
+async def get_analytics(
+    request: Request,
+    broker_a: str = Query(...),
+    symbol_a: str = Query(...),
+    broker_b: str = Query(...),
+    symbol_b: str = Query(...),
+    time_range_hours: str = Query('all', pattern=TIME_RANGE_PATTERN, description="Time range: 'all' or whole hours (1, 6, 24)"),
+    start_time: Optional[int] = Query(None, description="Epoch ms; overrides time_range_hours"),
+    end_time: Optional[int] = Query(None, description="Epoch ms, inclusive"),
+    step_ms: int = Query(100, ge=1, description="Alignment grid step for mid difference and lead/lag"),
+    max_lag_ms: int = Query(5000, ge=0, description="Lead/lag search window, +/- this many ms"),
+    stale_gap_ms: int = Query(5000, ge=1, description="A pause between ticks of a session this long counts as stale"),
+    service: QuoteService = Depends(get_service)
+):
+    return await run_query(request, service, service.get_analytics, broker_a, symbol_a, broker_b, symbol_b,
+                           time_range_hours, start_time, end_time, step_ms, max_lag_ms, stale_gap_ms,
+                           key=("analytics", broker_a, symbol_a, broker_b, symbol_b, range_key(time_range_hours),
+                                start_time, end_time, step_ms, max_lag_ms, stale_gap_ms))
+
+@router.get("/api/ohlc", response_model=OHLCResponse)
+async def get_ohlc(
+    request: Request,
+    broker: str = Query(...),
+    symbol: str = Query(...),
+    time_range_hours: str = Query('all', pattern=TIME_RANGE_PATTERN, description="Time range: 'all' or whole hours (1, 6, 24)"),
+    max_points: int = Query(500, ge=1, description="Point budget; picks the finest rollup resolution that fits"),
+    service: QuoteService = Depends(get_service)
+):
+    return await run_query(request, service, service.get_ohlc, broker, symbol, time_range_hours, max_points,
+                           key=("ohlc", broker, symbol, range_key(time_range_hours), max_points))
 
 @router.get("/brokers", response_model=FetchBrokersResponse)
 def get_all_brokers(service: QuoteService = Depends(get_service)):
@@ -55,11 +327,70 @@ def get_dates(request: ListDatesRequest, service: QuoteService = Depends(get_ser
 
 @router.post("/sessions", response_model=ListSessionResponse)
 def get_sessions(request: ListSessionRequest, service: QuoteService = Depends(get_service)):
-    return service.get_sessions(request)
+    try:
+        return service.get_sessions(request)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/quotes", response_model=FetchQuoteResponse)
-def get_quotes(request: FetchQuoteRequest, service: QuoteService = Depends(get_service)):
-    return service.get_quotes(request)
+def get_quotes(
+    request: FetchQuoteRequest,
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    service: QuoteService = Depends(get_service)
+):
+    media_type = wire_format.negotiate(accept)
+    try:
+        payload = service.get_quotes_payload(request, 'json' if media_type == wire_format.JSON else 'arrays')
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    body, content_encoding = encode_body(media_type, payload, wire_format.pick_encoding(accept_encoding))
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    # Binary bodies have no slot for it, so the continuation token always rides in a header too
+    if payload["next_cursor"]:
+        headers["X-Next-Cursor"] = payload["next_cursor"]
+    return Response(content=body, media_type=media_type, headers=headers)
+
+@router.get("/export")
+def export_quotes(
+    request: Request,
+    broker: str = Query(...),
+    symbol: str = Query(...),
+    format: str = Query('csv', pattern=f"^({'|'.join(EXPORT_MEDIA_TYPES)})$", description="csv, ndjson or arrow (IPC stream)"),
+    start_time: Optional[int] = Query(None, description="Inclusive lower bound, epoch ms"),
+    end_time: Optional[int] = Query(None, description="Inclusive upper bound, epoch ms"),
+    since_ts: Optional[int] = Query(None, description="Only rows newer than this epoch-ms watermark"),
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=100, le=100_000, description="Rows per streamed chunk"),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """Stream one instrument's quotes, oldest first, without building the whole range in memory."""
+    if format not in available_formats():
+        raise HTTPException(status_code=406, detail=f"Export format {format} is not available on this server")
+    # Its own connection, so a slow download never holds one of the pooled readers
+    db = request.app.state.db_pool.open_reader()
+    if db.get_instrument_id(broker, symbol) is None:
+        db.close()
+        raise HTTPException(status_code=404, detail=f"No quotes for {broker}/{symbol}")
+
+    def body():
+        try:
+            yield from QuoteService(db=db).export_quotes(broker, symbol, format, start_time, end_time, since_ts,
+                                                         batch_size)
+        finally:
+            db.close()
+
+    chunks = body()
+    headers = {
+        "Content-Disposition": f'attachment; filename="{broker}_{symbol}.{EXPORT_EXTENSIONS[format]}"',
+        "Vary": "Accept-Encoding",
+    }
+    # Streamed bodies are gzipped chunk by chunk (see wire_format.gzip_stream)
+    if wire_format.pick_encoding(accept_encoding, offered=("gzip",)) == "gzip":
+        chunks = wire_format.gzip_stream(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
 
 @router.get("/brokers&symbols", response_model=BrokersSymbolsResponse)
 def get_brokers_and_symbols(service: QuoteService = Depends(get_service)):
@@ -0,0 +1,14 @@
+import sys
+import zipfile
+from pathlib import Path
+
+# The server modules are flat, top-level imports (run from Quote_Manager_server/)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def write_archive(path, members):
+    """Write a zip of Broker_SYMBOL_session.csv members, each given as a list of (ts, bid, ask) rows."""
+    with zipfile.ZipFile(path, "w") as archive:
+        for filename, rows in members.items():
+            archive.writestr(filename, "Ts,Bid,Ask\n" + "".join(f"{ts},{bid},{ask}\n" for ts, bid, ask in rows))
+    return path
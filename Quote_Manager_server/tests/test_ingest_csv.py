@@ -0,0 +1,32 @@
+import zipfile
+
+import pytest
+
+from ingest import iter_csv_member
+
+BIG_TS = 2 ** 62 + 1  # not representable as a float64
+ROWS = [
+    "1700000000000,1.1,1.2", f"{BIG_TS},1.1,1.2", f"{BIG_TS + 2},1.1,1.2", "1700000000001,1.1,1.2",
+    "1.0,1.1,1.2", "1e3,1.1,1.2", "bad,row,x", ",1.1,1.2", f"{2 ** 63},1.1,1.2", f"{-2 ** 63},1.1,1.2",
+    "5,nan,1", "6,1,inf", " 42 ,1.1,1.2", f"{BIG_TS + 4},1.5,1.6",
+]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    path = tmp_path / "day0.zip"
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("BrokerA_EURUSD_s1.csv", "Ts,Bid,Ask\n" + "\n".join(ROWS) + "\n")
+    with zipfile.ZipFile(path) as z:
+        yield z
+
+
+@pytest.mark.parametrize("chunk_size", [3, 4, 100])
+def test_pandas_and_csv_parsers_agree_on_ts(archive, chunk_size):
+    # With chunk_size 4 the first chunk is clean int64 and a later one forces the text re-read
+    parsed = {parser: [row for chunk in iter_csv_member(archive, "BrokerA_EURUSD_s1.csv", parser, chunk_size)
+                       for row in chunk]
+              for parser in ("pandas", "csv")}
+    assert parsed["pandas"] == parsed["csv"]
+    assert [ts for ts, _, _ in parsed["pandas"]] == [1700000000000, BIG_TS, BIG_TS + 2, 1700000000001,
+                                                     -2 ** 63, 42, BIG_TS + 4]
@@ -0,0 +1,42 @@
+import time
+
+import pytest
+
+from conftest import write_archive
+from ingest import ingest_archives_parallel
+from quote_db import QuoteDatabase
+
+BASE_TS = 1_700_000_000_000
+
+
+@pytest.fixture
+def archive(tmp_path):
+    members = {
+        f"Broker{broker}_EURUSD_{broker}{session}.csv": [(BASE_TS + session * 10_000_000 + i * 100, 1.1, 1.1002)
+                                                          for i in range(2000)]
+        for broker in "AB" for session in range(2)
+    }
+    return write_archive(tmp_path / "day0.zip", members)
+
+
+def test_parallel_ingest_writes_every_member_once(archive, tmp_path):
+    db = QuoteDatabase(str(tmp_path / "quotes.db"))
+    [result] = ingest_archives_parallel([archive], db, workers=2, batch_size=500)
+    assert result["rows"] == 8000 and not result["errors"]
+    assert db.conn.execute("SELECT COUNT(*) FROM quotes").fetchone()[0] == 8000
+    [again] = ingest_archives_parallel([archive], db, workers=2, batch_size=500)
+    assert again["rows"] == 0  # unchanged members are skipped
+
+
+def test_writer_failure_stops_workers_blocked_on_a_full_queue(archive, tmp_path, monkeypatch):
+    db = QuoteDatabase(str(tmp_path / "quotes.db"))
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(db, "insert_quote_chunk", fail)
+    started = time.perf_counter()
+    with pytest.raises(RuntimeError, match="disk full"):
+        # A one-slot queue and small batches leave both workers waiting on put() when the writer fails
+        ingest_archives_parallel([archive], db, workers=2, batch_size=50, queue_size=1)
+    assert time.perf_counter() - started < 5
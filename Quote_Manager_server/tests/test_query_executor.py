@@ -0,0 +1,25 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from query_executor import QueryExecutor, QueryTimeout
+
+
+def test_timeout_raises_at_the_deadline_and_hands_over_the_running_job():
+    executor = QueryExecutor(max_workers=1, timeout=5)
+    release = threading.Event()
+    abandoned = []
+
+    async def run():
+        started = time.perf_counter()
+        with pytest.raises(QueryTimeout):
+            await executor.run(release.wait, 5, timeout=0.2, interrupt=release.set, on_abandon=abandoned.append)
+        return time.perf_counter() - started
+
+    assert asyncio.run(run()) < 1
+    assert len(abandoned) == 1
+    abandoned[0].result(timeout=5)  # the interrupted worker finishes on its own
+    executor.shutdown()
+    assert executor.stats()["timed_out"] == 1
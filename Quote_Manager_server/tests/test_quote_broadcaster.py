@@ -0,0 +1,40 @@
+import asyncio
+
+import quote_broadcaster
+from conftest import write_archive
+from db_pool import QuoteDatabasePool
+from ingest import ingest_zip_archive
+from quote_broadcaster import QuoteBroadcaster
+
+BASE_TS = 1_700_000_000_000
+
+
+def test_backlog_is_paged_in_order_without_splitting_a_timestamp(tmp_path, monkeypatch):
+    monkeypatch.setattr(quote_broadcaster, "STREAM_BATCH_SIZE", 10)
+    pool = QuoteDatabasePool(str(tmp_path / "quotes.db"), readers=1)
+    ingest_zip_archive(str(write_archive(tmp_path / "day0.zip", {"BrokerA_EURUSD_s1.csv": [(BASE_TS, 1.1, 1.2)]})),
+                       pool.writer)
+
+    async def run():
+        broadcaster = QuoteBroadcaster(pool)
+        subscription = await broadcaster.subscribe([("BrokerA", "EURUSD")])
+        # 25 new ticks; ticks 9 and 10 share a timestamp across two sessions, right at the first page boundary
+        backlog = {
+            "BrokerA_EURUSD_s2.csv": [(BASE_TS + i, 1.1, 1.2) for i in range(1, 10)],
+            "BrokerA_EURUSD_s3.csv": [(BASE_TS + 9, 1.3, 1.4)] + [(BASE_TS + i, 1.1, 1.2) for i in range(10, 25)],
+        }
+        ingest_zip_archive(str(write_archive(tmp_path / "day1.zip", backlog)), pool.writer)
+        for _ in range(5):
+            await broadcaster.poll_once()
+        messages = []
+        while not subscription.queue.empty():
+            messages.append(subscription.queue.get_nowait())
+        return messages
+
+    messages = asyncio.run(run())
+    pool.close()
+    assert len(messages) == 3
+    assert all(len(message["timestamp"]) <= 10 for message in messages)
+    timestamps = [ts for message in messages for ts in message["timestamp"]]
+    assert timestamps == sorted(timestamps) and len(timestamps) == 25
+    assert [message["watermark"] for message in messages] == [message["timestamp"][-1] for message in messages]
@@ -0,0 +1,61 @@
+import importlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import write_archive
+from ingest import ingest_zip_archive
+from page_cursor import encode_cursor
+from quote_db import QuoteDatabase
+
+BASE_TS = 1_700_000_000_000
+QUERY = ("quotes", "BrokerA", "EURUSD", None, None, None)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    rows = [(BASE_TS + i * 1000, 1.1 + i * 1e-5, 1.1002 + i * 1e-5) for i in range(25)]
+    archive = write_archive(tmp_path / "day0.zip", {
+        "BrokerA_EURUSD_s1.csv": rows[:10],
+        "BrokerA_EURUSD_s2.csv": rows[10:],
+    })
+    db_path = tmp_path / "quotes.db"
+    db = QuoteDatabase(str(db_path))
+    ingest_zip_archive(str(archive), db)
+    db.conn.close()
+
+    monkeypatch.setenv("QUOTES_DB_PATH", str(db_path))
+    monkeypatch.delenv("QUOTES_HOT_CACHE_DIR", raising=False)
+    import api_main
+    importlib.reload(api_main)
+    with TestClient(api_main.app) as test_client:
+        yield test_client
+
+
+def test_pages_cover_every_quote_once(client):
+    request = {"broker": "BrokerA", "symbol": "EURUSD", "page_size": 7}
+    seen = []
+    while True:
+        response = client.post("/api/quotes/quotes", json=request)
+        assert response.status_code == 200
+        body = response.json()
+        seen += [(quote["session_id"], quote["timestamp"]) for quote in body["quotes"]]
+        if not body["next_cursor"]:
+            break
+        request["cursor"] = body["next_cursor"]
+    everything = client.post("/api/quotes/quotes", json={"broker": "BrokerA", "symbol": "EURUSD"}).json()
+    assert seen == [(quote["session_id"], quote["timestamp"]) for quote in everything["quotes"]]
+    assert len(seen) == 25
+
+
+@pytest.mark.parametrize("position", [[], ["s1"], [BASE_TS, "s1"], ["s1", "1"], ["s1", BASE_TS, 0]])
+def test_malformed_cursor_position_is_rejected(client, position):
+    request = {"broker": "BrokerA", "symbol": "EURUSD", "cursor": encode_cursor(position, QUERY)}
+    response = client.post("/api/quotes/quotes", json=request)
+    assert response.status_code == 400
+
+
+def test_cursor_from_another_query_is_rejected(client):
+    cursor = encode_cursor(["s1", BASE_TS], ("quotes", "BrokerB", "EURUSD", None, None, None))
+    response = client.post("/api/quotes/quotes", json={"broker": "BrokerA", "symbol": "EURUSD", "cursor": cursor})
+    assert response.status_code == 400
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from conftest import write_archive
+from ingest import ingest_zip_archive
+from quote_db import QuoteDatabase
+
+BASE_TS = 1_700_000_000_000
+
+
+@pytest.mark.parametrize("offset", [0, 5_000, 50_000], ids=["overlapping", "interleaved", "disjoint"])
+def test_series_arrays_match_get_series(tmp_path, offset):
+    rows = lambda start, bid: [(BASE_TS + start + i * 1000, bid + i * 1e-5, bid + 2e-4 + i * 1e-5) for i in range(40)]
+    archive = write_archive(tmp_path / "day0.zip", {
+        "BrokerA_EURUSD_s1.csv": rows(0, 1.1),
+        "BrokerA_EURUSD_s2.csv": rows(offset + 500, 1.2),
+        "BrokerB_EURUSD_s3.csv": rows(0, 1.3),
+    })
+    db = QuoteDatabase(str(tmp_path / "quotes.db"))
+    ingest_zip_archive(str(archive), db)
+
+    for start_time, end_time in [(None, None), (BASE_TS + 10_000, BASE_TS + 30_000)]:
+        df = db.get_series("BrokerA", "EURUSD", start_time, end_time)
+        series = db.get_series_arrays("BrokerA", "EURUSD", start_time, end_time)
+        assert series["ts"].tolist() == df["timestamp"].tolist()
+        assert np.array_equal(series["bid"], df["bid"]) and np.array_equal(series["ask"], df["ask"])
+        assert [series["sessions"][code] for code in series["session"]] == df["session_id"].tolist()
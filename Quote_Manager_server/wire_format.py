@@ -0,0 +1,163 @@
+import gzip
+import json
+import zlib
+import struct
+from typing import Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: without it the Arrow media type is not offered
+    pa = None
+
+JSON = "application/json"
+# Packed little-endian columns: b"QPK1", uint32 header length, JSON header, then per series
+# int64 timestamp[n], float64 bid[n], float64 ask[n], int32 session[n] (index into the header's
+# session list), every block starting on an 8-byte boundary.
+PACKED = "application/x-quote-columns"
+ARROW = "application/vnd.apache.arrow.stream"
+PACKED_MAGIC = b"QPK1"
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+def negotiate(accept: Optional[str]) -> str:
+    """Pick JSON, PACKED or ARROW from an Accept header; JSON unless a binary type is asked for."""
+    offered = [part.split(";")[0].strip() for part in (accept or "").split(",")]
+    if PACKED in offered:
+        return PACKED
+    if ARROW in offered and pa is not None:
+        return ARROW
+    return JSON
+
+def pick_encoding(accept_encoding: Optional[str], offered: Tuple[str, ...] = ("br", "gzip")) -> Optional[str]:
+    """'br' (if brotli is installed) or 'gzip' when the client accepts it and it is offered, else None."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(coding.strip())
+    if brotli is not None and "br" in accepted and "br" in offered:
+        return "br"
+    if "gzip" in accepted and "gzip" in offered:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """Return (body, Content-Encoding); small bodies are left as they are."""
+    if encoding is None or len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=5), "br"
+    # mtime=0 keeps the output (and so the ETag) identical for identical bodies
+    return gzip.compress(body, compresslevel=6, mtime=0), "gzip"
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """gzip a streamed body; each chunk is sync-flushed so the client can decode it as it arrives."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def _pad(n: int) -> int:
+    return -n % 8
+
+def encode_packed(series: List[dict], watermark: Optional[int]) -> bytes:
+    """series items hold broker, symbol, session_id (list) and timestamp/bid/ask arrays."""
+    header_series, blocks = [], []
+    for item in series:
+        sessions = list(dict.fromkeys(item["session_id"]))
+        index = {session_id: i for i, session_id in enumerate(sessions)}
+        header_series.append({"broker": item["broker"], "symbol": item["symbol"],
+                              "count": len(item["timestamp"]), "sessions": sessions})
+        blocks += [
+            np.ascontiguousarray(item["timestamp"], dtype="<i8").tobytes(),
+            np.ascontiguousarray(item["bid"], dtype="<f8").tobytes(),
+            np.ascontiguousarray(item["ask"], dtype="<f8").tobytes(),
+            np.array([index[s] for s in item["session_id"]], dtype="<i4").tobytes(),
+        ]
+    header = json.dumps({"watermark": watermark, "series": header_series}, separators=(",", ":")).encode()
+    header += b" " * _pad(len(PACKED_MAGIC) + 4 + len(header))
+    parts = [PACKED_MAGIC, struct.pack("<I", len(header)), header]
+    for block in blocks:
+        parts += [block, b"\0" * _pad(len(block))]
+    return b"".join(parts)
+
+def decode_packed(body: bytes) -> dict:
+    """Inverse of encode_packed; arrays are zero-copy views into body."""
+    if body[:4] != PACKED_MAGIC:
+        raise ValueError("Not a packed quote body")
+    (header_len,) = struct.unpack_from("<I", body, 4)
+    offset = 8 + header_len
+    header = json.loads(body[8:offset])
+    series = []
+    for item in header["series"]:
+        n = item["count"]
+        arrays = {}
+        for name, dtype in (("timestamp", "<i8"), ("bid", "<f8"), ("ask", "<f8"), ("session", "<i4")):
+            arrays[name] = np.frombuffer(body, dtype=dtype, count=n, offset=offset)
+            offset += n * np.dtype(dtype).itemsize
+            offset += _pad(offset)
+        sessions = np.asarray(item["sessions"], dtype=object)
+        series.append({"broker": item["broker"], "symbol": item["symbol"],
+                       "session_id": sessions[arrays.pop("session")],
+                       **arrays})
+    return {"watermark": header["watermark"], "series": series}
+
+def encode_arrow(series: List[dict], watermark: Optional[int]) -> bytes:
+    """One Arrow IPC stream, one record batch per series; the watermark rides in the schema metadata."""
+    schema = pa.schema([
+        ("broker", pa.dictionary(pa.int32(), pa.string())),
+        ("symbol", pa.dictionary(pa.int32(), pa.string())),
+        ("session_id", pa.dictionary(pa.int32(), pa.string())),
+        ("timestamp", pa.int64()),
+        ("bid", pa.float64()),
+        ("ask", pa.float64()),
+    ], metadata={"watermark": json.dumps(watermark)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for item in series:
+            n = len(item["timestamp"])
+            writer.write_batch(pa.record_batch([
+                pa.array([item["broker"]] * n).dictionary_encode(),
+                pa.array([item["symbol"]] * n).dictionary_encode(),
+                pa.array(list(item["session_id"]), type=pa.string()).dictionary_encode(),
+                pa.array(np.asarray(item["timestamp"], dtype=np.int64)),
+                pa.array(np.asarray(item["bid"], dtype=np.float64)),
+                pa.array(np.asarray(item["ask"], dtype=np.float64)),
+            ], schema=schema))
+    return sink.getvalue().to_pybytes()
+
+def decode_arrow(body: bytes) -> dict:
+    """Inverse of encode_arrow, returning the same shape as decode_packed."""
+    reader = pa.ipc.open_stream(body)
+    watermark = json.loads(reader.schema.metadata[b"watermark"])
+    series = []
+    for batch in reader:
+        if batch.num_rows == 0:
+            continue
+        series.append({
+            "broker": batch.column("broker")[0].as_py(),
+            "symbol": batch.column("symbol")[0].as_py(),
+            "session_id": np.asarray(batch.column("session_id").to_pylist(), dtype=object),
+            "timestamp": batch.column("timestamp").to_numpy(),
+            "bid": batch.column("bid").to_numpy(),
+            "ask": batch.column("ask").to_numpy(),
+        })
+    return {"watermark": watermark, "series": series}
+
+def decode(body: bytes, content_type: str) -> dict:
+    """Decode any of the three media types; JSON bodies are returned as parsed."""
+    media_type = content_type.split(";")[0].strip()
+    if media_type == PACKED:
+        return decode_packed(body)
+    if media_type == ARROW:
+        if pa is None:
+            raise RuntimeError("Decoding Arrow responses needs pyarrow: pip install pyarrow")
+        return decode_arrow(body)
+    return json.loads(body)
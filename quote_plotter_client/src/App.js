@@ -88,7 +88,7 @@ function App() {
       <ChartComponent
         brokerA={brokerA} symbolA={symbolA}
         brokerB={brokerB} symbolB={symbolB}
-        timeRange={timeRange} spreadPoints={spreadPoints}
+        timeRange={timeRange}
       />
       <TableComponent
         brokerA={brokerA} symbolA={symbolA}
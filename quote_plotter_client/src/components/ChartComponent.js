@@ -15,11 +15,17 @@ import {
 } from 'chart.js';
 import 'chartjs-adapter-date-fns';
 import '../index.css';
+import { appendQuotes, messageSides } from './compareGrid';
 
 ChartJS.register(CategoryScale, LinearScale, PointElement, LineElement, TimeScale, Title, Tooltip, Legend, zoomPlugin);
 
-const ChartComponent = ({ brokerA, symbolA, brokerB, symbolB, timeRange, spreadPoints }) => {
-  const [chartData, setChartData] = useState(null);
+// 1s grid; ranges longer than COMPARE_MAX_POINTS seconds (~5.5h) get a wider step from the server
+const COMPARE_STEP_MS = 1000;
+const COMPARE_MAX_POINTS = 20000;
+
+const ChartComponent = ({ brokerA, symbolA, brokerB, symbolB, timeRange }) => {
+  const [compare, setCompare] = useState(null);
+  const compareRef = useRef(null); // latest grid, for the stream handler
   const [view, setView] = useState('ask_bid');
   const chartRef = useRef(null);
   const zoomRangeRef = useRef(null);
@@ -35,116 +41,66 @@ const ChartComponent = ({ brokerA, symbolA, brokerB, symbolB, timeRange, spreadP
     const fetchData = async () => {
       try {
         console.log(`Fetching data for brokerA=${brokerA}, symbolA=${symbolA}, brokerB=${brokerB}, symbolB=${symbolB}, timeRange=${timeRange}`);
-        const response = await axios.get('http://localhost:8000/api/quotes/api/data', {
-          params: { broker_a: brokerA, symbol_a: symbolA, broker_b: brokerB, symbol_b: symbolB, time_range_hours: timeRange },
+        const response = await axios.get('http://localhost:8000/api/quotes/api/compare', {
+          params: {
+            broker_a: brokerA, symbol_a: symbolA, broker_b: brokerB, symbol_b: symbolB, time_range_hours: timeRange,
+            step_ms: COMPARE_STEP_MS, max_points: COMPARE_MAX_POINTS,
+          },
         });
-        const data = response.data.data;
-
-        if (!data || data.length === 0) {
+        // Server returns both series already aligned on a common time grid
+        if (!response.data.ts || response.data.ts.length === 0) {
           console.warn('No data received from API');
-          setChartData({ labels: [], datasets: [] });
-          return;
         }
-
-        // Sorts data by timestamp
-        data.sort((a, b) => new Date(a.timestamp) - new Date(b.timestamp));
-
-        // Get min and max timestamps for common timestamp index
-        const minTimestamp = new Date(data[0].timestamp).getTime();
-        const maxTimestamp = new Date(data[data.length - 1].timestamp).getTime();
-
-        // Create common timestamp index with 1-second frequency
-        const commonTimestamps = [];
-        for (let t = minTimestamp; t <= maxTimestamp; t += 1000) {
-          commonTimestamps.push(new Date(t).toISOString());
-        }
-
-        const df = data.reduce((acc, row) => {
-          const key = `${row.broker}_${row.symbol}`;
-          if (!acc[key]) acc[key] = { timestamps: [], ask: [], bid: [] };
-          acc[key].timestamps.push(row.timestamp);
-          acc[key].ask.push(row.ask_price || null);
-          acc[key].bid.push(row.bid_price || null);
-          return acc;
-        }, {});
-
-        // Linear interpolation function
-        const linearInterpolate = (timestamps, values, newTimestamps) => {
-          const result = [];
-          let i = 0;
-          for (let j = 0; j < newTimestamps.length; j++) {
-            const t = new Date(newTimestamps[j]).getTime();
-            while (i < timestamps.length - 1 && new Date(timestamps[i + 1]).getTime() < t) i++;
-            if (i >= timestamps.length - 1) {
-              result.push(values[values.length - 1] || null);
-              continue;
-            }
-            const t0 = new Date(timestamps[i]).getTime();
-            const t1 = new Date(timestamps[i + 1]).getTime();
-            if (t === t0) {
-              result.push(values[i]);
-            } else if (t === t1) {
-              result.push(values[i + 1]);
-            } else {
-              const v0 = values[i];
-              const v1 = values[i + 1];
-              if (v0 === null || v1 === null) {
-                result.push(null);
-              } else {
-                result.push(v0 + (v1 - v0) * (t - t0) / (t1 - t0));
-              }
-            }
-          }
-          return result;
-        };
-
-        const keyA = `${brokerA}_${symbolA}`;
-        const keyB = `${brokerB}_${symbolB}`;
-
-        const timestampsA = df[keyA]?.timestamps || [];
-        const timestampsB = df[keyB]?.timestamps || [];
-        // Get interpolated ask/bid arrays on common timeline
-        const askA = linearInterpolate(timestampsA, df[keyA]?.ask || [], commonTimestamps);
-        const bidA = linearInterpolate(timestampsA, df[keyA]?.bid || [], commonTimestamps);
-        const askB = linearInterpolate(timestampsB, df[keyB]?.ask || [], commonTimestamps);
-        const bidB = linearInterpolate(timestampsB, df[keyB]?.bid || [], commonTimestamps);
-
-        const midlineA = askA.map((a, i) => a !== null && bidA[i] !== null ? (a + bidA[i]) / 2 : null);
-        const midlineB = askB.map((a, i) => a !== null && bidB[i] !== null ? (a + bidB[i]) / 2 : null);
-
-
-
-
-        const newChartData = {
-          labels: commonTimestamps,
-          datasets: view === 'ask_bid'
-            ? [
-                { label: `${brokerA} ${symbolA} Ask`, data: askA, borderColor: '#1f77b4', yAxisID: 'y1', spanGaps: true, pointRadius: 2 },
-                { label: `${brokerA} ${symbolA} Bid`, data: bidA, borderColor: '#1f77b4', borderDash: [5, 5], yAxisID: 'y1', spanGaps: true, pointRadius: 2 },
-                { label: `${brokerB} ${symbolB} Ask`, data: askB, borderColor: '#ff7f0e', yAxisID: 'y2', spanGaps: true, pointRadius: 2 },
-                { label: `${brokerB} ${symbolB} Bid`, data: bidB, borderColor: '#ff7f0e', borderDash: [5, 5], yAxisID: 'y2', spanGaps: true, pointRadius: 2 },
-              ]
-            : [
-                { label: `${brokerA} ${symbolA} Midline`, data: midlineA, borderColor: '#1f77b4', yAxisID: 'y1', spanGaps: true, pointRadius: 2 },
-                { label: `${brokerB} ${symbolB} Midline`, data: midlineB, borderColor: '#ff7f0e', yAxisID: 'y2', spanGaps: true, pointRadius: 2 },
-              ],
-        };
-
-
-
-        setChartData(newChartData);
+        compareRef.current = response.data;
+        setCompare(response.data);
       } catch (error) {
         console.error('Error fetching data:', error);
       }
     };
 
     fetchData(); // Initial fetch
-    const intervalId = setInterval(fetchData, 60000); // Poll data every 1 minute
+    // The server pushes each batch of new ticks for either instrument; append it to the grid
+    // locally instead of refetching the whole window
+    const stream = new EventSource(
+      'http://localhost:8000/api/quotes/stream?' +
+      new URLSearchParams([['instrument', `${brokerA}:${symbolA}`], ['instrument', `${brokerB}:${symbolB}`]])
+    );
+    stream.addEventListener('quotes', (event) => {
+      const message = JSON.parse(event.data);
+      const sides = messageSides(message, brokerA, symbolA, brokerB, symbolB);
+      const next = appendQuotes(compareRef.current, sides, message, COMPARE_MAX_POINTS);
+      if (next === null) {
+        fetchData(); // nothing to extend yet
+        return;
+      }
+      compareRef.current = next;
+      setCompare(next);
+    });
 
     return () => {
-      clearInterval(intervalId); // Cleanup interval
+      stream.close();
+    };
+  }, [brokerA, symbolA, brokerB, symbolB, timeRange]);
+
+  const chartData = useMemo(() => {
+    if (!compare) return null;
+    const { ts, ask_a: askA, bid_a: bidA, ask_b: askB, bid_b: bidB, mid_a: midlineA, mid_b: midlineB } = compare;
+    if (!ts || ts.length === 0) return { labels: [], datasets: [] };
+    return {
+      labels: ts,
+      datasets: view === 'ask_bid'
+        ? [
+            { label: `${brokerA} ${symbolA} Ask`, data: askA, borderColor: '#1f77b4', yAxisID: 'y1', spanGaps: true, pointRadius: 2 },
+            { label: `${brokerA} ${symbolA} Bid`, data: bidA, borderColor: '#1f77b4', borderDash: [5, 5], yAxisID: 'y1', spanGaps: true, pointRadius: 2 },
+            { label: `${brokerB} ${symbolB} Ask`, data: askB, borderColor: '#ff7f0e', yAxisID: 'y2', spanGaps: true, pointRadius: 2 },
+            { label: `${brokerB} ${symbolB} Bid`, data: bidB, borderColor: '#ff7f0e', borderDash: [5, 5], yAxisID: 'y2', spanGaps: true, pointRadius: 2 },
+          ]
+        : [
+            { label: `${brokerA} ${symbolA} Midline`, data: midlineA, borderColor: '#1f77b4', yAxisID: 'y1', spanGaps: true, pointRadius: 2 },
+            { label: `${brokerB} ${symbolB} Midline`, data: midlineB, borderColor: '#ff7f0e', yAxisID: 'y2', spanGaps: true, pointRadius: 2 },
+          ],
     };
-  }, [brokerA, symbolA, brokerB, symbolB, timeRange, spreadPoints, view]);
+  }, [compare, view, brokerA, symbolA, brokerB, symbolB]);
 
   // Save zoom range
   const saveZoomRange = (chart) => {
@@ -189,9 +145,9 @@ const ChartComponent = ({ brokerA, symbolA, brokerB, symbolB, timeRange, spreadP
 
     const labels = chartData?.labels || [];
     if (labels.length) {
-      const lastTime = Date.parse(labels[labels.length - 1]);
+      const lastTime = labels[labels.length - 1];
       const defaultWindowMs = 5 * 60 * 1000;
-      const min = Math.max(Date.parse(labels[0]), lastTime - defaultWindowMs);
+      const min = Math.max(labels[0], lastTime - defaultWindowMs);
       chart.options.scales.x.min = min;
       chart.options.scales.x.max = lastTime;
       chart.update();
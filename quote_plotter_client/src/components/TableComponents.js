@@ -1,129 +1,77 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useMemo, useRef } from 'react';
 import axios from 'axios';
+import { appendQuotes, messageSides } from './compareGrid';
+
+// Rows are one second apart; a day of them keeps the 1s step for every range but 'all'
+const COMPARE_STEP_MS = 1000;
+const COMPARE_MAX_POINTS = 86400;
 
 const TableComponent = ({ brokerA, symbolA, brokerB, symbolB, timeRange, spreadPoints }) => {
-  const [tableData, setTableData] = useState([]);
+  const [compare, setCompare] = useState(null);
+  const compareRef = useRef(null); // latest grid, for the stream handler
 
   useEffect(() => {
     const fetchData = async () => {
       try {
         console.log(`Fetching table data for brokerA=${brokerA}, symbolA=${symbolA}, brokerB=${brokerB}, symbolB=${symbolB}, timeRange=${timeRange}`);
-        const response = await axios.get('http://localhost:8000/api/quotes/api/data', {
-          params: { broker_a: brokerA, symbol_a: symbolA, broker_b: brokerB, symbol_b: symbolB, time_range_hours: timeRange },
+        const response = await axios.get('http://localhost:8000/api/quotes/api/compare', {
+          params: {
+            broker_a: brokerA, symbol_a: symbolA, broker_b: brokerB, symbol_b: symbolB, time_range_hours: timeRange,
+            step_ms: COMPARE_STEP_MS, max_points: COMPARE_MAX_POINTS,
+          },
         });
-        const data = response.data.data;
-
-        if (!data || data.length === 0) {
+        if (!response.data.ts || response.data.ts.length === 0) {
           console.warn('No data received for table');
-          setTableData([]);
-          return;
         }
-
-        // Sort ascending by timestamp (oldest first)
-        data.sort((a, b) => new Date(a.timestamp) - new Date(b.timestamp));
-
-        // Determine min/max timestamp
-        const minTimestamp = new Date(data[0].timestamp).getTime();
-        const maxTimestamp = new Date(data[data.length - 1].timestamp).getTime();
-
-        // Build common timestamp array with 1 second steps
-        const commonTimestamps = [];
-        for (let t = minTimestamp; t <= maxTimestamp; t += 1000) {
-          commonTimestamps.push(new Date(t).toISOString());
-        }
-
-        // Group data by broker_symbol key
-        const df = data.reduce((acc, row) => {
-          const key = `${row.broker}_${row.symbol}`;
-          if (!acc[key]) acc[key] = { timestamps: [], ask: [], bid: [] };
-          acc[key].timestamps.push(row.timestamp);
-          acc[key].ask.push(row.ask_price ?? null);
-          acc[key].bid.push(row.bid_price ?? null);
-          return acc;
-        }, {});
-
-        // Linear interpolation helper
-        const linearInterpolate = (timestamps, values, newTimestamps) => {
-          const result = [];
-          let i = 0;
-          for (let j = 0; j < newTimestamps.length; j++) {
-            const t = new Date(newTimestamps[j]).getTime();
-            while (i < timestamps.length - 1 && new Date(timestamps[i + 1]).getTime() < t) i++;
-            if (i >= timestamps.length - 1) {
-              result.push(values[values.length - 1] ?? null);
-              continue;
-            }
-            const t0 = new Date(timestamps[i]).getTime();
-            const t1 = new Date(timestamps[i + 1]).getTime();
-            if (t === t0) {
-              result.push(values[i]);
-            } else if (t === t1) {
-              result.push(values[i + 1]);
-            } else {
-              const v0 = values[i];
-              const v1 = values[i + 1];
-              if (v0 === null || v1 === null) {
-                result.push(null);
-              } else {
-                result.push(v0 + ((v1 - v0) * (t - t0)) / (t1 - t0));
-              }
-            }
-          }
-          return result;
-        };
-
-        const keyA = `${brokerA}_${symbolA}`;
-        const keyB = `${brokerB}_${symbolB}`;
-
-        // Get interpolated ask/bid arrays on common timeline
-        const askA = linearInterpolate(df[keyA]?.timestamps ?? [], df[keyA]?.ask ?? [], commonTimestamps);
-        const bidA = linearInterpolate(df[keyA]?.timestamps ?? [], df[keyA]?.bid ?? [], commonTimestamps);
-        const askB = linearInterpolate(df[keyB]?.timestamps ?? [], df[keyB]?.ask ?? [], commonTimestamps);
-        const bidB = linearInterpolate(df[keyB]?.timestamps ?? [], df[keyB]?.bid ?? [], commonTimestamps);
-
-        // Build table rows combining values per timestamp
-        let combined = commonTimestamps.map((ts, i) => {
-          const ask_a = askA[i];
-          const bid_a = bidA[i];
-          const ask_b = askB[i];
-          const bid_b = bidB[i];
-
-          // Calculate spread as ask_a - bid_b if both present
-          const spread = (ask_a != null && bid_b != null) ? ask_a - bid_b : null;
-          return {
-            timestamp: new Date(ts).toLocaleString(),
-            ask_a,
-            bid_a,
-            ask_b,
-            bid_b,
-            spread,
-          };
-        });
-
-        // Sort descending (newest first) and slice to spreadPoints
-        combined = combined.sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp)).slice(0, spreadPoints);
-
-        // Format numbers to fixed (5) decimals or show 'N/A'
-        const formatted = combined.map(row => ({
-          timestamp: row.timestamp,
-          ask_a: row.ask_a != null ? row.ask_a.toFixed(5) : 'N/A',
-          bid_a: row.bid_a != null ? row.bid_a.toFixed(5) : 'N/A',
-          ask_b: row.ask_b != null ? row.ask_b.toFixed(5) : 'N/A',
-          bid_b: row.bid_b != null ? row.bid_b.toFixed(5) : 'N/A',
-          spread: row.spread != null ? row.spread.toFixed(5) : 'N/A',
-        }));
-
-        setTableData(formatted);
+        compareRef.current = response.data;
+        setCompare(response.data);
       } catch (error) {
         console.error('Error fetching table data:', error);
       }
     };
 
     fetchData();
-    const intervalId = setInterval(fetchData, 60000); // refreshes every 1 minute
-
-    return () => clearInterval(intervalId);
-  }, [brokerA, symbolA, brokerB, symbolB, timeRange, spreadPoints]);
+    // Append ticks the server pushes for either instrument instead of refetching the window
+    const stream = new EventSource(
+      'http://localhost:8000/api/quotes/stream?' +
+      new URLSearchParams([['instrument', `${brokerA}:${symbolA}`], ['instrument', `${brokerB}:${symbolB}`]])
+    );
+    stream.addEventListener('quotes', (event) => {
+      const message = JSON.parse(event.data);
+      const sides = messageSides(message, brokerA, symbolA, brokerB, symbolB);
+      const next = appendQuotes(compareRef.current, sides, message, COMPARE_MAX_POINTS);
+      if (next === null) {
+        fetchData(); // nothing to extend yet
+        return;
+      }
+      compareRef.current = next;
+      setCompare(next);
+    });
+
+    return () => stream.close();
+  }, [brokerA, symbolA, brokerB, symbolB, timeRange]);
+
+  const tableData = useMemo(() => {
+    // Server returns both series aligned on a common grid, with spread = ask_a - bid_b
+    const { ts, ask_a: askA, bid_a: bidA, ask_b: askB, bid_b: bidB, spread } = compare || {};
+    if (!ts || ts.length === 0) return [];
+
+    // Newest spreadPoints grid rows first; the grid is already in time order
+    const rows = [];
+    for (let i = ts.length - 1; i >= 0 && rows.length < spreadPoints; i--) {
+      rows.push({ time: ts[i], ask_a: askA[i], bid_a: bidA[i], ask_b: askB[i], bid_b: bidB[i], spread: spread[i] });
+    }
+
+    // Format numbers to fixed (5) decimals or show 'N/A'
+    return rows.map(row => ({
+      timestamp: new Date(row.time).toLocaleString(),
+      ask_a: row.ask_a != null ? row.ask_a.toFixed(5) : 'N/A',
+      bid_a: row.bid_a != null ? row.bid_a.toFixed(5) : 'N/A',
+      ask_b: row.ask_b != null ? row.ask_b.toFixed(5) : 'N/A',
+      bid_b: row.bid_b != null ? row.bid_b.toFixed(5) : 'N/A',
+      spread: row.spread != null ? row.spread.toFixed(5) : 'N/A',
+    }));
+  }, [compare, spreadPoints]);
 
   return (
     <table  className="table-style">
@@ -0,0 +1,72 @@
+// Extends an /api/compare response with ticks pushed over /stream, so live updates
+// don't refetch the whole window. Mirrors the server: linear interpolation between
+// ticks onto the step_ms grid, null past a series' last tick. The last grid value
+// already shown stands in for the tick before the pushed batch.
+
+const lastKnown = (compare, side) => {
+  const bids = compare[`bid_${side}`];
+  const asks = compare[`ask_${side}`];
+  for (let i = bids.length - 1; i >= 0; i--) {
+    if (bids[i] != null && asks[i] != null) return { t: compare.ts[i], bid: bids[i], ask: asks[i] };
+  }
+  return null;
+};
+
+// hi is the index of the first knot at or after t
+const interpolate = (knots, hi, key, t) => {
+  if (hi === knots.length) return null; // past the last tick
+  if (knots[hi].t === t) return knots[hi][key];
+  if (hi === 0) return null; // before the first tick
+  const lo = knots[hi - 1];
+  return lo[key] + ((knots[hi][key] - lo[key]) * (t - lo.t)) / (knots[hi].t - lo.t);
+};
+
+// Returns a new compare object with one stream message's ticks applied to side 'a' or 'b',
+// or null when there is no grid to extend yet (the caller should refetch).
+export const appendQuotes = (compare, sides, message, maxPoints) => {
+  if (!compare || !compare.ts.length || !compare.step_ms) return null;
+  const next = Object.fromEntries(
+    Object.entries(compare).map(([key, value]) => [key, Array.isArray(value) ? value.slice() : value])
+  );
+  const ticks = message.timestamp.map((t, i) => ({ t, bid: message.bid[i], ask: message.ask[i] }));
+
+  // New grid points up to the newest pushed tick; both series start out unknown there
+  const newest = ticks[ticks.length - 1].t;
+  for (let t = next.ts[next.ts.length - 1] + next.step_ms; t <= newest; t += next.step_ms) {
+    next.ts.push(t);
+    ['bid_a', 'ask_a', 'bid_b', 'ask_b', 'mid_a', 'mid_b', 'spread'].forEach((key) => next[key].push(null));
+  }
+
+  sides.forEach((side) => {
+    const anchor = lastKnown(next, side);
+    const knots = [...(anchor ? [anchor] : []), ...ticks.filter((tick) => !anchor || tick.t > anchor.t)];
+    let first = next.ts.length;
+    while (first > 0 && (!anchor || next.ts[first - 1] > anchor.t)) first--;
+    // Grid points and knots are both ascending, so one pointer walks the knots alongside the grid
+    let hi = 0;
+    for (let i = first; i < next.ts.length; i++) {
+      while (hi < knots.length && knots[hi].t < next.ts[i]) hi++;
+      next[`bid_${side}`][i] = interpolate(knots, hi, 'bid', next.ts[i]);
+      next[`ask_${side}`][i] = interpolate(knots, hi, 'ask', next.ts[i]);
+      const bid = next[`bid_${side}`][i];
+      const ask = next[`ask_${side}`][i];
+      next[`mid_${side}`][i] = bid != null && ask != null ? (bid + ask) / 2 : null;
+      next.spread[i] = next.ask_a[i] != null && next.bid_b[i] != null ? next.ask_a[i] - next.bid_b[i] : null;
+    }
+  });
+
+  // Keep the window bounded like the server's max_points
+  const excess = next.ts.length - maxPoints;
+  if (excess > 0) {
+    ['ts', 'bid_a', 'ask_a', 'bid_b', 'ask_b', 'mid_a', 'mid_b', 'spread'].forEach((key) => {
+      next[key] = next[key].slice(excess);
+    });
+  }
+  return next;
+};
+
+// Which sides ('a', 'b') of the comparison a stream message belongs to
+export const messageSides = (message, brokerA, symbolA, brokerB, symbolB) => [
+  ...(message.broker === brokerA && message.symbol === symbolA ? ['a'] : []),
+  ...(message.broker === brokerB && message.symbol === symbolB ? ['b'] : []),
+];